@@ -1,41 +1,82 @@
 import os
 import sys
-import winshell
-from win32com.client import Dispatch
 
-import requests
-from PIL import Image as Image
-import cv2
+from oledcore.gamesense import EngineTransport, encodeGameEvent, readEngineAddress
+from oledcore.scheduler import FrameScheduler, TimerQueue, CYCLE_SECONDS, ROTATE_TIMER
+from oledcore.dedup import FrameStore, iterMergeHolds, dedupStats
+from oledcore.framebuffer import FrameBuffer, collectFrames
+from oledcore.preparer import ParallelPreparer
+from oledcore.lazycycle import LazyPreparer, DEFAULT_MEMORY_BUDGET
+from oledcore.framecache import FrameCache
+from oledcore.ratecontrol import RateController
+from oledcore.telemetry import PlaybackTelemetry, MetricsWriter
+from oledcore.playback import CancelToken, PlaybackController
 import json
 import time
-from threading import Thread, Event
-
-import tkinter as tk
-from tkinter import filedialog
-import pystray
-from pystray import Menu, MenuItem
-
+from threading import Thread
 
+ENCODER_VERSION = 2
+# Bump whenever processGIF or encodeFrame output changes, so cached frames are rebuilt
 
 #############################################################################
 #####                             GIF CODE                              #####
 #############################################################################
 
 class OLED_GIF:
-    def __init__(self):
-        corePropsPath =  r"C:\ProgramData\SteelSeries\GG\coreProps.json"
-        self.sseAddress = f'http://{json.load(open(corePropsPath))["address"]}'
+    def __init__(self, transport=None, corePropsPath=None):
+        if transport is None:
+            # corePropsPath defaults to $OLED_GIF_CORE_PROPS, then GG's install folder
+            transport = EngineTransport(readEngineAddress(corePropsPath))
+        self.transport = transport
+        # All Engine calls share this keep-alive connection pool
         self.game = "OLED_GIF"
         self.game_display_name = 'Display OLED GIF'
         self.event = "DISPLAY_GIF"
-        self.running = True
+        self.cancelToken = CancelToken()
+        # Cancels the current playback run, see running
         self.frameDelaySeconds = 0.001
         #0.001 = 1ms || 0.025 = 25ms
+        # Minimum time between frames, GIF frame durations are used on top of this
+        self.playbackSpeed = 1.0
+        # 2.0 = Twice as fast; 0.5 = Half speed
+        self.scheduler = None
         self.invert = 0
         # 0 = No; 1 = Yes
 
         self.currentGIF = 0
         # Used for GIF cycle option
+        self.cycleSeconds = CYCLE_SECONDS
+        # How long each GIF plays in cycle mode
+        self.gifCycleSeconds = {}
+        # Per GIF path or file name, overrides cycleSeconds
+        self.timers = None
+        # TimerQueue of the current playback run, see newScheduler()
+        self.preprocessWorkers = None
+        # Threads preparing the cycle folder, None = oledcore.preparer.DEFAULT_WORKERS
+        self.lazyCycle = False
+        # Prepare cycle GIFs one at a time with prefetch, instead of keeping the whole folder in memory
+        self.cycleMemoryBudget = DEFAULT_MEMORY_BUDGET
+        self.maxInFlight = 0
+        # game_event posts sent without waiting for the Engine's reply, 0 = wait for every reply
+        self.sender = None
+        self.adaptiveRate = True
+        # Slow down sends and skip frames when game_event round trips show the Engine falling behind
+        self.rateControl = None
+        self.lengthMillis = None
+        # length-millis currently bound for the event
+
+        self.encodedFrameCount = 0
+        self.encodedBytes = 0
+        self.encodeSeconds = 0
+        self.cachedSends = 0
+        # Pre-serialized payload stats, see payloadStats()
+        self.dedupStats = {}
+        # Per GIF path, frames before and after deduplication
+        self.frameCache = None
+        # Optional FrameCache of processed GIFs, set up by the GUI
+        self.timeToFirstFrame = None
+        self.telemetry = PlaybackTelemetry()
+        # Live frame rate, latencies, drops and errors of the send path, see telemetry.snapshot()
 
         self.registerGame()
         self.bindGameEvent()
@@ -45,10 +86,14 @@ class OLED_GIF:
     def registerGame(self):
         #Registers the game with SSE3
         data = {"game": self.game, "game_display_name": self.game_display_name, "developer": "TaleXVI"}
-        requests.post(f'{self.sseAddress}/game_metadata', json=data)
+        self.transport.post('game_metadata', data)
 
-    def bindGameEvent(self):
+    def bindGameEvent(self, lengthMillis=None):
         #Binds an event for the OLED display
+        #lengthMillis is how long the Engine shows a frame, rate control raises it when sends slow down
+        if lengthMillis is None:
+            lengthMillis = (self.frameDelaySeconds * 1000) + 50
+        self.lengthMillis = lengthMillis
         data = {
             "game": self.game,
             "event": self.event,
@@ -58,89 +103,276 @@ class OLED_GIF:
                 "mode": "screen",
                 "zone": "one",
                 "datas": [{
-                    "length-millis": (self.frameDelaySeconds * 1000) + 50,
+                    "length-millis": lengthMillis,
                     "has-text": False,
                     "image-data": [0]
                 }]
                 }]
         }
-        requests.post(f'{self.sseAddress}/bind_game_event', json=data)
+        self.transport.post('bind_game_event', data)
+
+    #########################################################################
+
+    def encodeFrame(self, bitmap):
+        #Builds the full game_event request body for a frame
+        return encodeGameEvent(self.game, self.event, {"image-data-128x52": bitmap})
+
+    def encodeFrames(self, gif_frames):
+        #Encodes processed frames once so every replay only writes bytes
+        #Each frame becomes a (normal, inverted) pair of bodies, so toggling invert never re-encodes
+        #A send writes one of the two, so payloadStats only counts the normal body's time and bytes
+        encoded_frames = []
+        for bitmap in gif_frames:
+            start = time.perf_counter()
+            normal = self.encodeFrame(bitmap)
+            self.encodeSeconds += time.perf_counter() - start
+            self.encodedBytes += len(normal)
+            encoded_frames.append((normal, self.encodeFrame(invertBitmap(bitmap))))
+        self.encodedFrameCount += len(encoded_frames)
+        return encoded_frames
+
+    def payloadStats(self):
+        #Encoding each frame once saves its encode time on every later send
+        encodeSecondsPerFrame = self.encodeSeconds / self.encodedFrameCount if self.encodedFrameCount else 0
+        return {
+            "frames": self.encodedFrameCount,
+            "bytes": self.encodedBytes,
+            "bytes_per_frame": self.encodedBytes / self.encodedFrameCount if self.encodedFrameCount else 0,
+            "sends": self.cachedSends,
+            "seconds_saved_per_frame": encodeSecondsPerFrame,
+            "seconds_saved": encodeSecondsPerFrame * self.cachedSends
+        }
 
     #########################################################################
 
-    def sendFrame(self, bitmap):
+    def sendFrame(self, frame):
         #Sends the GIF frame to the OLED screen
+        #Takes a body pair from encodeFrames, a single body, or a raw 832 byte bitmap
+        if isinstance(frame, tuple):
+            frame = frame[1 if self.invert else 0]
+            self.cachedSends += 1
+        elif isinstance(frame, bytes):
+            self.cachedSends += 1
+        else:
+            frame = self.encodeFrame(frame)
+
+        start = time.perf_counter()
+        sender = self.sender
+        if sender is not None:
+            # Replies and their errors are recorded by the sender as they come in
+            if not sender.submit(frame):
+                return
+        else:
+            response = self.transport.postBody('game_event', frame)
+            elapsed = time.perf_counter() - start
+            if response is None:
+                self.telemetry.recordError("Engine unreachable")
+            elif response.status_code != 200:
+                self.telemetry.recordError(f"Engine replied {response.status_code}")
+            if self.rateControl:
+                if response is None:
+                    self.rateControl.recordFailure()
+                else:
+                    self.rateControl.recordRoundTrip(elapsed, response.status_code == 200)
+        self.telemetry.recordSend(time.perf_counter() - start, 1, len(frame))
+
+        if self.rateControl:
+            lengthMillis = self.rateControl.rebindLength()
+            if lengthMillis:
+                self.bindGameEvent(lengthMillis)
+
+    def openSender(self, token):
+        # Pipelines frame posts for one playback run when maxInFlight is set
+        if self.maxInFlight:
+            from oledcore.asyncsender import PipelinedSender # asyncio is only loaded when pipelining is on
+            sender = PipelinedSender(self.transport.sseAddress, 'game_event', self.maxInFlight,
+                                     telemetry=self.telemetry, rateControl=self.rateControl)
+            self.sender = sender
+            # Cancelling the run cancels posts still in flight and unblocks a loop waiting on a full window.
+            # The cancel may come from the Tk thread, so it doesn't wait; closeSender does, on the playback thread.
+            token.onCancel(lambda: sender.close(wait=False))
+        return self.sender
+
+    def closeSender(self, sender):
+        # Closes the sender of one run, which may no longer be the player's current one
+        if sender is not None:
+            sender.close()
+            print(f"Pipelined sends: {sender.stats()}")
+            if self.sender is sender:
+                self.sender = None
+        if self.rateControl:
+            print(f"Rate control: {self.rateControl.stats()}")
 
-        data = {
-            "game": self.game,
-            "event": self.event,
-            "data": {
-                "frame": {
-                    "image-data-128x52": bitmap
-                }
-            }
-        }
-        requests.post(f'{self.sseAddress}/game_event', json=data)
+    #########################################################################
+
+    def prepareGIF(self, gif_path, frameStore=None, token=None):
+        # A cancelled token stops decoding and returns no frames
+        prepared = collectFrames(self.iterPreparedGIF(gif_path, frameStore), token)
+        return [frame for frame, _ in prepared], [duration for _, duration in prepared]
+
+    def iterPreparedGIF(self, gif_path, frameStore=None):
+        # Yields (encoded frame, duration) as each frame is decoded, so playback can start early
+        if frameStore is None:
+            frameStore = FrameStore()
+
+        cacheKey = self.frameCacheKey(gif_path)
+        if cacheKey:
+            cached = self.frameCache.load(cacheKey)
+            if cached is not None:
+                for groups, duration in cached:
+                    yield frameStore.intern(tuple(groups[0])), duration
+                return
+
+        decodedCount = 0
+        def countDecoded(frames):
+            nonlocal decodedCount
+            for frame in frames:
+                decodedCount += 1
+                yield frame
+
+        sharedBefore = frameStore.shared
+        prepared = []
+        # Frames are decoded in normal polarity; the inverted twin is encoded alongside it
+        for bitmap, duration in iterMergeHolds(countDecoded(iterGIF(gif_path, 0))):
+            frame = frameStore.intern(self.encodeFrames([bitmap])[0])
+            prepared.append((frame, duration))
+            yield frame, duration
+
+        self.dedupStats[gif_path] = dedupStats(gif_path, decodedCount, len(prepared), frameStore.shared - sharedBefore)
+        if cacheKey and prepared:
+            self.frameCache.save(cacheKey, [([list(frame)], duration) for frame, duration in prepared])
+
+    def frameCacheKey(self, gif_path):
+        if not self.frameCache:
+            return None
+        params = {"pipeline": "gamesense", "encoder": ENCODER_VERSION,
+                  "game": self.game, "event": self.event}
+        try:
+            return self.frameCache.key(gif_path, params)
+        except OSError as e:
+            print(f"Could not hash {gif_path} for the frame cache: {e}")
+            return None
+
+    def newScheduler(self, token):
+        # Also starts a fresh RateController for the run, which the sender reports round trips to,
+        # and the TimerQueue that frame waits, GIF rotation and cancelling the run all go through
+        self.rateControl = None
+        if self.adaptiveRate:
+            self.rateControl = RateController(self.frameDelaySeconds, boundLengthMillis=self.lengthMillis)
+        self.timers = TimerQueue()
+        token.onCancel(self.timers.stop)
+        self.scheduler = FrameScheduler(self.playbackSpeed, self.frameDelaySeconds, telemetry=self.telemetry,
+                                        rateControl=self.rateControl, timers=self.timers)
+        return self.scheduler
+
+    def cycleSecondsFor(self, gif_path):
+        seconds = self.gifCycleSeconds.get(gif_path)
+        if seconds is None:
+            seconds = self.gifCycleSeconds.get(os.path.basename(gif_path), self.cycleSeconds)
+        return seconds
+
+    def applyPreferences(self, preferences):
+        # Playback tuning from preferences.json, checked by oledcore.daemon.playbackPreferences.
+        # Settings left out keep their current value.
+        self.lazyCycle = preferences.get("lazy_cycle", self.lazyCycle)
+        if "cycle_memory_mb" in preferences:
+            self.cycleMemoryBudget = int(preferences["cycle_memory_mb"] * 1024 * 1024)
+        self.cycleSeconds = preferences.get("cycle_seconds", self.cycleSeconds)
+        self.gifCycleSeconds = dict(preferences.get("gif_cycle_seconds", self.gifCycleSeconds))
+        self.maxInFlight = preferences.get("max_in_flight", self.maxInFlight)
 
     #########################################################################
 
     def playGIF(self, gif_path):
-        gif_frames = processGIF(gif_path, self.invert)
-        time.sleep(0.1)
-        while self.running:
-            for frame in gif_frames:
-                if (not self.running):
+        # The first loop plays frames as they are decoded, later loops replay the full buffer
+        token = self.cancelToken
+        startTime = time.perf_counter()
+        self.timeToFirstFrame = None
+        buffer = FrameBuffer(self.iterPreparedGIF(gif_path), token)
+        scheduler = self.newScheduler(token)
+        sender = self.openSender(token)
+        self.telemetry.start()
+        try:
+            while not token.cancelled:
+                for index in scheduler.frames(buffer.durations(scheduler.resync, lambda: token.cancelled)):
+                    if token.cancelled:
+                        break
+                    self.sendFrame(buffer.frames[index])
+                    if self.timeToFirstFrame is None:
+                        self.timeToFirstFrame = time.perf_counter() - startTime
+                        print(f"Time to first frame: {self.timeToFirstFrame * 1000:.1f}ms")
+                if buffer.done and not buffer.frames:
                     break
-                self.sendFrame(frame)
-                time.sleep(self.frameDelaySeconds)
+        finally:
+            self.telemetry.stop()
+            self.closeSender(sender)
 
     #########################################################################
 
     def playGIFCycle(self, gif_paths):
-        processedGIFs = []
-        for path in gif_paths:
-            processedGIFs.append(processGIF(path, self.invert))
-        
-        self.gif_start_event = Event()
-        self.next_gif_event = Event()
-        timer_thread = Thread(target=self.incrementTimer, args=(len(processedGIFs),))
-        timer_thread.start()
-
-        while self.running:
-                self.gif_start_event.set()
-                self.next_gif_event.clear()
-
-                while not self.next_gif_event.is_set():
-                    for frame in processedGIFs[self.currentGIF]:
-                        if (not self.running):
-                            self.next_gif_event.set()
+        token = self.cancelToken
+        gif_paths = list(gif_paths)
+        frameStore = FrameStore()
+        # Shared by every GIF in the cycle, so repeated frames are only stored once
+        def prepareCycleGIF(path):
+            gif_frames, durations = self.prepareGIF(path, frameStore, token)
+            return (gif_frames, durations) if gif_frames else None
+
+        if self.lazyCycle:
+            # Only the playing GIF and the next one are kept, so frames can't be shared across the folder
+            frameStore = None
+            sizeOf = lambda prepared: sum(len(normal) + len(inverted) for normal, inverted in prepared[0])
+            processedGIFs = LazyPreparer(prepareCycleGIF, gif_paths, self.cycleMemoryBudget, sizeOf)
+        else:
+            # GIFs are prepared in parallel, playback starts with whichever is ready first
+            processedGIFs = ParallelPreparer(prepareCycleGIF, gif_paths, self.preprocessWorkers)
+        # A stop drops GIFs not started yet, the token ends those being prepared
+        token.onCancel(processedGIFs.shutdown)
+        scheduler = self.newScheduler(token)
+        timers = scheduler.timers
+        sender = self.openSender(token)
+        self.telemetry.start()
+        try:
+            self.currentGIF = processedGIFs.waitForFirst(lambda: token.cancelled)
+            if self.currentGIF is None:
+                return
+
+            while not token.cancelled:
+                gif_frames, durations = processedGIFs.get(self.currentGIF)
+                timers.schedule(ROTATE_TIMER, self.cycleSecondsFor(gif_paths[self.currentGIF]))
+                scheduler.restart()
+                # The rotation timer ends the frames at the next frame or cuts its wait short, so the next GIF
+                # starts right away instead of after the current one finishes its loop
+                while not token.cancelled and not timers.consume(ROTATE_TIMER):
+                    for index in scheduler.frames(durations):
+                        if token.cancelled:
                             break
-                        self.sendFrame(frame)
-                        time.sleep(self.frameDelaySeconds)
-        
-    def incrementTimer(self, length):
-        while self.running:
-            if (not self.running):
-                break
-            
-            self.gif_start_event.wait()
-            self.gif_start_event.clear()
-
-            # Manual Timer Required
-            start_time = time.time()
-            while self.running and (time.time() - start_time < 20):
-                if not self.running:
-                    break
-                time.sleep(0.1)
+                        self.sendFrame(gif_frames[index])
 
-            if (self.running):
-                self.next_gif_event.set()
-                self.currentGIF = (self.currentGIF + 1) % length
+                self.currentGIF = processedGIFs.nextReady(self.currentGIF)
+        finally:
+            self.telemetry.stop()
+            processedGIFs.shutdown()
+            self.closeSender(sender)
 
     #########################################################################
 
+    @property
+    def running(self):
+        # False once the current run's CancelToken is cancelled
+        return not self.cancelToken.cancelled
+
+    @running.setter
+    def running(self, value):
+        # True hands the next run a fresh token; a loop still finishing keeps its cancelled one
+        if value:
+            self.cancelToken = CancelToken()
+        else:
+            self.cancelToken.cancel()
+
     def stopGIF(self):
-        self.running = False
+        # Also wakes the playback thread from its wait for the next frame
+        self.cancelToken.cancel()
 
     #########################################################################
 
@@ -149,7 +381,7 @@ class OLED_GIF:
         data = {
             "game": self.game
         }
-        requests.post(f'{self.sseAddress}/remove_game', json=data)
+        self.transport.post('remove_game', data)
 
 
     def removeGameEvent(self):
@@ -158,44 +390,45 @@ class OLED_GIF:
             "game": self.game,
             "event": self.event
         }
-        requests.post(f'{self.sseAddress}/remove_game', json=data)    
+        self.transport.post('remove_game', data)    
 
 
 #############################################################################
 
-def processGIF(gif_path, invert):
-    gif = cv2.VideoCapture(gif_path)
-    gif_frames = []
-    method = cv2.THRESH_BINARY_INV if invert else cv2.THRESH_BINARY
-
-    while True:
-        success,frame = gif.read()
-        if not success:
-            break
-
-        
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        frame = cv2.resize(frame, (128, 52), interpolation=cv2.INTER_CUBIC)
-        _, frame = cv2.threshold(frame, 128, 1, method)
-        
+# oledcore.pipeline turns GIF frames into 128x52 bitmaps. It brings in numpy, PIL and cv2,
+# so it is only imported once a GIF has to be decoded; GIFs in the frame cache play without it.
 
-        bytemap = [0] * 832
-        index = 0
-
-        for y in range(52):
-            byte = 0
-            for x in range(128):
-                pixel = int(frame[y,x])
-                byte |= (pixel << (7 - (x % 8)))
-                if (x + 1) % 8 == 0:
-                    bytemap[index] = byte
-                    index += 1
-                    byte = 0
-
-        gif_frames.append(bytemap)
-
-    gif.release()
-    return gif_frames
+def processGIF(gif_path, invert):
+    import numpy as np
+    thresholded_frames = list(thresholdGIF(gif_path, invert))
+    if not thresholded_frames:
+        return []
+    return packFrames(np.stack(thresholded_frames))
+
+def iterGIF(gif_path, invert):
+    # Yields (bitmap, duration) for each frame as soon as it is decoded
+    from oledcore.pipeline import iterFramePixels
+    encoder = frameEncoder()
+    for frame, duration in iterFramePixels(gif_path, encoder):
+        yield encoder.encode(~frame if invert else frame), duration
+
+def thresholdGIF(gif_path, invert):
+    # Yields each frame as (52, 128) lit pixels
+    from oledcore.pipeline import iterFramePixels
+    for frame, _ in iterFramePixels(gif_path, frameEncoder()):
+        yield ~frame if invert else frame
+
+def frameEncoder():
+    from oledcore.pipeline import getEncoder
+    return getEncoder("gamesense")
+
+def invertBitmap(bitmap):
+    # Flips every pixel of a packed bitmap, same result as thresholding with THRESH_BINARY_INV
+    return [255 - byte for byte in bitmap]
+
+def packFrames(frames):
+    # Packs a (frames, 52, 128) stack of lit pixels into 832-byte bitmaps
+    return frameEncoder().encodeStack(frames)
 
 #############################################################################
 #####                             GUI CODE                              #####
@@ -205,7 +438,7 @@ class GUI:
     def __init__(self, root, gif_player):
         self.root = root
         root.title("OLED GIF Display")
-        root.geometry("325x240")
+        root.geometry("325x265")
     
         if hasattr(sys, '_MEIPASS'):
             self.icon_path = os.path.join(sys._MEIPASS, "oled_gif.ico")
@@ -215,10 +448,17 @@ class GUI:
         root.iconbitmap(self.icon_path)
 
         self.gif_player = gif_player
+        self.remote = isinstance(gif_player, RemotePlayer)
+        # A daemon is already playing, this window only sends it commands
+        self.playback = PlaybackController(gif_player)
+        # Owns the one playback thread; Start, Stop, Invert and Browse all go through it
         
         documents_folder = os.path.expanduser("~\\Documents")
         self.game_dac_folder = os.path.join(documents_folder, "GameDAC GIF Display")
         self.pref_file_path = os.path.join(self.game_dac_folder, "preferences.json")
+        self.startupArguments = None
+        # Arguments this window last wrote to the startup shortcut, see add_to_startup
+        self.gif_player.frameCache = FrameCache(os.path.join(self.game_dac_folder, "Frame Cache"))
 
         #####################################################################
 
@@ -226,6 +466,13 @@ class GUI:
         self.icon = pystray.Icon("oled_gif", Image.open(self.icon_path), menu=Menu(MenuItem("Show", self.show_window), MenuItem("Quit", self.quit)))
         self.icon.run_detached()
 
+        # Telemetry #
+        self.metricsWriter = None
+        if not self.remote:
+            # The daemon writes its own
+            self.metricsWriter = MetricsWriter(self.gif_player.telemetry, os.path.join(self.game_dac_folder, "metrics.json")).start()
+        self.updateTooltip()
+
         # Window Behavior #
         root.protocol("WM_DELETE_WINDOW", self.quit)
         root.bind("<Unmap>", self.to_tray)
@@ -302,6 +549,15 @@ class GUI:
         self.checkStart = tk.Checkbutton(options_frame, text="Run on Startup", variable=self.startVar, command=self.savePreferences)
         self.checkStart.pack(side=tk.RIGHT, padx=5)
 
+        # Headless Frame
+        headless_frame = tk.Frame(root)
+        headless_frame.pack(after=options_frame)
+
+        # Start Headless Checkbox
+        self.headlessVar = tk.BooleanVar()
+        self.checkHeadless = tk.Checkbutton(headless_frame, text="Run on Startup without the window", variable=self.headlessVar, command=self.savePreferences)
+        self.checkHeadless.pack(side=tk.LEFT, padx=5)
+
 
         # Check Loaded GIF / Settings #
         self.loadPreferences()
@@ -332,13 +588,11 @@ class GUI:
         if (self.cycleVar.get()):
             self.startCycle()
         elif (self.gif_path):
-            self.gif_player.running = True
             self.start_button.config(state=tk.DISABLED)
             
             self.stop_button.config(state=tk.NORMAL)
 
-            gif_thread = Thread(target=self.gif_player.playGIF, args=(self.gif_path,))
-            gif_thread.start()
+            self.playback.play(self.gif_path)
 
     def startCycle(self):
         count = 0
@@ -354,31 +608,30 @@ class GUI:
             notif_thread = Thread(target=self.tempText, args=(self.gif_label, notif, "red"))
             notif_thread.start()
         else:
-            self.gif_player.running = True
             self.start_button.config(state=tk.DISABLED)
 
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Playing...", fg="green")
 
-            cycle_thread = Thread(target=self.gif_player.playGIFCycle, args=(gif_paths,))
-            cycle_thread.start()
+            self.playback.cycle(gif_paths)
 
 
     def stopGIF(self):
-        self.gif_player.stopGIF()
+        # Doesn't wait for the playback thread, it ends on its own once its run is cancelled
+        self.playback.stop(wait=False)
         self.stop_button.config(state=tk.DISABLED)
         self.start_button.config(state=tk.NORMAL)
         self.status_label.config(text=f"Stopped", fg="red")
 
     def invertColors(self):
-        self.gif_player.stopGIF()
-        time.sleep(0.2)
+        # Frames carry both polarities, so a playing GIF picks up the change on its next frame
         if (self.gif_player.invert):
             self.gif_player.invert = 0
         else:
             self.gif_player.invert = 1
         self.savePreferences()
-        self.startGIF()
+        if (self.stop_button.cget("state") == tk.DISABLED):
+            self.startGIF()
 
     def cycleToggle(self):
         self.stopGIF()
@@ -409,7 +662,7 @@ class GUI:
     def browseGIF(self):
         file_path = filedialog.askopenfilename(filetypes=[("GIF files", "*.gif")])
         if file_path:
-            self.gif_player.stopGIF()
+            self.playback.stop(wait=False)
             self.gif_path = file_path
             self.gif_label.config(text=f"Using {os.path.basename(file_path)}", fg="black")
             self.status_label.config(text="Waiting...", fg="black")
@@ -453,13 +706,19 @@ class GUI:
         else:
             gifPath = self.gif_path
 
-        data = {
+        data = {}
+        if os.path.exists(self.pref_file_path):
+            with open(self.pref_file_path) as file:
+                # The window has no controls for the playback tuning, so it is kept as saved
+                data = playbackPreferences(json.load(file))
+        data.update({
             "start_min": self.minVar.get(),
             "startup": self.startVar.get(),
             "saved_gif": gifPath,
             "inverted": self.gif_player.invert,
-            "cycle": self.cycleVar.get()
-        }
+            "cycle": self.cycleVar.get(),
+            "startup_headless": self.headlessVar.get()
+        })
 
         with open(self.pref_file_path, "w") as file:
             json.dump(data, file, indent=4)
@@ -478,11 +737,14 @@ class GUI:
                 self.gif_path = data.get("saved_gif")
                 self.gif_player.invert = data.get("inverted")
                 self.cycleVar.set(data.get("cycle"))
+                self.headlessVar.set(bool(data.get("startup_headless")))
+                self.gif_player.applyPreferences(playbackPreferences(data))
         else:
             self.minVar.set(False)
             self.startVar.set(False)
             self.gif_path = None
             self.cycleVar.set(False)
+            self.headlessVar.set(False)
 
     #########################################################################
 
@@ -494,25 +756,44 @@ class GUI:
         self.root.deiconify()
         self.root.lift()
 
+    def updateTooltip(self):
+        # Hovering the tray icon shows the live frame rate, and warns when the display falls behind
+        self.icon.title = f"OLED GIF - {self.gif_player.telemetry.summary()}"[:127]
+        self.root.after(1000, self.updateTooltip)
+
     def quit(self):
         self.icon.stop()
-        self.stopGIF()
+        if self.metricsWriter:
+            self.metricsWriter.stop()
+        if not self.remote:
+            # Closing the window of a daemon leaves it playing
+            self.stopGIF()
         self.root.quit()
 
     def add_to_startup(self):
+        # The Windows shell modules are only needed here, not to start the program
+        import winshell
+        from win32com.client import Dispatch
         startup_folder = winshell.startup()
         shortcut_path = os.path.join(startup_folder, "OLED_GIF.lnk")
-        if not (os.path.exists(shortcut_path)):
-            target = sys.executable
-
-            shell = Dispatch("WScript.Shell")
-            shortcut = shell.CreateShortcut(shortcut_path)
-            shortcut.TargetPath = target
-            shortcut.WorkingDirectory = os.path.dirname(target)
-            shortcut.IconLocation = self.icon_path
-            shortcut.Save()
+        arguments = "--daemon" if self.headlessVar.get() else ""
+        # Headless boots straight into the daemon, the window can be opened later as its client
+        if os.path.exists(shortcut_path) and self.startupArguments == arguments:
+            return
+        # Written once per run even if it exists, so a shortcut made before headless was toggled is updated
+        target = sys.executable
+
+        shell = Dispatch("WScript.Shell")
+        shortcut = shell.CreateShortcut(shortcut_path)
+        shortcut.TargetPath = target
+        shortcut.Arguments = arguments
+        shortcut.WorkingDirectory = os.path.dirname(target)
+        shortcut.IconLocation = self.icon_path
+        shortcut.Save()
+        self.startupArguments = arguments
 
     def remove_from_startup(self):
+        import winshell
         startup_folder = winshell.startup()
         shortcut_path = os.path.join(startup_folder, "OLED_GIF.lnk")
         if (os.path.exists(shortcut_path)):
@@ -521,6 +802,23 @@ class GUI:
 #############################################################################
 
 if __name__ == "__main__":
+    if "--daemon" in sys.argv:
+        # Headless: only the player, controlled through oledcore.daemon, none of the GUI modules
+        from oledcore.daemon import runDaemon, appFolder
+        player = OLED_GIF()
+        player.frameCache = FrameCache(os.path.join(appFolder(), "Frame Cache"))
+        runDaemon(player)
+        sys.exit()
+
+    # GUI modules are only imported by the app itself,
+    # so the player and its pipeline can be imported headless (see benchmarks/)
+    from PIL import Image
+    from oledcore.daemon import RemotePlayer, playbackPreferences
+    import tkinter as tk
+    from tkinter import filedialog
+    import pystray
+    from pystray import Menu, MenuItem
+
     root = tk.Tk()
-    gui = GUI(root,OLED_GIF())
+    gui = GUI(root, RemotePlayer.connect() or OLED_GIF())
     root.mainloop()
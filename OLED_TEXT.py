@@ -1,17 +1,26 @@
-import json
 import sys
 import time
-import requests
+import argparse
+from oledcore.gamesense import EngineTransport, readEngineAddress, encodeGameEvent
 from os import getenv
 
+TEXT_LENGTH_MILLIS = 2000
+# How long a message stays on screen after its last frame
+
 class OLED_GIF:
-    def __init__(self):
-        corePropsPath = r"C:\ProgramData\SteelSeries\GG\coreProps.json"
-        self.sseAddress = f'http://{json.load(open(corePropsPath))["address"]}'
+    def __init__(self, corePropsPath=None, localRender=True, fontPath=None, fontSize=None):
+        self.sseAddress = readEngineAddress(corePropsPath)
+        self.transport = EngineTransport(self.sseAddress)
         self.game = "OLED_TEXT"
         self.game_display_name = 'Display OLED Text'
         self.event = "DISPLAY"
         # self.frame_delay = 0.1  # 100ms per frame (adjust as needed)
+        self.localRender = localRender
+        # Rasterise messages here, for fonts and scrolling, instead of sending them as custom-text
+        self.fontPath = fontPath
+        self.fontSize = fontSize
+        self.display = None
+        # oledcore.textrender.TextDisplay, started with the first message
         
         self.registerGame()
         self.bindGameEvent()
@@ -19,10 +28,30 @@ class OLED_GIF:
     def registerGame(self):
         #Registers the game with SSE3
         data = {"game": self.game, "game_display_name": self.game_display_name, "developer": "TaleXVI"}
-        requests.post(f'{self.sseAddress}/game_metadata', json=data)
+        self.transport.post('game_metadata', data)
 
     def bindGameEvent(self):
         #Binds an event for the OLED display
+        if self.localRender:
+            # Same 128x52 bitmap handler as OLED_GIF
+            data = {
+                "game": self.game,
+                "event": self.event,
+                "value_optional": True,
+                "handlers": [{
+                    "device-type": "screened-128x52",
+                    "mode": "screen",
+                    "zone": "one",
+                    "datas": [{
+                        "length-millis": TEXT_LENGTH_MILLIS,
+                        "has-text": False,
+                        "image-data": [0]
+                    }]
+                    }]
+            }
+            self.transport.post('bind_game_event', data)
+            return
+
         data = {
             "game": self.game,
             "event": self.event,
@@ -34,15 +63,20 @@ class OLED_GIF:
                 "datas": [{
                     "has-text": True,
                     "context-frame-key": "custom-text",
-                    "length-millis": 2000
+                    "length-millis": TEXT_LENGTH_MILLIS
                 }]
                 }]
         }
-        requests.post(f'{self.sseAddress}/bind_game_event', json=data)
+        self.transport.post('bind_game_event', data)
 
 
     def displayText(self, text):
         #Sends the text to the OLED screen
+        if self.localRender:
+            # Returns straight away, the display thread sends the newest message at its next frame
+            self.textDisplay().show(text)
+            return
+
         data = {
             "game": self.game,
             "event": self.event,
@@ -52,12 +86,35 @@ class OLED_GIF:
                 }
             }
         }
-        response = requests.post(f'{self.sseAddress}/game_event', json=data)
-        if response.status_code == 200:
+        response = self.transport.post('game_event', data)
+        if response is None:
+            print("Failed to display text: Engine unreachable")
+        elif response.status_code == 200:
             print("Okay")
         else:
             print(f"Failed to display text: {response.status_code}, {response.text}")
 
+    def textDisplay(self):
+        if self.display is None:
+            # PIL and numpy are only loaded once the first message is rendered
+            from oledcore.textrender import TextRenderer, TextDisplay, DEFAULT_FONT_SIZE
+            renderer = TextRenderer(self.fontPath, self.fontSize or DEFAULT_FONT_SIZE)
+            self.display = TextDisplay(self.sendFrame, renderer).start()
+        return self.display
+
+    def sendFrame(self, bitmap):
+        #Sends a rendered 128x52 bitmap
+        body = encodeGameEvent(self.game, self.event, {"image-data-128x52": bitmap})
+        response = self.transport.postBody('game_event', body)
+        if response is None:
+            print("Failed to display text: Engine unreachable")
+        elif response.status_code != 200:
+            print(f"Failed to display text: {response.status_code}, {response.text}")
+
+    def stopDisplay(self):
+        if self.display is not None:
+            self.display.stop()
+
 
 
     def removeGame(self):
@@ -65,7 +122,7 @@ class OLED_GIF:
         data = {
             "game": self.game
         }
-        requests.post(f'{self.sseAddress}/remove_game', json=data)
+        self.transport.post('remove_game', data)
 
 
     def removeGameEvent(self):
@@ -74,17 +131,24 @@ class OLED_GIF:
             "game": self.game,
             "event": self.event
         }
-        requests.post(f'{self.sseAddress}/remove_game', json=data)    
+        self.transport.post('remove_game', data)    
 
 if __name__ == "__main__":
-    GIFPlayer = OLED_GIF()
-    GIFPlayer.bindGameEvent()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--font", help="TrueType font file, the default is Pillow's built-in font")
+    parser.add_argument("--font-size", type=int)
+    parser.add_argument("--engine-text", action="store_true", help="send custom-text for the Engine to draw instead")
+    args = parser.parse_args()
+
+    GIFPlayer = OLED_GIF(localRender=not args.engine_text, fontPath=args.font, fontSize=args.font_size)
 
     while True:
         text = input("Display Message: ")
         if (text == "Exit"):
+            GIFPlayer.stopDisplay()
             sys.exit(0)
         elif (text == "REMOVE"):
+            GIFPlayer.stopDisplay()
             GIFPlayer.removeGameEvent()
             GIFPlayer.removeGame()
             sys.exit(0)
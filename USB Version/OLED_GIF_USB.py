@@ -1,18 +1,24 @@
 import os
 import sys
-import winshell
-from win32com.client import Dispatch
 
-import hid # For USB HID communication
-from PIL import Image, ImageSequence, ImageDraw, ImageFont
+import numpy as np
 import json
 import time
-from threading import Thread, Event
-
-import tkinter as tk
-from tkinter import filedialog
-import pystray
-from pystray import Menu, MenuItem
+from collections import namedtuple
+from threading import Thread, Lock
+
+# Shared player code lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from oledcore.scheduler import FrameScheduler, TimerQueue, CYCLE_SECONDS, ROTATE_TIMER
+from oledcore.dedup import FrameStore, iterMergeHolds, dedupStats
+from oledcore.framebuffer import FrameBuffer, collectFrames
+from oledcore.preparer import ParallelPreparer
+from oledcore.lazycycle import LazyPreparer, DEFAULT_MEMORY_BUDGET
+from oledcore.framecache import FrameCache
+from oledcore.usbdevice import HidTransport, REPORT_HEADER_SIZE
+from oledcore.telemetry import PlaybackTelemetry, MetricsWriter
+from oledcore.playback import CancelToken, PlaybackController
+from oledcore.overlay import StatusCache, StatusOverlay
 
 #############################################################################
 #####                             USB/GIF CODE                          #####
@@ -24,23 +30,94 @@ SCREEN_WIDTH = 128
 SCREEN_HEIGHT = 64
 SCREEN_REPORT_SPLIT_SZ = 64
 REPORT_SIZE = 1024
+ENCODER_VERSION = 2
+# Bump whenever preprocess_gif_reports output changes, so cached frames are rebuilt
+INVERT_TABLE = bytes(255 - value for value in range(256))
+# Flips all 8 pixels of a report data byte, see invert_report
 
 FONT_SIZE = 16
+STATUS_LAYOUT = (SCREEN_WIDTH, SCREEN_HEIGHT)
+# Status messages are centred on the whole screen in the default font
+STATUS_FLUSH_SECONDS = 1.0
+# How long quit_connection waits for its message to reach the device
+
+# reports redraw the whole screen; delta_reports only redraw what changed since the previous frame
+ReportFrame = namedtuple("ReportFrame", ["reports", "delta_reports", "duration"])
+
+def report_frames_size(report_frames):
+    # Bytes held by a GIF's reports, counting delta reports that reuse the full reports once
+    size = 0
+    for frame in report_frames:
+        size += sum(len(report) for report in frame.reports)
+        if frame.delta_reports is not frame.reports:
+            size += sum(len(report) for report in frame.delta_reports)
+    return size
+
+def invert_report(report):
+    # Flips every pixel a draw report carries, leaving the header and padding alone.
+    # Reports are stored in normal polarity and inverted on the way out, so toggling
+    # invert never has to re-decode the GIF.
+    pixel_count = report[4] * report[5]
+    full_bytes, spare_bits = divmod(pixel_count, 8)
+    data_end = REPORT_HEADER_SIZE + full_bytes
+    inverted = report[:REPORT_HEADER_SIZE] + report[REPORT_HEADER_SIZE:data_end].translate(INVERT_TABLE)
+    if spare_bits:
+        # Pixels are packed least significant bit first, so only the low bits of the last byte are used
+        inverted += bytes((report[data_end] ^ ((1 << spare_bits) - 1),))
+        data_end += 1
+    return inverted + report[data_end:]
 
 class OLED_GIF:
-    def __init__(self):
+    def __init__(self, connect=True, transport=None):
+        self.transport = transport or HidTransport(VENDOR_ID, PRODUCT_IDS)
+        # Finds and opens the screen, oledcore.usbdevice.FakeHidTransport stands in for one
         self.device = None
-        self.running = True
+        self._encoder = None
+        self.cancel_token = CancelToken()
+        # Cancels the current playback run, see running
+        self.send_lock = Lock()
+        # One frame's reports at a time, so a run finishing its last send can't interleave with the next run
+        self.screen_generation = 0
+        # Counts screen writes other than playback frames (status messages, send_image_to_display), so
+        # playback knows its last frame was drawn over and partial updates can't go on top of it
         self.frameDelaySeconds = 0.04
+        # Minimum time between frames, GIF frame durations are used on top of this
+        self.playbackSpeed = 1.0
+        self.scheduler = None
         self.invert = 0
         self.currentGIF = 0
-
-        self.connect_device()
+        self.cycle_seconds = CYCLE_SECONDS
+        # How long each GIF plays in cycle mode
+        self.gif_cycle_seconds = {}
+        # Per GIF path or file name, overrides cycle_seconds
+        self.timers = None
+        # TimerQueue of the current playback run, see newScheduler()
+        self.delta_savings = {}
+        # Per GIF path, reports/bytes saved per loop by partial updates
+        self.dedup_stats = {}
+        # Per GIF path, frames before and after deduplication
+        self.frame_cache = None
+        # Optional FrameCache of processed GIFs, set up by the GUI
+        self.time_to_first_frame = None
+        self.preprocess_workers = None
+        # Threads preparing the cycle folder, None = oledcore.preparer.DEFAULT_WORKERS
+        self.lazy_cycle = False
+        # Prepare cycle GIFs one at a time with prefetch, instead of keeping the whole folder in memory
+        self.cycle_memory_budget = DEFAULT_MEMORY_BUDGET
+        self.telemetry = PlaybackTelemetry()
+        # Live frame rate, latencies, drops and errors of the send path, see telemetry.snapshot()
+        self._status_font = None
+        self.status_cache = StatusCache(self._render_status_reports)
+        self.status_overlay = StatusOverlay(self.status_cache, self._send_status_reports, STATUS_LAYOUT)
+        # Shows display_error_message messages, each drawn and encoded once
+
+        if connect:
+            self.connect_device()
 
     #########################################################################
 
     def connect_device(self):
-        # Attempts to find and open the SteelSeries device via USB HID
+        # Attempts to find and open the SteelSeries device through the transport
         if self.device:
             try:
                 self.device.close()
@@ -48,220 +125,368 @@ class OLED_GIF:
                 pass
             self.device = None
 
-        for device_dict in hid.enumerate(VENDOR_ID):
-            if device_dict['product_id'] in PRODUCT_IDS:
-                print(f"Found potential device: VID={hex(device_dict['vendor_id'])}, "
-                      f"PID={hex(device_dict['product_id'])}, "
-                      f"Path={device_dict['path'].decode()}, "
-                      f"Interface={device_dict['interface_number']}")
-                if device_dict['interface_number'] == 4 or device_dict['interface_number'] == -1:
-                    try:
-                        h = hid.device()
-                        h.open_path(device_dict['path'])
-                        prod_string = h.get_product_string()
-                        mfg_string = h.get_manufacturer_string()
-                        print(f"Successfully opened: {prod_string} / {mfg_string}")
-                        self.device = h
-                        return True
-                    except Exception as e:
-                        print(f"Could not open device {device_dict['path'].decode()}: {e}")
-                        if h:
-                            h.close()
-        print("Compatible USB device not found.")
-        return False
+        self.device = self.transport.open()
+        return self.device is not None
 
     #########################################################################
 
+    @property
+    def encoder(self):
+        # oledcore.pipeline turns GIF frames into draw reports. It brings in PIL,
+        # so it is only imported once something has to be drawn, not to start the program.
+        if self._encoder is None:
+            from oledcore.pipeline import getEncoder
+            self._encoder = getEncoder("usb")
+        return self._encoder
+
     def _create_draw_report(self, bitmap_segment, dst_x_on_screen, dst_y_on_screen):
+        pixels = np.asarray(bitmap_segment) > 0
+        if self.invert:
+            pixels = ~pixels
+        return self._pack_draw_report(pixels, dst_x_on_screen, dst_y_on_screen)
 
-        seg_w = bitmap_segment.width
-        seg_h = bitmap_segment.height
+    def _pack_draw_report(self, pixels, dst_x_on_screen, dst_y_on_screen):
+        # pixels is a (height, width) bool array of the pixels to light up,
+        # with inversion already applied
+        return self.encoder.packDrawReport(pixels, dst_x_on_screen, dst_y_on_screen)
 
-        report = bytearray(REPORT_SIZE)
-        report[0] = 0x06  # HID Report ID
-        report[1] = 0x93  # Command ID for drawing
-        report[2] = dst_x_on_screen & 0xFF
-        report[3] = dst_y_on_screen & 0xFF
-        report[4] = seg_w & 0xFF
-        report[5] = seg_h & 0xFF
+    #########################################################################
 
-        stride_h = seg_h
+    def _pil_frame_to_reports(self, pil_frame):
+        if pil_frame.width != SCREEN_WIDTH or pil_frame.height != SCREEN_HEIGHT:
+            pil_frame = pil_frame.resize((SCREEN_WIDTH, SCREEN_HEIGHT)).convert('1')
 
-        for x_in_seg in range(seg_w):
-            for y_in_seg in range(seg_h):
-                pixel_value_in_pil_image = bitmap_segment.getpixel((x_in_seg, y_in_seg))
-                
-                is_foreground_pixel = pixel_value_in_pil_image > 0 
+        pixels = self._frame_pixels(pil_frame)
+        if self.invert:
+            pixels = ~pixels
+        return self._pixels_to_reports(pixels)
 
-                pixel_is_on_in_report = is_foreground_pixel if not self.invert else not is_foreground_pixel
+    def _frame_pixels(self, pil_frame):
+        # Threshold the whole frame once, in normal polarity
+        return np.asarray(pil_frame) > 0
 
-                if pixel_is_on_in_report:
-                    ri = x_in_seg * stride_h + y_in_seg
-                    byte_index_in_report_data = ri // 8
-                    bit_index_in_byte = ri % 8
-                    report[6 + byte_index_in_report_data] |= (1 << bit_index_in_byte)
-        return bytes(report)
+    def _pixels_to_reports(self, pixels):
+        # One report per SCREEN_REPORT_SPLIT_SZ wide column of the screen
+        return self.encoder.encode(pixels)
 
     #########################################################################
 
-    def _pil_frame_to_reports(self, pil_frame):
-        if pil_frame.width != SCREEN_WIDTH or pil_frame.height != SCREEN_HEIGHT:
-            pil_frame = pil_frame.resize((SCREEN_WIDTH, SCREEN_HEIGHT)).convert('1')
+    def _delta_reports(self, previous_pixels, pixels, full_reports):
+        # Redraws only the bounding rectangle of the pixels that changed.
+        # A report is the same size however little it draws, so the count of reports is the cost.
+        changed = previous_pixels != pixels
+        if not changed.any():
+            return ()
 
-        bitmap_segment1 = pil_frame.crop((0, 0, SCREEN_REPORT_SPLIT_SZ, SCREEN_HEIGHT))
-        report1_bytes = self._create_draw_report(bitmap_segment1, 0, 0)
-        
-        report2_bytes = None
-        if SCREEN_WIDTH > SCREEN_REPORT_SPLIT_SZ:
-            bitmap_segment2 = pil_frame.crop((SCREEN_REPORT_SPLIT_SZ, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
-            report2_bytes = self._create_draw_report(bitmap_segment2, SCREEN_REPORT_SPLIT_SZ, 0)
-        
-        return (report1_bytes, report2_bytes)
+        rect = self._changed_rect(changed, 0)
+        if rect[2] - rect[0] <= SCREEN_REPORT_SPLIT_SZ:
+            return (self._rect_report(pixels, rect),)
+
+        delta_reports = []
+        for split_x in range(0, SCREEN_WIDTH, SCREEN_REPORT_SPLIT_SZ):
+            changed_split = changed[:, split_x:split_x + SCREEN_REPORT_SPLIT_SZ]
+            if changed_split.any():
+                delta_reports.append(self._rect_report(pixels, self._changed_rect(changed_split, split_x)))
+
+        if len(delta_reports) >= len(full_reports):
+            return full_reports
+        return tuple(delta_reports)
+
+    def _changed_rect(self, changed, offset_x):
+        columns = np.flatnonzero(changed.any(axis=0))
+        rows = np.flatnonzero(changed.any(axis=1))
+        return (offset_x + columns[0], rows[0], offset_x + columns[-1] + 1, rows[-1] + 1)
+
+    def _rect_report(self, pixels, rect):
+        x0, y0, x1, y1 = rect
+        return self._pack_draw_report(pixels[y0:y1, x0:x1], x0, y0)
 
     #########################################################################
 
-    def preprocess_gif_reports(self, gif_path):
+    def preprocess_gif_reports(self, gif_path, frame_store=None, token=None):
+        # A cancelled token stops decoding and returns no frames
+        return [frame for frame, _ in collectFrames(self.iter_gif_reports(gif_path, frame_store), token)]
+
+    def iter_gif_reports(self, gif_path, frame_store=None):
+        # Yields (ReportFrame, duration) as each frame is decoded, so playback can start early.
+        # Frame 0 is diffed against the last frame, for when the GIF loops; until the last frame
+        # is known it carries its full reports as its delta, and the returned list fixes it up.
+        if frame_store is None:
+            frame_store = FrameStore()
+
+        cache_key = self._frame_cache_key(gif_path)
+        if cache_key:
+            cached = self.frame_cache.load(cache_key)
+            if cached is not None:
+                for report_frame in self._cached_report_frames(gif_path, cached, frame_store):
+                    yield report_frame, report_frame.duration
+                return
+
+        from oledcore.pipeline import iterFramePixels
+        decoded_count = 0
+        def decode_frames():
+            # Decode and dither errors are reported by the pipeline, which then stops early
+            nonlocal decoded_count
+            for pixels, duration in iterFramePixels(gif_path, self.encoder):
+                decoded_count += 1
+                yield (pixels, self._pixels_to_reports(pixels)), duration
+
+        # Identical consecutive frames become one frame held for the whole run
+        shared_before = frame_store.shared
+        frames_pixels = []
         processed_reports_for_gif = []
-        try:
-            with Image.open(gif_path) as img:
-                for frame_pil_raw in ImageSequence.Iterator(img):
-                    frame_rgba = frame_pil_raw.convert("RGBA")
-                    bg_aware_frame = Image.new("RGBA", frame_rgba.size, (0,0,0,255))
-                    bg_aware_frame.paste(frame_rgba, (0,0), frame_rgba)
-                    resized_frame = bg_aware_frame.resize((SCREEN_WIDTH, SCREEN_HEIGHT), Image.Resampling.LANCZOS)
-                    monochrome_frame = resized_frame.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
-                    
-                    report_tuple = self._pil_frame_to_reports(monochrome_frame)
-                    processed_reports_for_gif.append(report_tuple)
-            return processed_reports_for_gif
-        except FileNotFoundError:
-            print(f"Error: GIF file not found at {gif_path}")
-            return []
-        except Exception as e:
-            print(f"Error pre-processing GIF {gif_path} into reports: {e}")
+        for (pixels, full_reports), duration in iterMergeHolds(decode_frames(), key=lambda frame: frame[1]):
+            full_reports = frame_store.intern(full_reports)
+            if frames_pixels:
+                delta_reports = self._delta_reports(frames_pixels[-1], pixels, full_reports)
+            else:
+                delta_reports = full_reports
+            frames_pixels.append(pixels)
+
+            report_frame = ReportFrame(full_reports, delta_reports, duration)
+            processed_reports_for_gif.append(report_frame)
+            yield report_frame, duration
+
+        if not processed_reports_for_gif:
             return []
 
+        first_frame = processed_reports_for_gif[0]
+        processed_reports_for_gif[0] = first_frame._replace(
+            delta_reports=self._delta_reports(frames_pixels[-1], frames_pixels[0], first_frame.reports))
+
+        self.dedup_stats[gif_path] = dedupStats(gif_path, decoded_count, len(processed_reports_for_gif),
+                                                frame_store.shared - shared_before)
+        self._record_delta_savings(gif_path, processed_reports_for_gif)
+
+        if cache_key:
+            self.frame_cache.save(cache_key, [([frame.reports, frame.delta_reports], frame.duration)
+                                              for frame in processed_reports_for_gif])
+        return [(frame, frame.duration) for frame in processed_reports_for_gif]
+
+    def _frame_cache_key(self, gif_path):
+        if not self.frame_cache:
+            return None
+        params = {"pipeline": "usb", "encoder": ENCODER_VERSION}
+        try:
+            return self.frame_cache.key(gif_path, params)
+        except OSError as e:
+            print(f"Could not hash {gif_path} for the frame cache: {e}")
+            return None
+
+    def _cached_report_frames(self, gif_path, cached, frame_store):
+        all_full_reports, _ = frame_store.internAll([tuple(groups[0]) for groups, _ in cached])
+        report_frames = [ReportFrame(full_reports, tuple(groups[1]), duration)
+                         for full_reports, (groups, duration) in zip(all_full_reports, cached)]
+        self._record_delta_savings(gif_path, report_frames)
+        return report_frames
+
+    def _record_delta_savings(self, gif_path, report_frames):
+        full_reports = sum(len(frame.reports) for frame in report_frames)
+        delta_reports = sum(len(frame.delta_reports) for frame in report_frames)
+        savings = {
+            "frames": len(report_frames),
+            "skipped_frames": sum(1 for frame in report_frames if not frame.delta_reports),
+            "reports_per_loop": full_reports,
+            "delta_reports_per_loop": delta_reports,
+            "reports_saved_per_loop": full_reports - delta_reports,
+            "bytes_saved_per_loop": (full_reports - delta_reports) * REPORT_SIZE
+        }
+        self.delta_savings[gif_path] = savings
+        print(f"Partial updates for {os.path.basename(gif_path)}: {delta_reports}/{full_reports} reports per loop, "
+              f"{savings['bytes_saved_per_loop']} bytes saved, {savings['skipped_frames']} frames skipped")
+
+    def _next_reports(self, report_frames, index, last_sent_index):
+        # Partial updates are only valid on top of the frame right before this one
+        if last_sent_index is not None and last_sent_index == (index - 1) % len(report_frames):
+            return report_frames[index].delta_reports
+        return report_frames[index].reports
+
+    def _send_frame(self, report_frames, index, last_sent, invert, token=None):
+        # Sends frame index and returns the last_sent to pass with the next frame, where
+        # last_sent = (index, invert, screen_generation) of the last frame sent, None to send in full.
+        # Partial updates are only drawn on a screen still showing that frame: same polarity and nothing
+        # else written since. The check is made under send_lock, so a status message can't land between
+        # it and the send.
+        # Preprocessed reports are in normal polarity, inverted ones are flipped as they are sent.
+        # Nothing is sent once token is cancelled: a stop doesn't wait for the playback thread, and
+        # the message it shows must not be drawn over by a frame that was about to go out.
+        start = time.perf_counter()
+        with self.send_lock:
+            if token is not None and token.cancelled:
+                return last_sent
+            last_sent_index = None
+            if last_sent is not None and last_sent[1:] == (invert, self.screen_generation):
+                last_sent_index = last_sent[0]
+            reports = self._next_reports(report_frames, index, last_sent_index)
+            for report in reports:
+                self.device.send_feature_report(invert_report(report) if invert else report)
+            sent = (index, invert, self.screen_generation)
+        self.telemetry.recordSend(time.perf_counter() - start, len(reports), len(reports) * REPORT_SIZE)
+        return sent
+
         
+    def newScheduler(self, token):
+        # Frame waits, GIF rotation and cancelling the run all go through one TimerQueue per playback run
+        self.timers = TimerQueue()
+        token.onCancel(self.timers.stop)
+        self.scheduler = FrameScheduler(self.playbackSpeed, self.frameDelaySeconds, telemetry=self.telemetry,
+                                        timers=self.timers)
+        return self.scheduler
+
+    def cycle_seconds_for(self, gif_path):
+        seconds = self.gif_cycle_seconds.get(gif_path)
+        if seconds is None:
+            seconds = self.gif_cycle_seconds.get(os.path.basename(gif_path), self.cycle_seconds)
+        return seconds
+
+    def applyPreferences(self, preferences):
+        # Playback tuning from preferences.json, checked by oledcore.daemon.playbackPreferences.
+        # Settings left out keep their current value; max_in_flight is GameSense only.
+        self.lazy_cycle = preferences.get("lazy_cycle", self.lazy_cycle)
+        if "cycle_memory_mb" in preferences:
+            self.cycle_memory_budget = int(preferences["cycle_memory_mb"] * 1024 * 1024)
+        self.cycle_seconds = preferences.get("cycle_seconds", self.cycle_seconds)
+        self.gif_cycle_seconds = dict(preferences.get("gif_cycle_seconds", self.gif_cycle_seconds))
+
     #########################################################################
 
     def playGIF(self, gif_path):
+        # The first loop plays frames as they are decoded, later loops replay the full buffer
         print(f"Attempting to play GIF: {gif_path}")
-        preprocessed_report_frames = self.preprocess_gif_reports(gif_path)
-        
-        if not preprocessed_report_frames:
-            print(f"Could not process GIF into reports: {gif_path}")
-            self.display_error_message("GIF Error!", 2)
-            return
-
-        while self.running:
-            if not preprocessed_report_frames:
-                break
-            for report_tuple in preprocessed_report_frames:
-                if not self.running:
+        token = self.cancel_token
+        start_time = time.perf_counter()
+        self.time_to_first_frame = None
+        frame_buffer = FrameBuffer(self.iter_gif_reports(gif_path), token)
+        preprocessed_report_frames = frame_buffer.frames
+
+        scheduler = self.newScheduler(token)
+        last_sent = None
+        self.telemetry.start()
+        while not token.cancelled:
+            for index in scheduler.frames(frame_buffer.durations(scheduler.resync, lambda: token.cancelled)):
+                if token.cancelled:
                     break
                 
                 if not self.device:
+                    last_sent = None
                     if not self.connect_device():
                         print("Device disconnected during playback. Stopping.")
-                        self.stopGIF()
+                        self.telemetry.recordError("Device disconnected")
+                        token.cancel()
                         break
                 
-                report1, report2 = report_tuple
                 try:
-                    self.device.send_feature_report(report1)
-                    if report2:
-                        self.device.send_feature_report(report2)
+                    last_sent = self._send_frame(preprocessed_report_frames, index, last_sent, bool(self.invert),
+                                                 token)
+                    if self.time_to_first_frame is None:
+                        self.time_to_first_frame = time.perf_counter() - start_time
+                        print(f"Time to first frame: {self.time_to_first_frame * 1000:.1f}ms")
                 except Exception as e:
                     print(f"Error sending pre-processed report to USB device: {e}")
+                    self.telemetry.recordError(e)
+                    last_sent = None
                     self.quit_connection()
                     break 
-                
-                time.sleep(self.frameDelaySeconds)
             
-            if not self.running:
+            if frame_buffer.done and not preprocessed_report_frames:
+                print(f"Could not process GIF into reports: {gif_path}")
+                self.display_error_message("GIF Error!", 2)
                 break
+        self.telemetry.stop()
 
     #########################################################################
 
     def playGIFCycle(self, gif_paths):
         print("Starting GIF cycle...")
-        all_gifs_report_data = [] 
-        for path in gif_paths:
-            reports_for_one_gif = self.preprocess_gif_reports(path)
-            if reports_for_one_gif:
-                all_gifs_report_data.append(reports_for_one_gif)
-            else:
+        token = self.cancel_token
+        gif_paths = list(gif_paths)
+        frame_store = FrameStore()
+        # Shared by every GIF in the cycle, so repeated frames are only stored once
+        def prepare_cycle_gif(path):
+            reports_for_one_gif = self.preprocess_gif_reports(path, frame_store, token)
+            if not reports_for_one_gif and not token.cancelled:
                 print(f"Skipping {path} in cycle due to pre-processing error.")
+            return reports_for_one_gif
 
-        if not all_gifs_report_data:
-            print("No valid GIFs to cycle after pre-processing.")
-            self.display_error_message("No GIFs!", 2)
+        if self.lazy_cycle:
+            # Only the playing GIF and the next one are kept, so frames can't be shared across the folder
+            frame_store = None
+            all_gifs_report_data = LazyPreparer(prepare_cycle_gif, gif_paths, self.cycle_memory_budget,
+                                                report_frames_size)
+        else:
+            # GIFs are prepared in parallel, playback starts with whichever is ready first
+            all_gifs_report_data = ParallelPreparer(prepare_cycle_gif, gif_paths, self.preprocess_workers)
+        # A stop drops GIFs not started yet, the token ends those being prepared
+        token.onCancel(all_gifs_report_data.shutdown)
+        self.telemetry.start()
+        try:
+            self._play_prepared_cycle(all_gifs_report_data, gif_paths, token)
+        finally:
+            self.telemetry.stop()
+            all_gifs_report_data.shutdown()
+
+    def _play_prepared_cycle(self, all_gifs_report_data, gif_paths, token):
+        self.currentGIF = all_gifs_report_data.waitForFirst(lambda: token.cancelled)
+        if self.currentGIF is None:
+            if not token.cancelled:
+                print("No valid GIFs to cycle after pre-processing.")
+                self.display_error_message("No GIFs!", 2)
             return
 
-        self.gif_start_event = Event()
-        self.next_gif_event = Event()
-        
-        timer_thread = Thread(target=self.incrementTimer, args=(len(all_gifs_report_data),))
-        timer_thread.daemon = True
-        timer_thread.start()
-
-        while self.running:
-            self.gif_start_event.set() 
-            self.next_gif_event.clear()
-
-            while not self.next_gif_event.is_set() and self.running:
-                for report_tuple in all_gifs_report_data[self.currentGIF]:
-                    if not self.running:
-                        self.next_gif_event.set()
+        scheduler = self.newScheduler(token)
+        timers = scheduler.timers
+        while not token.cancelled:
+            # A different GIF is on screen, so start it with a full frame
+            last_sent = None
+
+            gif_report_frames = all_gifs_report_data.get(self.currentGIF)
+            durations = [frame.duration for frame in gif_report_frames]
+            timers.schedule(ROTATE_TIMER, self.cycle_seconds_for(gif_paths[self.currentGIF]))
+            scheduler.restart()
+            # The rotation timer ends the frames at the next frame or cuts its wait short, so the next GIF
+            # starts right away instead of after the current one finishes its loop
+            while not token.cancelled and not timers.consume(ROTATE_TIMER):
+                for index in scheduler.frames(durations):
+                    if token.cancelled:
                         break
                     
                     if not self.device:
+                        last_sent = None
                         if not self.connect_device():
                             print("Device disconnected during cycle playback. Stopping.")
-                            self.stopGIF()
+                            self.telemetry.recordError("Device disconnected")
+                            token.cancel()
                             break
                     
-                    report1, report2 = report_tuple
                     try:
-                        self.device.send_feature_report(report1)
-                        if report2:
-                            self.device.send_feature_report(report2)
+                        last_sent = self._send_frame(gif_report_frames, index, last_sent, bool(self.invert), token)
                     except Exception as e:
                         print(f"Error sending pre-processed report in cycle: {e}")
+                        self.telemetry.recordError(e)
                         self.device = None
-                        self.stopGIF()
+                        token.cancel()
                         break 
-                    
-                    time.sleep(self.frameDelaySeconds)
-
-    #########################################################################
-
-    def incrementTimer(self, num_gifs_in_cycle):
-        while self.running:
-            if (not self.running):
-                break
 
-            self.gif_start_event.wait() 
-            self.gif_start_event.clear()
+            self.currentGIF = all_gifs_report_data.nextReady(self.currentGIF)
 
-            # Manual Timer Required 
-            start_time = time.time()
-            cycle_duration_per_gif = 20 
-            while self.running and (time.time() - start_time < cycle_duration_per_gif):
-                if not self.running:
-                    break
-                time.sleep(0.2)
+    #########################################################################
 
-            if self.running:
-                self.currentGIF = (self.currentGIF + 1) % num_gifs_in_cycle
-                self.next_gif_event.set() 
-            else:
-                break
+    @property
+    def running(self):
+        # False once the current run's CancelToken is cancelled
+        return not self.cancel_token.cancelled
 
-    #########################################################################
+    @running.setter
+    def running(self, value):
+        # True hands the next run a fresh token; a loop still finishing keeps its cancelled one
+        if value:
+            self.cancel_token = CancelToken()
+        else:
+            self.cancel_token.cancel()
 
     def stopGIF(self):
-        self.running = False
+        # Also wakes the playback thread from its wait for the next frame
+        self.cancel_token.cancel()
 
     #########################################################################
 
@@ -272,17 +497,13 @@ class OLED_GIF:
                 print("Failed to reconnect to device.")
                 return False
         
-        if pil_image.width != SCREEN_WIDTH or pil_image.height != SCREEN_HEIGHT:
-            pil_image = pil_image.resize((SCREEN_WIDTH, SCREEN_HEIGHT)).convert('1')
+        reports = self._pil_frame_to_reports(pil_image)
 
         try:
-            bitmap_segment1 = pil_image.crop((0, 0, SCREEN_REPORT_SPLIT_SZ, SCREEN_HEIGHT))
-            report1 = self._create_draw_report(bitmap_segment1, 0, 0)
-            self.device.send_feature_report(report1)
-
-            bitmap_segment2 = pil_image.crop((SCREEN_REPORT_SPLIT_SZ, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
-            report2 = self._create_draw_report(bitmap_segment2, SCREEN_REPORT_SPLIT_SZ, 0)
-            self.device.send_feature_report(report2)
+            with self.send_lock:
+                self.screen_generation += 1
+                for report in reports:
+                    self.device.send_feature_report(report)
             return True
         except Exception as e:
             print(f"Error sending frame to USB device: {e}")
@@ -292,17 +513,23 @@ class OLED_GIF:
     #########################################################################
 
     def display_error_message(self, message_text, timer):
-        error_thread = Thread(target=self.display_error_helper, args=(message_text, timer), daemon=True)
-        error_thread.start()
-
-    def display_error_helper(self, message_text, timer):
-        if not self.device:
-            if not self.connect_device():
-                return 
-
-        font = ImageFont.load_default()
-
-        image = Image.new('1', (SCREEN_WIDTH, SCREEN_HEIGHT), color=0) 
+        # Returns straight away; the overlay thread shows the message, then clears it after timer seconds
+        self.status_overlay.show(message_text, timer, bool(self.invert))
+
+    def cancel_pending_message(self):
+        # Called as playback starts, so a message's clear can't blank the screen under the first frames
+        self.status_overlay.cancelPending()
+
+    def _render_status_reports(self, message_text, layout, invert):
+        # Builds the reports of a status message for status_cache, centred on a layout = (width, height)
+        # screen. The empty message is the blank clear screen.
+        from PIL import Image, ImageDraw, ImageFont
+        if self._status_font is None:
+            self._status_font = ImageFont.load_default()
+        font = self._status_font
+        width, height = layout
+
+        image = Image.new('1', (width, height), color=0) 
         draw = ImageDraw.Draw(image)
         
         try:
@@ -312,19 +539,31 @@ class OLED_GIF:
         except AttributeError: 
             text_width, text_height = draw.textsize(message_text, font=font)
 
-        x = (SCREEN_WIDTH - text_width) // 2
-        y = (SCREEN_HEIGHT - text_height) // 2
+        x = (width - text_width) // 2
+        y = (height - text_height) // 2
         draw.text((x, y), message_text, font=font, fill=1) 
 
-        self.send_image_to_display(image)
+        pixels = self._frame_pixels(image)
+        if invert:
+            pixels = ~pixels
+        return self._pixels_to_reports(pixels)
+
+    def _send_status_reports(self, reports):
+        if not self.device:
+            if not self.connect_device():
+                return False
 
-        if (timer):
-            time.sleep(timer)
-            original_invert_state = self.invert
-            self.invert = False 
-            black_screen_img = Image.new('1', (SCREEN_WIDTH, SCREEN_HEIGHT), color=0) 
-            self.send_image_to_display(black_screen_img)
-            self.invert = original_invert_state
+        try:
+            with self.send_lock:
+                # Counted before sending, a message that fails half way has still drawn over the frame
+                self.screen_generation += 1
+                for report in reports:
+                    self.device.send_feature_report(report)
+            return True
+        except Exception as e:
+            print(f"Error sending status message to USB device: {e}")
+            self.device = None 
+            return False
 
     #########################################################################
 
@@ -332,9 +571,9 @@ class OLED_GIF:
         if self.device:
             try:
                 self.display_error_message("Spin Dial To Reset ->", 0)
+                self.status_overlay.flush(STATUS_FLUSH_SECONDS)
             except Exception as e:
                 print(f"Error closing device: {e}")
-            time.sleep(0.1)
             self.device = None
 
 #############################################################################
@@ -345,7 +584,7 @@ class GUI:
     def __init__(self, root, gif_player):
         self.root = root
         root.title("OLED GIF Display (USB)")
-        root.geometry("325x270") 
+        root.geometry("325x295") 
 
         if hasattr(sys, '_MEIPASS'): 
             self.icon_path = os.path.join(sys._MEIPASS, "oled_gif.ico")
@@ -360,17 +599,31 @@ class GUI:
             self.tray_icon_image = None 
 
         self.gif_player = gif_player 
+        self.remote = isinstance(gif_player, RemotePlayer)
+        # A daemon is already playing, this window only sends it commands
+        self.playback = PlaybackController(gif_player)
+        # Owns the one playback thread; Start, Stop, Invert and Browse all go through it
 
         # Location for saving preferences
         documents_folder = os.path.expanduser("~\\Documents")
         self.game_dac_folder = os.path.join(documents_folder, "GameDAC GIF Display")
         self.pref_file_path = os.path.join(self.game_dac_folder, "preferences.json")
+        self.startup_arguments = None
+        # Arguments this window last wrote to the startup shortcut, see add_to_startup
+        self.gif_player.frame_cache = FrameCache(os.path.join(self.game_dac_folder, "Frame Cache"))
 
         # Establish Icon
         ico_menu = Menu(MenuItem("Show", self.show_window), MenuItem("Quit", self.quit))
         self.icon = pystray.Icon("oled_gif", self.tray_icon_image, "OLED GIF", menu=ico_menu)
         self.icon.run_detached()
 
+        # Telemetry
+        self.metrics_writer = None
+        if not self.remote:
+            # The daemon writes its own
+            self.metrics_writer = MetricsWriter(self.gif_player.telemetry, os.path.join(self.game_dac_folder, "metrics.json")).start()
+        self.update_tooltip()
+
         # Window Behavior #
         root.protocol("WM_DELETE_WINDOW", self.quit)
         root.bind("<Unmap>", self.to_tray)
@@ -447,6 +700,15 @@ class GUI:
         self.checkStart = tk.Checkbutton(options_frame, text="Run on Startup", variable=self.startVar, command=self.savePreferences)
         self.checkStart.pack(side=tk.RIGHT, padx=5)
 
+        # Headless Frame
+        headless_frame = tk.Frame(root)
+        headless_frame.pack(after=options_frame)
+
+        # Start Headless Checkbox
+        self.headlessVar = tk.BooleanVar()
+        self.checkHeadless = tk.Checkbutton(headless_frame, text="Run on Startup without the window", variable=self.headlessVar, command=self.savePreferences)
+        self.checkHeadless.pack(side=tk.LEFT, padx=5)
+
 
         # Check Loaded GIF / Settings #
         self.loadPreferences()
@@ -477,15 +739,14 @@ class GUI:
         if (self.cycleVar.get()):
             self.startCycle()
         elif (self.gif_path):
-            self.gif_player.running = True
             self.start_button.config(state=tk.DISABLED)
             
             self.stop_button.config(state=tk.NORMAL)
             self.invert_button.config(state=tk.NORMAL)
 
             self.status_label.config(text="Playing...", fg="green")
-            gif_thread = Thread(target=self.gif_player.playGIF, args=(self.gif_path,))
-            gif_thread.start()
+            self.gif_player.cancel_pending_message()
+            self.playback.play(self.gif_path)
 
     def startCycle(self):
         count = 0
@@ -503,33 +764,33 @@ class GUI:
             self.gif_player.display_error_message("Add GIFs!", 2)
             self.invert_button.config(state=tk.DISABLED)
         else:
-            self.gif_player.running = True
             self.start_button.config(state=tk.DISABLED)
 
             self.invert_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.NORMAL)
             self.status_label.config(text="Playing...", fg="green")
 
-            cycle_thread = Thread(target=self.gif_player.playGIFCycle, args=(gif_paths,))
-            cycle_thread.start()
+            self.gif_player.cancel_pending_message()
+            self.playback.cycle(gif_paths)
 
 
     def stopGIF(self):
-        self.gif_player.stopGIF()
+        # Doesn't wait for the playback thread; once its run is cancelled it sends nothing more
+        self.playback.stop(wait=False)
         self.stop_button.config(state=tk.DISABLED)
         self.start_button.config(state=tk.NORMAL)
         self.status_label.config(text=f"Stopped", fg="red")
         self.gif_player.display_error_message("GIF Stopped!", 2)
 
     def invertColors(self):
-        self.gif_player.stopGIF()
-        time.sleep(0.2)
+        # Reports are inverted as they are sent, so a playing GIF picks up the change on its next frame
         if (self.gif_player.invert):
             self.gif_player.invert = 0
         else:
             self.gif_player.invert = 1
         self.savePreferences()
-        self.startGIF()
+        if (self.stop_button.cget("state") == tk.DISABLED):
+            self.startGIF()
 
     def cycleToggle(self):
         self.stopGIF()
@@ -558,7 +819,7 @@ class GUI:
         wasRun = self.gif_player.running
         file_path = filedialog.askopenfilename(filetypes=[("GIF files", "*.gif")])
         if file_path:
-            self.gif_player.stopGIF()
+            self.playback.stop(wait=False)
             if (not wasRun):
                 self.gif_player.display_error_message("New GIF Selected!", 1)
             self.gif_path = file_path
@@ -607,13 +868,19 @@ class GUI:
         else:
             gifPath = self.gif_path
 
-        data = {
+        data = {}
+        if os.path.exists(self.pref_file_path):
+            with open(self.pref_file_path) as file:
+                # The window has no controls for the playback tuning, so it is kept as saved
+                data = playbackPreferences(json.load(file))
+        data.update({
             "start_min": self.minVar.get(),
             "startup": self.startVar.get(),
             "saved_gif": gifPath,
             "inverted": self.gif_player.invert,
-            "cycle": self.cycleVar.get()
-        }
+            "cycle": self.cycleVar.get(),
+            "startup_headless": self.headlessVar.get()
+        })
 
         with open(self.pref_file_path, "w") as file:
             json.dump(data, file, indent=4)
@@ -632,11 +899,14 @@ class GUI:
                 self.gif_path = data.get("saved_gif")
                 self.gif_player.invert = data.get("inverted")
                 self.cycleVar.set(data.get("cycle"))
+                self.headlessVar.set(bool(data.get("startup_headless")))
+                self.gif_player.applyPreferences(playbackPreferences(data))
         else:
             self.minVar.set(False)
             self.startVar.set(False)
             self.gif_path = None
             self.cycleVar.set(False)
+            self.headlessVar.set(False)
 
     #########################################################################
 
@@ -648,34 +918,70 @@ class GUI:
         self.root.deiconify()
         self.root.lift()
 
+    def update_tooltip(self):
+        # Hovering the tray icon shows the live frame rate, and warns when the display falls behind
+        self.icon.title = f"OLED GIF - {self.gif_player.telemetry.summary()}"[:127]
+        self.root.after(1000, self.update_tooltip)
+
     def quit(self):
         self.icon.stop()
-        self.gif_player.stopGIF()
-        self.gif_player.quit_connection()
+        if self.metrics_writer:
+            self.metrics_writer.stop()
+        if not self.remote:
+            # Closing the window of a daemon leaves it playing
+            self.playback.stop()
+            self.gif_player.quit_connection()
         self.root.quit()
 
     def add_to_startup(self):
+        # The Windows shell modules are only needed here, not to start the program
+        import winshell
+        from win32com.client import Dispatch
         startup_folder = winshell.startup()
         shortcut_path = os.path.join(startup_folder, "OLED_GIF_USB.lnk")
-        if not (os.path.exists(shortcut_path)):
-            target = sys.executable
-
-            shell = Dispatch("WScript.Shell")
-            shortcut = shell.CreateShortcut(shortcut_path)
-            shortcut.TargetPath = target
-            shortcut.WorkingDirectory = os.path.dirname(target)
-            shortcut.IconLocation = self.icon_path
-            shortcut.Save()
+        arguments = "--daemon" if self.headlessVar.get() else ""
+        # Headless boots straight into the daemon, the window can be opened later as its client
+        if os.path.exists(shortcut_path) and self.startup_arguments == arguments:
+            return
+        # Written once per run even if it exists, so a shortcut made before headless was toggled is updated
+        target = sys.executable
+
+        shell = Dispatch("WScript.Shell")
+        shortcut = shell.CreateShortcut(shortcut_path)
+        shortcut.TargetPath = target
+        shortcut.Arguments = arguments
+        shortcut.WorkingDirectory = os.path.dirname(target)
+        shortcut.IconLocation = self.icon_path
+        shortcut.Save()
+        self.startup_arguments = arguments
 
     def remove_from_startup(self):
+        import winshell
         startup_folder = winshell.startup()
-        shortcut_path = os.path.join(startup_folder, "OLED_GIF.lnk")
+        shortcut_path = os.path.join(startup_folder, "OLED_GIF_USB.lnk")
         if (os.path.exists(shortcut_path)):
             os.remove(shortcut_path)
 
 #############################################################################
 
 if __name__ == "__main__":
+    if "--daemon" in sys.argv:
+        # Headless: only the player, controlled through oledcore.daemon, none of the GUI modules
+        from oledcore.daemon import runDaemon, appFolder
+        player = OLED_GIF()
+        player.frame_cache = FrameCache(os.path.join(appFolder(), "Frame Cache"))
+        runDaemon(player)
+        sys.exit()
+
+    # GUI modules are only imported by the app itself,
+    # so the player and its report pipeline can be imported headless (see benchmarks/)
+    from PIL import Image
+    from oledcore.daemon import RemotePlayer, playbackPreferences
+    import tkinter as tk
+    from tkinter import filedialog
+    import pystray
+    from pystray import Menu, MenuItem
+
     root = tk.Tk()
-    gui = GUI(root,OLED_GIF())
+    gui = GUI(root, RemotePlayer.connect() or OLED_GIF())
     root.mainloop()
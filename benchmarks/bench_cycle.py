@@ -0,0 +1,208 @@
+# Plays a cycle of generated GIFs through both players into fake transports and reports how often
+# the process wakes up while playing (voluntary context switches per second) and how late each GIF
+# switch and the final stop are. GIFs loop longer than --cycle-seconds, so a switch that waits for
+# the end of a loop shows up as latency.
+#
+#   python benchmarks/bench_cycle.py [--seconds 8] [--cycle-seconds 2] [--frame-ms 250] [--send-ms 0]
+#                                    [--output report.json]
+#
+# Each player runs twice: "timer_queue" is its own playGIFCycle, "polling" is PollingCycle below, the
+# loop it replaced, on the same prepared frames and send path. --send-ms makes every send take that
+# long; above --frame-ms no frame ever has to wait for its deadline.
+#
+# Context switches come from getrusage, so this one needs Linux or macOS.
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+from threading import Thread, Event
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.scheduler import FrameScheduler
+from bench_suite import makeGIF, loadPlayers, FakeTransport, FakeDevice
+
+GIF_COUNT = 3
+FRAMES_PER_GIF = 16
+WARMUP_SECONDS = 1.0
+# Left for the GIFs to be prepared before wakeups are counted
+POLL_SECONDS = 0.1
+# How often the replaced cycle timer thread checked the time
+
+
+class PollingCycle:
+    # The cycle loop before the TimerQueue: a timer thread polls the time every POLL_SECONDS and flags
+    # the switch, and the playback loop only looks at the flag after a full loop of the current GIF.
+    # prepare(path) returns (frames, durations), send(frame) sends one of them.
+
+    def __init__(self, player, prepare, send, cycleSeconds):
+        self.player = player
+        self.prepare = prepare
+        self.send = send
+        self.cycleSeconds = cycleSeconds
+        self.stopped = Event()
+        self.timers = None
+
+    def play(self, gif_paths):
+        prepared = [self.prepare(path) for path in gif_paths]
+        scheduler = FrameScheduler(self.player.playbackSpeed, self.player.frameDelaySeconds)
+        gifStart = Event()
+        nextGIF = Event()
+        Thread(target=self.timer, args=(gifStart, nextGIF), daemon=True).start()
+
+        self.player.currentGIF = 0
+        while not self.stopped.is_set():
+            gifStart.set()
+            nextGIF.clear()
+            frames, durations = prepared[self.player.currentGIF]
+            while not nextGIF.is_set() and not self.stopped.is_set():
+                for index in scheduler.frames(durations):
+                    if self.stopped.is_set():
+                        break
+                    self.send(frames[index])
+            self.player.currentGIF = (self.player.currentGIF + 1) % len(prepared)
+
+    def timer(self, gifStart, nextGIF):
+        while not self.stopped.is_set():
+            gifStart.wait()
+            gifStart.clear()
+            start = time.time()
+            while not self.stopped.is_set() and time.time() - start < self.cycleSeconds:
+                time.sleep(POLL_SECONDS)
+            nextGIF.set()
+
+    def stopGIF(self):
+        self.stopped.set()
+
+
+def wakeups():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_nvcsw
+
+
+def switchLatencies(sends, cycleSeconds):
+    # sends is (time, GIF index) per frame; each GIF should give way cycleSeconds after its first frame
+    latencies = []
+    startedAt = sends[0][0]
+    for (_, previous), (sentAt, current) in zip(sends, sends[1:]):
+        if current != previous:
+            latencies.append(sentAt - startedAt - cycleSeconds)
+            startedAt = sentAt
+    return latencies
+
+
+def benchPlayer(player, cycle, record, gifPaths, seconds, cycleSeconds):
+    # cycle is the player itself or a PollingCycle on it
+    sends = []
+    record(lambda: sends.append((time.perf_counter(), player.currentGIF)))
+
+    thread = Thread(target=cycle.playGIFCycle if cycle is player else cycle.play, args=(gifPaths,), daemon=True)
+    with redirect_stdout(io.StringIO()):
+        thread.start()
+        time.sleep(WARMUP_SECONDS)
+        before = wakeups()
+        start = time.perf_counter()
+        time.sleep(seconds)
+        woken = wakeups() - before
+        playedSeconds = time.perf_counter() - start
+
+        stopAt = time.perf_counter()
+        cycle.stopGIF()
+        thread.join()
+        stopSeconds = time.perf_counter() - stopAt
+
+    latencies = switchLatencies(sends, cycleSeconds)
+    return {
+        "frames_sent": len(sends),
+        "wakeups_per_second": woken / playedSeconds,
+        "switches": len(latencies),
+        "switch_latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else None,
+            "max": max(latencies) * 1000 if latencies else None
+        },
+        "stop_latency_ms": stopSeconds * 1000,
+        "timer_wakeups": cycle.timers.wakeups if getattr(cycle, "timers", None) else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--cycle-seconds", type=float, default=2, help="how long each GIF plays")
+    parser.add_argument("--frame-ms", type=int, default=250, help="frame duration of the generated GIFs")
+    parser.add_argument("--send-ms", type=float, default=0, help="time each send takes")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="oled_bench_cycle_")
+    gifPaths = []
+    for index in range(GIF_COUNT):
+        path = os.path.join(folder, f"gif{index}.gif")
+        # Noise, so no two frames are merged into one longer hold
+        makeGIF(path, 128, 64, FRAMES_PER_GIF, "noise", seed=index, frameMs=args.frame_ms)
+        gifPaths.append(path)
+
+    players = loadPlayers()
+    sendSeconds = args.send_ms / 1000
+
+    def gameSense():
+        player = players["gamesense"].OLED_GIF(transport=FakeTransport())
+        player.cycleSeconds = args.cycle_seconds
+        sendFrame = player.sendFrame
+        def record(onSend):
+            def send(frame):
+                onSend()
+                if sendSeconds:
+                    time.sleep(sendSeconds)
+                return sendFrame(frame)
+            player.sendFrame = send
+        # Looked up on every send, so it goes through record's wrapper
+        polling = PollingCycle(player, player.prepareGIF, lambda frame: player.sendFrame(frame), args.cycle_seconds)
+        return player, polling, record
+
+    def usb():
+        player = players["usb"].OLED_GIF(connect=False)
+        player.device = FakeDevice()
+        player.cycle_seconds = args.cycle_seconds
+        sendFrame = player._send_frame
+        def record(onSend):
+            def send(*args):
+                onSend()
+                if sendSeconds:
+                    time.sleep(sendSeconds)
+                return sendFrame(*args)
+            player._send_frame = send
+        def prepare(path):
+            frames = player.preprocess_gif_reports(path)
+            return frames, [frame.duration for frame in frames]
+        polling = PollingCycle(player, prepare, lambda frame: player._send_frame([frame], 0, None, False),
+                               args.cycle_seconds)
+        return player, polling, record
+
+    report = {
+        "seconds": args.seconds,
+        "cycle_seconds": args.cycle_seconds,
+        "gif_loop_seconds": FRAMES_PER_GIF * args.frame_ms / 1000,
+        "frame_ms": args.frame_ms,
+        "send_ms": args.send_ms
+    }
+    for name, make in (("gamesense", gameSense), ("usb", usb)):
+        report[name] = {}
+        for path in ("timer_queue", "polling"):
+            # A fresh player per run, so the second doesn't start on the first one's telemetry
+            player, polling, record = make()
+            cycle = player if path == "timer_queue" else polling
+            report[name][path] = benchPlayer(player, cycle, record, gifPaths, args.seconds, args.cycle_seconds)
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
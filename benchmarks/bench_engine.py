@@ -0,0 +1,81 @@
+# Plays a generated GIF through OLED_GIF against the local GameSense emulator and reports what
+# the emulator saw: achieved fps, inter-frame jitter and payload sizes.
+#
+#   python benchmarks/bench_engine.py [--seconds 5] [--fps 25] [--latency-ms 2] [--jitter-ms 0]
+#                                     [--service-ms 0] [--error-rate 0] [--in-flight 0] [--fixed-rate]
+#                                     [--output report.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from threading import Thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.emulator import EngineEmulator
+from bench_suite import makeGIF, loadPlayers, joinBackgroundThreads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--fps", type=float, default=25, help="frame rate the generated GIF asks for")
+    parser.add_argument("--latency-ms", type=float, default=2)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--service-ms", type=float, default=0, help="Engine time per request, one at a time")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--in-flight", type=int, default=0, help="OLED_GIF.maxInFlight, 0 = wait for every reply")
+    parser.add_argument("--fixed-rate", action="store_true", help="turn off adaptive rate control")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="oled_bench_engine_")
+    gif_path = os.path.join(folder, "noise.gif")
+    # GIF delays are stored in 10ms steps
+    frameMs = max(int(round(1000 / args.fps / 10)) * 10, 20)
+    # Noise, so no two frames are merged into one longer hold and every frame interval should match
+    makeGIF(gif_path, 128, 52, 100, "noise", frameMs=frameMs)
+
+    emulator = EngineEmulator(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                              errorRate=args.error_rate, seed=0, serviceTime=args.service_ms / 1000).start()
+    corePropsPath = emulator.writeCoreProps(os.path.join(folder, "coreProps.json"))
+
+    module = loadPlayers()["gamesense"]
+    player = module.OLED_GIF(corePropsPath=corePropsPath)
+    player.maxInFlight = args.in_flight
+    player.adaptiveRate = not args.fixed_rate
+    thread = Thread(target=player.playGIF, args=(gif_path,))
+    thread.start()
+    time.sleep(args.seconds)
+    player.stopGIF()
+    thread.join()
+    transportStats = player.transport.stats()
+    # Closing the connection and the server lets their threads finish, so only the decoder is waited on
+    player.transport.close()
+    emulator.stop()
+    joinBackgroundThreads()
+
+    report = {
+        "target_fps": 1000 / frameMs,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "service_ms": args.service_ms,
+        "error_rate": args.error_rate,
+        "in_flight": args.in_flight,
+        "scheduler": player.scheduler.stats(),
+        "transport": transportStats,
+        "rate_control": player.rateControl.stats() if player.rateControl else None,
+        "telemetry": player.telemetry.snapshot(),
+        "engine": emulator.report()
+    }
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Compares the thread-and-sleep playback loop, which waits for every reply, against the
+# pipelined asyncio sender, using a local stand-in for the GameSense Engine.
+#
+#   python benchmarks/bench_pipelined.py [--latency-ms 5] [--service-ms 0] [--frames 300] [--fps 60]
+#
+# latency-ms delays every reply without holding up the next request, like a network round trip.
+# service-ms is time the Engine spends on each frame one after another, which caps what it can accept.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from threading import Thread
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from oledcore.gamesense import EngineTransport, encodeGameEvent
+from oledcore.scheduler import FrameScheduler
+from oledcore.asyncsender import PipelinedSender
+
+
+class StandInEngine:
+    # Minimal HTTP/1.1 server that answers requests in order, each one latency after it arrived
+
+    def __init__(self, latency, service):
+        self.latency = latency
+        self.service = service
+        self.received = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        Thread(target=self.loop.run_forever, daemon=True).start()
+
+    async def _serve(self, reader, writer):
+        replies = asyncio.Queue()
+        replier = asyncio.ensure_future(self._reply(writer, replies))
+        busyUntil = 0
+        try:
+            while True:
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+                self.received += 1
+
+                now = self.loop.time()
+                busyUntil = max(busyUntil, now) + self.service
+                await replies.put(busyUntil + self.latency)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            await replies.put(None)
+            await replier
+
+    async def _reply(self, writer, replies):
+        body = b"{}"
+        reply = b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n" + body
+        while True:
+            dueAt = await replies.get()
+            if dueAt is None:
+                break
+            await asyncio.sleep(max(dueAt - self.loop.time(), 0))
+            writer.write(reply)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                break
+        writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+def frameBodies(count):
+    return [encodeGameEvent("OLED_GIF", "DISPLAY_GIF", {"image-data-128x52": [(index + i) % 256 for i in range(832)]})
+            for index in range(count)]
+
+
+def play(send, bodies, fps):
+    # Plays bodies through a FrameScheduler the way OLED_GIF.playGIF does, or back to back without one
+    scheduler = FrameScheduler()
+    indexes = scheduler.frames([1 / fps] * len(bodies)) if fps else range(len(bodies))
+    start = time.perf_counter()
+    for index in indexes:
+        send(bodies[index])
+    seconds = time.perf_counter() - start
+    sent = scheduler.stats()["sent"] if fps else len(bodies)
+    return {
+        "sent": sent,
+        "dropped": len(bodies) - sent,
+        "seconds": round(seconds, 3),
+        "fps": round(sent / seconds, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--service-ms", type=float, default=0)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=60, help="target frame rate, 0 = as fast as possible")
+    parser.add_argument("--in-flight", type=int, default=4)
+    args = parser.parse_args()
+
+    engine = StandInEngine(args.latency_ms / 1000, args.service_ms / 1000)
+    sseAddress = f"http://127.0.0.1:{engine.port}"
+    bodies = frameBodies(args.frames)
+
+    transport = EngineTransport(sseAddress)
+    synchronous = play(lambda body: transport.postBody("game_event", body), bodies, args.fps)
+    transport.close()
+
+    sender = PipelinedSender(sseAddress, "game_event", args.in_flight)
+    pipelined = play(sender.submit, bodies, args.fps)
+    sender.flush()
+    sender.close()
+    pipelined["sender"] = sender.stats()
+    engine.close()
+
+    print(json.dumps({
+        "latency_ms": args.latency_ms,
+        "service_ms": args.service_ms,
+        "target_fps": args.fps,
+        "synchronous": synchronous,
+        "pipelined": pipelined,
+        "speedup": round(pipelined["fps"] / synchronous["fps"], 2)
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Times how long the apps take to start, each in a fresh interpreter, and checks it against a budget:
+#   - importing each script, with the heavy modules it is not allowed to load at import time
+#   - OLED_GIF.py --daemon from launch to its first frame reaching the GameSense emulator,
+#     with a cold and a warm frame cache (what "Run on Startup" costs at every login)
+#
+#   python benchmarks/bench_startup.py [--repeat 5] [--output results.json]
+#                                      [--budget benchmarks/startup_budget.json]
+#
+# Best of repeat runs is reported, to keep the disk cache and other processes out of it. The run
+# fails (exit code 1) if a metric is over budget or a script imports a module it should defer.
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.emulator import EngineEmulator
+from oledcore.daemon import ControlClient
+from bench_suite import makeGIF, checkThresholds
+
+DEFAULT_BUDGET = os.path.join(ROOT, "benchmarks", "startup_budget.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "startup.json")
+FIRST_FRAME_TIMEOUT_SECONDS = 30
+
+# name: (folder, module)
+SCRIPTS = {
+    "gamesense": (ROOT, "OLED_GIF"),
+    "usb": (os.path.join(ROOT, "USB Version"), "OLED_GIF_USB"),
+    "text": (ROOT, "OLED_TEXT")
+}
+
+DEFERRED_MODULES = ["cv2", "PIL", "numpy", "asyncio", "tkinter", "pystray", "winshell", "win32com", "hid"]
+# Only imported on the code paths that use them, never to start a script
+IMPORT_ALLOWED = {
+    "usb": ["numpy"]
+    # Delta reports and the HID transport work on numpy arrays from the first frame on
+}
+
+IMPORT_SCRIPT = """
+import sys, json, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": [name for name in sys.argv[2:] if name in sys.modules]}}))
+"""
+
+
+def measureImport(name, repeat):
+    folder, module = SCRIPTS[name]
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module), folder] + DEFERRED_MODULES,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def measureDaemonFirstFrame(home, gifPath, corePropsPath, emulator):
+    # Seconds from launching the daemon until the emulator receives its first frame
+    env = dict(os.environ, HOME=home, USERPROFILE=home, OLED_GIF_CORE_PROPS=corePropsPath)
+    emulator.reset()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "OLED_GIF.py"), "--daemon"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while not emulator.frameTimes:
+            if process.poll() is not None:
+                raise RuntimeError(f"daemon exited with code {process.returncode} before its first frame")
+            if time.perf_counter() - start > FIRST_FRAME_TIMEOUT_SECONDS:
+                raise RuntimeError("daemon sent no frame")
+            time.sleep(0.001)
+        # The emulator and this process share the same perf_counter clock
+        return emulator.frameTimes[0] - start
+    finally:
+        ControlClient(os.path.join(home, "Documents", "GameDAC GIF Display")).send("quit")
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def benchDaemon(repeat, metrics):
+    home = tempfile.mkdtemp(prefix="oled_bench_startup_")
+    emulator = EngineEmulator().start()
+    try:
+        corePropsPath = emulator.writeCoreProps(os.path.join(home, "coreProps.json"))
+        appFolder = os.path.join(home, "Documents", "GameDAC GIF Display")
+        os.makedirs(appFolder)
+        gifPath = os.path.join(home, "noise.gif")
+        makeGIF(gifPath, 640, 480, 60, "noise")
+        with open(os.path.join(appFolder, "preferences.json"), "w") as file:
+            json.dump({"saved_gif": gifPath}, file)
+
+        cold = []
+        warm = []
+        for _ in range(repeat):
+            shutil.rmtree(os.path.join(appFolder, "Frame Cache"), ignore_errors=True)
+            cold.append(measureDaemonFirstFrame(home, gifPath, corePropsPath, emulator))
+            warm.append(measureDaemonFirstFrame(home, gifPath, corePropsPath, emulator))
+        metrics["startup.gamesense.daemon_first_frame.cold.ms"] = min(cold) * 1000
+        metrics["startup.gamesense.daemon_first_frame.warm.ms"] = min(warm) * 1000
+    finally:
+        emulator.stop()
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="limits file, empty to skip")
+    args = parser.parse_args()
+
+    metrics = {}
+    regressions = []
+    loaded = {}
+    for name in SCRIPTS:
+        result = measureImport(name, args.repeat)
+        metrics[f"import.{name}.ms"] = result["seconds"] * 1000
+        loaded[name] = result["modules"]
+        for module in result["modules"]:
+            if module not in IMPORT_ALLOWED.get(name, []):
+                regressions.append(f"import.{name}: loads {module} at import time")
+    benchDaemon(args.repeat, metrics)
+
+    metrics = {metric: round(value, 2) for metric, value in sorted(metrics.items())}
+    if args.budget:
+        with open(args.budget) as file:
+            regressions += checkThresholds(metrics, json.load(file))
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "metrics": metrics,
+        "loaded_at_import": loaded,
+        "regressions": regressions
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+
+    print(json.dumps(metrics, indent=4))
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+# Times each stage of the GameSense and USB pipelines on synthetic GIFs, headless.
+# Nothing here needs tkinter, pystray, the Windows modules, a SteelSeries device or the Engine:
+# frames go to fake transports that only count what they are given.
+#
+#   python benchmarks/bench_suite.py [--quick] [--output results.json]
+#                                    [--thresholds benchmarks/thresholds.json]
+#                                    [--baseline old_results.json --tolerance 0.25]
+#
+# Results are written as JSON. The run fails (exit code 1) if a metric crosses its limit in the
+# thresholds file, or is more than tolerance worse than the same metric in a baseline run.
+# Metrics ending in _fps are better when higher, every other metric is a time and better when lower.
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import importlib.util
+from threading import Thread, enumerate as allThreads, current_thread
+from contextlib import redirect_stdout
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.framecache import FrameCache
+from oledcore.preparer import ParallelPreparer
+
+DEFAULT_THRESHOLDS = os.path.join(ROOT, "benchmarks", "thresholds.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+
+# name: (width, height, frames, motion)
+GIF_CASES = {
+    "ticker_128x52_30": (128, 52, 30, "ticker"),
+    "sprite_128x64_300": (128, 64, 300, "sprite"),
+    "sprite_320x240_60": (320, 240, 60, "sprite"),
+    "noise_640x480_60": (640, 480, 60, "noise"),
+}
+TTFF_CASE = "noise_640x480_60"
+SEND_FRAMES = 2000
+STATUS_MESSAGES = 200
+
+
+#############################################################################
+#####                           SYNTHETIC GIFS                          #####
+#############################################################################
+
+def makeGIF(path, width, height, frameCount, motion, seed=0, frameMs=40):
+    # ticker: a small box blinks on a still background, almost every pixel repeats
+    # sprite: a ball moves across a gradient, a small part of each frame changes
+    # noise:  every pixel is random on every frame, nothing repeats
+    rng = np.random.default_rng(seed)
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    radius = max(height // 6, 3)
+
+    frames = []
+    for index in range(frameCount):
+        if motion == "noise":
+            pixels = rng.integers(0, 256, (height, width), dtype=np.uint8)
+            frame = Image.fromarray(pixels, "L")
+        else:
+            frame = Image.fromarray(gradient, "L")
+            draw = ImageDraw.Draw(frame)
+            if motion == "ticker":
+                fill = 255 if index % 2 else 0
+                draw.rectangle((2, 2, 2 + radius, 2 + radius), fill=fill)
+            else:
+                x = (index * 3) % (width + 2 * radius) - radius
+                y = height // 2 + int(np.sin(index / 5) * height / 4)
+                draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=255)
+        frames.append(frame.convert("P"))
+
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=frameMs, loop=0)
+
+
+def makeCorpus(folder):
+    paths = {}
+    for name, (width, height, frameCount, motion) in GIF_CASES.items():
+        paths[name] = os.path.join(folder, name + ".gif")
+        makeGIF(paths[name], width, height, frameCount, motion)
+    return paths
+
+
+#############################################################################
+#####                          FAKE TRANSPORTS                          #####
+#############################################################################
+
+class FakeResponse:
+    status_code = 200
+
+
+class FakeTransport:
+    # Stands in for EngineTransport, accepts every post instantly
+
+    sseAddress = "http://127.0.0.1:0"
+
+    def __init__(self):
+        self.posts = 0
+        self.bytes = 0
+
+    def post(self, endpoint, json=None):
+        self.posts += 1
+        return FakeResponse
+
+    def postBody(self, endpoint, body):
+        self.posts += 1
+        self.bytes += len(body)
+        return FakeResponse
+
+
+class FakeDevice:
+    # Stands in for an open hid.device, accepts every report instantly
+
+    def __init__(self):
+        self.reports = 0
+        self.bytes = 0
+
+    def send_feature_report(self, report):
+        self.reports += 1
+        self.bytes += len(report)
+
+    def close(self):
+        pass
+
+
+#############################################################################
+#####                              HELPERS                              #####
+#############################################################################
+
+def loadPlayers():
+    # Imports both players from their scripts; the GUI and Windows modules are only imported
+    # under __main__ there, and hid only when a device is connected
+    players = {}
+    for name, path in [("gamesense", "OLED_GIF.py"), ("usb", os.path.join("USB Version", "OLED_GIF_USB.py"))]:
+        spec = importlib.util.spec_from_file_location(f"bench_{name}_player", os.path.join(ROOT, path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        players[name] = module
+    return players
+
+
+def best(function, repeat):
+    # Best wall time of repeat runs, which is the least disturbed by the rest of the machine
+    times = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def waitFor(condition, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark stage did not finish in time")
+        time.sleep(0.001)
+
+
+def joinBackgroundThreads(timeout=30):
+    # Playback leaves its decoder thread running until the GIF is fully decoded;
+    # waiting for it keeps it from timing the next stage, or dying mid-decode at exit
+    for thread in allThreads():
+        if thread is not current_thread() and thread.daemon:
+            thread.join(timeout)
+
+
+#############################################################################
+#####                              STAGES                               #####
+#############################################################################
+
+def benchGameSense(module, paths, repeat, metrics):
+    player = module.OLED_GIF(transport=FakeTransport())
+
+    for name, path in paths.items():
+        thresholded = np.stack(list(module.thresholdGIF(path, 0)))
+        frameCount = len(thresholded)
+        bitmaps = module.packFrames(thresholded)
+
+        seconds = best(lambda: list(module.thresholdGIF(path, 0)), repeat)
+        metrics[f"gamesense.decode.{name}.ms_per_frame"] = seconds / frameCount * 1000
+        seconds = best(lambda: module.packFrames(thresholded), repeat)
+        metrics[f"gamesense.pack.{name}.ms_per_frame"] = seconds / frameCount * 1000
+        seconds = best(lambda: player.encodeFrames(bitmaps), repeat)
+        metrics[f"gamesense.encode.{name}.ms_per_frame"] = seconds / frameCount * 1000
+        seconds = best(lambda: player.prepareGIF(path), repeat)
+        metrics[f"gamesense.prepare.{name}.ms_per_frame"] = seconds / frameCount * 1000
+
+        def endToEnd():
+            frames, _ = player.prepareGIF(path)
+            for frame in frames:
+                player.sendFrame(frame)
+            return len(frames)
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            sent = endToEnd()
+            metrics[f"gamesense.end_to_end.{name}_fps"] = sent / (time.perf_counter() - start)
+
+    with redirect_stdout(io.StringIO()):
+        frames, _ = player.prepareGIF(paths["sprite_128x64_300"])
+    def sendFrames():
+        for index in range(SEND_FRAMES):
+            player.sendFrame(frames[index % len(frames)])
+    metrics["gamesense.send_fps"] = SEND_FRAMES / best(sendFrames, repeat)
+
+
+def benchUSB(module, paths, repeat, metrics):
+    player = module.OLED_GIF(connect=False)
+    player.device = FakeDevice()
+
+    for name, path in paths.items():
+        with redirect_stdout(io.StringIO()):
+            frameCount = len(player.preprocess_gif_reports(path))
+        seconds = best(lambda: player.preprocess_gif_reports(path), repeat)
+        metrics[f"usb.preprocess.{name}.ms_per_frame"] = seconds / frameCount * 1000
+
+    segment = np.random.default_rng(0).integers(0, 2, (module.SCREEN_HEIGHT, module.SCREEN_REPORT_SPLIT_SZ))
+    seconds = best(lambda: [player._create_draw_report(segment, 0, 0) for _ in range(1000)], repeat)
+    metrics["usb.draw_report.us_per_report"] = seconds / 1000 * 1e6
+    report = player._create_draw_report(segment, 0, 0)
+    seconds = best(lambda: [module.invert_report(report) for _ in range(1000)], repeat)
+    metrics["usb.invert_report.us_per_report"] = seconds / 1000 * 1e6
+
+    def showStatus():
+        # Cached after the first, so this is the send and the hand-off to the overlay thread
+        for _ in range(STATUS_MESSAGES):
+            player.display_error_message("GIF Stopped!", 0)
+            player.status_overlay.flush()
+    seconds = best(showStatus, repeat)
+    metrics["usb.status_message.us"] = seconds / STATUS_MESSAGES * 1e6
+    player.status_overlay.stop()
+
+    with redirect_stdout(io.StringIO()):
+        report_frames = player.preprocess_gif_reports(paths["sprite_128x64_300"])
+    for invert in (False, True):
+        def sendFrames():
+            last_sent = None
+            for count in range(SEND_FRAMES):
+                last_sent = player._send_frame(report_frames, count % len(report_frames), last_sent, invert)
+        metrics[f"usb.send{'_inverted' if invert else ''}_fps"] = SEND_FRAMES / best(sendFrames, repeat)
+
+
+def benchFrameCache(module, paths, repeat, metrics):
+    # Cold runs decode and write the cache entry, warm runs only read it back
+    player = module.OLED_GIF(transport=FakeTransport())
+    folder = tempfile.mkdtemp(prefix="oled_bench_cache_")
+    try:
+        for name in ("sprite_320x240_60", "noise_640x480_60"):
+            path = paths[name]
+            def cold():
+                player.frameCache = FrameCache(folder)
+                shutil.rmtree(folder, ignore_errors=True)
+                player.prepareGIF(path)
+            metrics[f"cache.cold.{name}.ms"] = best(cold, repeat) * 1000
+            metrics[f"cache.warm.{name}.ms"] = best(lambda: player.prepareGIF(path), repeat) * 1000
+    finally:
+        player.frameCache = None
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def benchCycleWorkers(module, paths, repeat, metrics):
+    # Time to prepare the whole corpus as a cycle folder with 1, 2 and 4 worker threads
+    player = module.OLED_GIF(transport=FakeTransport())
+    gif_paths = list(paths.values())
+    for workers in (1, 2, 4):
+        def prepareAll():
+            preparer = ParallelPreparer(player.prepareGIF, gif_paths, workers)
+            preparer.executor.shutdown(wait=True)
+        metrics[f"cycle.prepare_all.workers_{workers}.ms"] = best(prepareAll, repeat) * 1000
+
+
+def benchTimeToFirstFrame(players, paths, repeat, metrics):
+    # Playback starts while the rest of the GIF is still decoding, so this stays low for big GIFs
+    path = paths[TTFF_CASE]
+
+    def gamesense():
+        player = players["gamesense"].OLED_GIF(transport=FakeTransport())
+        thread = Thread(target=player.playGIF, args=(path,))
+        thread.start()
+        waitFor(lambda: player.timeToFirstFrame is not None)
+        player.stopGIF()
+        thread.join()
+        joinBackgroundThreads()
+        return player.timeToFirstFrame
+
+    def usb():
+        player = players["usb"].OLED_GIF(connect=False)
+        player.device = FakeDevice()
+        thread = Thread(target=player.playGIF, args=(path,))
+        thread.start()
+        waitFor(lambda: player.time_to_first_frame is not None)
+        player.stopGIF()
+        thread.join()
+        joinBackgroundThreads()
+        return player.time_to_first_frame
+
+    for name, play in (("gamesense", gamesense), ("usb", usb)):
+        results = []
+        for _ in range(repeat):
+            with redirect_stdout(io.StringIO()):
+                results.append(play())
+        metrics[f"{name}.time_to_first_frame.{TTFF_CASE}.ms"] = min(results) * 1000
+
+
+#############################################################################
+#####                            REGRESSIONS                            #####
+#############################################################################
+
+def higherIsBetter(metric):
+    return metric.endswith("_fps")
+
+
+def checkThresholds(metrics, thresholds):
+    regressions = []
+    for metric, limits in thresholds.items():
+        if metric not in metrics:
+            regressions.append(f"{metric}: missing from results")
+            continue
+        value = metrics[metric]
+        if "max" in limits and value > limits["max"]:
+            regressions.append(f"{metric}: {value:.3f} is above the limit of {limits['max']}")
+        if "min" in limits and value < limits["min"]:
+            regressions.append(f"{metric}: {value:.3f} is below the limit of {limits['min']}")
+    return regressions
+
+
+def checkBaseline(metrics, baseline, tolerance):
+    regressions = []
+    for metric, old in baseline.items():
+        if metric not in metrics or not old:
+            continue
+        change = metrics[metric] / old - 1
+        if higherIsBetter(metric):
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{metric}: {change * 100:.0f}% worse than baseline ({old:.3f} -> {metrics[metric]:.3f})")
+    return regressions
+
+
+#############################################################################
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="time every stage once instead of three times")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="limits file, empty to skip")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    repeat = 1 if args.quick else 3
+
+    players = loadPlayers()
+    folder = tempfile.mkdtemp(prefix="oled_bench_gifs_")
+    metrics = {}
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            paths = makeCorpus(folder)
+        stages = [
+            ("gamesense", lambda: benchGameSense(players["gamesense"], paths, repeat, metrics)),
+            ("usb", lambda: benchUSB(players["usb"], paths, repeat, metrics)),
+            ("frame cache", lambda: benchFrameCache(players["gamesense"], paths, repeat, metrics)),
+            ("cycle workers", lambda: benchCycleWorkers(players["gamesense"], paths, repeat, metrics)),
+            ("time to first frame", lambda: benchTimeToFirstFrame(players, paths, repeat, metrics)),
+        ]
+        for name, stage in stages:
+            stageStart = time.perf_counter()
+            stage()
+            print(f"Benchmarked {name} in {time.perf_counter() - stageStart:.1f}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    metrics = {metric: round(value, 4) for metric, value in sorted(metrics.items())}
+    regressions = []
+    if args.thresholds:
+        with open(args.thresholds) as file:
+            regressions += checkThresholds(metrics, json.load(file))
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions += checkBaseline(metrics, json.load(file)["metrics"], args.tolerance)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "seconds": round(time.perf_counter() - start, 1),
+        "cases": {name: dict(zip(("width", "height", "frames", "motion"), case)) for name, case in GIF_CASES.items()},
+        "metrics": metrics,
+        "regressions": regressions
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+
+    print(json.dumps(metrics, indent=4))
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
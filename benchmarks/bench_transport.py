@@ -0,0 +1,73 @@
+# Compares frame posts through a bare requests.post against the keep-alive
+# EngineTransport, using a local stand-in for the GameSense Engine.
+#
+#   python benchmarks/bench_transport.py [frames]
+
+import os
+import sys
+import time
+import json
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from oledcore.gamesense import EngineTransport
+
+
+class StandInEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def frameData(index):
+    bitmap = [(index + i) % 256 for i in range(832)]
+    return {"game": "OLED_GIF", "event": "DISPLAY_GIF", "data": {"frame": {"image-data-128x52": bitmap}}}
+
+
+def run(post, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        post(frameData(i))
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInEngineHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    sseAddress = f"http://127.0.0.1:{server.server_address[1]}"
+
+    bareFps = run(lambda data: requests.post(f"{sseAddress}/game_event", json=data), frames)
+
+    transport = EngineTransport(sseAddress)
+    pooledFps = run(lambda data: transport.post("game_event", data), frames)
+    stats = transport.stats()
+    transport.close()
+    server.shutdown()
+
+    print(json.dumps({
+        "frames": frames,
+        "bare_fps": round(bareFps, 1),
+        "keepalive_fps": round(pooledFps, 1),
+        "speedup": round(pooledFps / bareFps, 2),
+        "transport": stats
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
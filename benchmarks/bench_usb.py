@@ -0,0 +1,105 @@
+# Plays a generated GIF through the USB player into the fake OLED device, no hardware needed,
+# and reports reports/bytes per second. It also replays every frame through the partial update
+# path and checks the decoded framebuffer against the full frame, so broken delta reports fail.
+#
+#   python benchmarks/bench_usb.py [--seconds 5] [--latency-ms 1] [--disconnect-rate 0]
+#                                  [--invert] [--output report.json]
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from threading import Thread
+from contextlib import redirect_stdout
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.usbdevice import FakeHidTransport, FakeOledDevice
+from bench_suite import makeGIF, loadPlayers, joinBackgroundThreads
+
+
+def fullFramePixels(report_frame):
+    # What the screen shows after a frame's full reports
+    device = FakeOledDevice()
+    device.connect()
+    for report in report_frame.reports:
+        device.send_feature_report(report)
+    return device.screen()
+
+
+def verifyDeltas(player, report_frames, invert):
+    # Sends two loops frame by frame through the partial update path and compares every frame
+    device = FakeOledDevice()
+    player.transport = FakeHidTransport(device)
+    player.connect_device()
+    expected = [fullFramePixels(frame) for frame in report_frames]
+
+    mismatches = 0
+    last_sent = None
+    for count in range(len(report_frames) * 2):
+        index = count % len(report_frames)
+        last_sent = player._send_frame(report_frames, index, last_sent, invert)
+        if not np.array_equal(device.screen(), ~expected[index] if invert else expected[index]):
+            mismatches += 1
+    return mismatches, expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=1, help="time each feature report takes")
+    parser.add_argument("--disconnect-rate", type=float, default=0, help="chance that a report unplugs the device")
+    parser.add_argument("--invert", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="oled_bench_usb_")
+    gif_path = os.path.join(folder, "sprite.gif")
+    makeGIF(gif_path, 128, 64, 100, "sprite", frameMs=20)
+
+    module = loadPlayers()["usb"]
+    player = module.OLED_GIF(connect=False)
+    player.invert = int(args.invert)
+    with redirect_stdout(io.StringIO()):
+        report_frames = player.preprocess_gif_reports(gif_path)
+        mismatches, expected = verifyDeltas(player, report_frames, args.invert)
+
+    device = FakeOledDevice(latency=args.latency_ms / 1000, disconnectRate=args.disconnect_rate, seed=0)
+    player.transport = FakeHidTransport(device)
+    player.connect_device()
+    with redirect_stdout(io.StringIO()):
+        thread = Thread(target=player.playGIF, args=(gif_path,))
+        thread.start()
+        time.sleep(args.seconds)
+        player.stopGIF()
+        thread.join()
+        joinBackgroundThreads()
+
+    screen = device.screen()
+    shown = [~pixels if args.invert else pixels for pixels in expected]
+    report = {
+        "frames_in_gif": len(report_frames),
+        "latency_ms": args.latency_ms,
+        "disconnect_rate": args.disconnect_rate,
+        "invert": args.invert,
+        "delta_mismatches": mismatches,
+        "screen_matches_a_frame": any(np.array_equal(screen, pixels) for pixels in shown),
+        "scheduler": player.scheduler.stats(),
+        "delta_savings": player.delta_savings.get(gif_path),
+        "telemetry": player.telemetry.snapshot(),
+        "device": device.stats()
+    }
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# Hammers the PlaybackController of both players with random starts, stops, cycles, GIF switches and
+# inverts, the way mashing the buttons in the window would, against the fake transports. Sends are slow
+# and now and then stall, like a requests.post waiting on a busy Engine or a blocked HID write.
+#
+#   python benchmarks/stress_playback.py [--seconds 10] [--latency-ms 5] [--stall-rate 0.02]
+#                                        [--stall-ms 1000] [--stop-timeout 3] [--seed 0] [--output report.json]
+#
+# Fails (exit code 1) if a playback loop sends a frame after another loop has started sending, if a
+# start or a GUI stop (which doesn't wait) blocks, if the final stop takes longer than the stop timeout,
+# or if a playback thread or a decode thread (FrameBuffer, cycle preparation) is left running at the end.
+# One of the GIFs is big enough to still be decoding when the next start or stop comes.
+# --stall-ms above --stop-timeout exercises stops that give up on a thread stuck in a send.
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from threading import Lock, current_thread, enumerate as allThreads
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from oledcore.playback import PlaybackController
+from bench_suite import makeGIF, loadPlayers, FakeTransport, FakeDevice
+
+GIF_COUNT = 3
+BIG_GIF = (640, 480, 120)
+# width, height, frames; takes seconds to decode, so most runs are stopped mid-decode
+STOP_MARGIN_SECONDS = 0.25
+# A stop may take this much longer than the timeout: the wait itself plus a thread switch.
+# Starts and GUI stops don't wait at all, so they have to stay under it.
+DECODE_JOIN_SECONDS = 0.5
+# Decoding stops at the next frame once its run is cancelled, well within this
+DECODE_THREADS = ("frame-decode", "gif-prepare", "gif-prefetch")
+
+
+class SendMonitor:
+    # Every frame send reports in here. Once a thread has sent a frame, the thread that sent before it
+    # is retired; a retired thread sending again means two playback loops were running at once.
+
+    def __init__(self):
+        self.lock = Lock()
+        self.owner = None
+        self.retired = set()
+        self.sends = 0
+        self.violations = 0
+
+    def check(self):
+        thread = current_thread()
+        with self.lock:
+            self.sends += 1
+            if thread in self.retired:
+                self.violations += 1
+            elif thread is not self.owner:
+                if self.owner is not None:
+                    self.retired.add(self.owner)
+                self.owner = thread
+
+
+class Stalls:
+    # How long each send takes: latency, or now and then a stall
+
+    def __init__(self, latency, stallRate, stall, seed):
+        self.latency = latency
+        self.stallRate = stallRate
+        self.stall = stall
+        self.random = random.Random(seed)
+        self.stalls = 0
+
+    def wait(self):
+        if self.random.random() < self.stallRate:
+            self.stalls += 1
+            time.sleep(self.stall)
+        else:
+            time.sleep(self.latency)
+
+
+class SlowTransport(FakeTransport):
+    def __init__(self, stalls):
+        super().__init__()
+        self.stalls = stalls
+
+    def postBody(self, endpoint, body):
+        self.stalls.wait()
+        return super().postBody(endpoint, body)
+
+
+class SlowDevice(FakeDevice):
+    def __init__(self, stalls):
+        super().__init__()
+        self.stalls = stalls
+
+    def send_feature_report(self, report):
+        self.stalls.wait()
+        super().send_feature_report(report)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def hammer(player, monitor, stalls, gifPaths, seconds, stopTimeout, seed):
+    rng = random.Random(seed)
+    controller = PlaybackController(player, stopTimeout)
+    callTimes = []
+    operations = {"play": 0, "cycle": 0, "stop": 0, "invert": 0}
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        operation = rng.choice(["play", "play", "cycle", "stop", "invert"])
+        operations[operation] += 1
+        start = time.perf_counter()
+        if operation == "play":
+            controller.play(rng.choice(gifPaths))
+        elif operation == "cycle":
+            controller.cycle(gifPaths)
+        elif operation == "stop":
+            # As the Stop button does it
+            controller.stop(wait=False)
+        else:
+            player.invert = int(not player.invert)
+        if operation != "invert":
+            callTimes.append(time.perf_counter() - start)
+        time.sleep(rng.uniform(0, 0.05))
+
+    start = time.perf_counter()
+    controller.stop()
+    stopSeconds = time.perf_counter() - start
+    # Threads that stops gave up on are still finishing a stalled send, and may hit another stall
+    # on the rest of that frame's reports; they should all be gone well within a few stalls
+    for thread in allThreads():
+        if thread.name == "playback":
+            thread.join(stalls.stall * 4)
+    left = [thread for thread in allThreads() if thread.name == "playback" and thread.is_alive()]
+    decodeDeadline = time.perf_counter() + DECODE_JOIN_SECONDS
+    for thread in allThreads():
+        if thread.name.startswith(DECODE_THREADS):
+            thread.join(max(decodeDeadline - time.perf_counter(), 0))
+    decodeLeft = [thread for thread in allThreads() if thread.name.startswith(DECODE_THREADS) and thread.is_alive()]
+
+    return {
+        "operations": operations,
+        "frames_sent": monitor.sends,
+        "stalled_sends": stalls.stalls,
+        "overlapping_loops": monitor.violations,
+        "slow_stops": controller.slowStops,
+        "call_ms": {
+            "p50": percentile(callTimes, 50) * 1000,
+            "p99": percentile(callTimes, 99) * 1000,
+            "max": max(callTimes, default=0) * 1000
+        },
+        "stop_ms": stopSeconds * 1000,
+        "playback_threads_left": len(left),
+        "decode_threads_left": len(decodeLeft)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10, help="per player")
+    parser.add_argument("--latency-ms", type=float, default=5, help="time each send takes")
+    parser.add_argument("--stall-rate", type=float, default=0.02, help="chance that a send stalls")
+    parser.add_argument("--stall-ms", type=float, default=1000)
+    parser.add_argument("--stop-timeout", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="oled_stress_")
+    gifPaths = []
+    for index in range(GIF_COUNT):
+        path = os.path.join(folder, f"gif{index}.gif")
+        makeGIF(path, 128, 64, 10, "noise", seed=index, frameMs=40)
+        gifPaths.append(path)
+    path = os.path.join(folder, "big.gif")
+    makeGIF(path, *BIG_GIF, "noise", frameMs=40)
+    gifPaths.append(path)
+    players = loadPlayers()
+
+    report = {"latency_ms": args.latency_ms, "stall_rate": args.stall_rate, "stall_ms": args.stall_ms,
+              "stop_timeout": args.stop_timeout}
+    for name in ("gamesense", "usb"):
+        stalls = Stalls(args.latency_ms / 1000, args.stall_rate, args.stall_ms / 1000, args.seed)
+        monitor = SendMonitor()
+        if name == "gamesense":
+            player = players[name].OLED_GIF(transport=SlowTransport(stalls))
+            player.cycleSeconds = 0.5
+            send = player.sendFrame
+            def sendFrame(frame, send=send, monitor=monitor):
+                monitor.check()
+                return send(frame)
+            player.sendFrame = sendFrame
+        else:
+            player = players[name].OLED_GIF(connect=False)
+            player.device = SlowDevice(stalls)
+            player.cycle_seconds = 0.5
+            send = player._send_frame
+            def sendFrame(*args, send=send, monitor=monitor):
+                monitor.check()
+                return send(*args)
+            player._send_frame = sendFrame
+
+        with redirect_stdout(io.StringIO()):
+            report[name] = hammer(player, monitor, stalls, gifPaths, args.seconds, args.stop_timeout, args.seed)
+
+    failures = []
+    for name in ("gamesense", "usb"):
+        result = report[name]
+        if result["overlapping_loops"]:
+            failures.append(f"{name}: {result['overlapping_loops']} frames sent by a loop that had been replaced")
+        if result["call_ms"]["max"] > STOP_MARGIN_SECONDS * 1000:
+            failures.append(f"{name}: a start or GUI stop blocked for {result['call_ms']['max']:.0f}ms")
+        if result["stop_ms"] > (args.stop_timeout + STOP_MARGIN_SECONDS) * 1000:
+            failures.append(f"{name}: the final stop took {result['stop_ms']:.0f}ms")
+        if result["playback_threads_left"]:
+            failures.append(f"{name}: {result['playback_threads_left']} playback threads still running")
+        if result["decode_threads_left"]:
+            failures.append(f"{name}: {result['decode_threads_left']} decode threads still running")
+    report["failures"] = failures
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Shared code for the GameDAC GIF Display players
@@ -0,0 +1,270 @@
+import time
+import asyncio
+from collections import deque
+from threading import Thread, Semaphore, Lock
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+#############################################################################
+#####                          PIPELINED SENDER                         #####
+#############################################################################
+
+class PipelinedSender:
+    # Posts game_event bodies over one keep-alive connection without waiting for each reply.
+    # An asyncio loop on its own thread writes requests back to back and reads the replies as
+    # they come; HTTP/1.1 answers requests on a connection in order, so frames reach the Engine
+    # in the order they were sent.
+    # At most maxInFlight requests are outstanding. submit() blocks while the window is full,
+    # which is the backpressure: a slow Engine holds the playback loop back, and its
+    # FrameScheduler then drops frames instead of letting them queue up.
+
+    def __init__(self, sseAddress, endpoint="game_event", maxInFlight=DEFAULT_MAX_IN_FLIGHT, timeout=2.0,
+                 telemetry=None, rateControl=None):
+        address = urlsplit(sseAddress)
+        self.host = address.hostname
+        self.port = address.port or 80
+        self.requestHead = (f"POST /{endpoint} HTTP/1.1\r\n"
+                            f"Host: {address.netloc}\r\n"
+                            f"Content-Type: application/json\r\n"
+                            f"Content-Length: ").encode()
+        self.maxInFlight = maxInFlight
+        self.timeout = timeout
+        self.telemetry = telemetry
+        # Optional PlaybackTelemetry that gets reply latencies and errors
+        self.rateControl = rateControl
+        # Optional RateController that gets every round trip
+
+        self.window = Semaphore(maxInFlight)
+        self.closed = False
+        self.lock = Lock()
+        self.sentCount = 0
+        self.completedCount = 0
+        self.errorCount = 0
+        self.droppedCount = 0
+        self.connectionCount = 0
+        self.peakInFlight = 0
+        self.latencyTotal = 0.0
+
+        self.loop = asyncio.new_event_loop()
+        self.queue = asyncio.Queue()
+        self.loop.create_task(self._writeRequests())
+        self.thread = Thread(target=self._run, daemon=True, name="gamesense-sender")
+        self.thread.start()
+
+    #########################################################################
+
+    def submit(self, body):
+        # Queues a request body, blocking while maxInFlight requests are waiting for a reply.
+        # Returns False once the sender is closed.
+        while not self.window.acquire(timeout=0.1):
+            if self.closed:
+                return False
+        if self.closed:
+            self.window.release()
+            return False
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, body)
+        return True
+
+    def flush(self, timeout=None):
+        # Waits until every submitted request has its reply, or was given up on
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        acquired = 0
+        while acquired < self.maxInFlight and self.window.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            acquired += 1
+        for _ in range(acquired):
+            self.window.release()
+        return acquired == self.maxInFlight
+
+    def close(self, wait=True):
+        # Cancels whatever is still in flight and stops the loop thread.
+        # Without wait it only starts that, for a stop that mustn't block its caller.
+        if not self.closed:
+            self.closed = True
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+            except RuntimeError:
+                # The loop already stopped
+                pass
+        if wait:
+            self.thread.join(self.timeout)
+
+    #########################################################################
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _shutdown(self):
+        tasks = [task for task in asyncio.all_tasks(self.loop) if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.loop.stop()
+
+    async def _writeRequests(self):
+        writer = readerTask = None
+        inFlight = deque()
+        # Send times of the requests on the current connection still waiting for a reply, oldest first
+        try:
+            while True:
+                body = await self.queue.get()
+                if writer is None or readerTask.done():
+                    if writer is not None:
+                        writer.close()
+                    reader, writer = await self._connect()
+                    if writer is None:
+                        with self.lock:
+                            self.droppedCount += 1
+                        self.window.release()
+                        continue
+                    inFlight = deque()
+                    readerTask = self.loop.create_task(self._readReplies(reader, inFlight))
+
+                writer.write(self.requestHead + str(len(body)).encode() + b"\r\n\r\n" + body)
+                with self.lock:
+                    inFlight.append(time.perf_counter())
+                    self.sentCount += 1
+                    self.peakInFlight = max(self.peakInFlight, len(inFlight))
+                try:
+                    await writer.drain()
+                except ConnectionError as e:
+                    print(f"Error posting to Engine: {e}")
+                    readerTask.cancel()
+                    writer.close()
+                    writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+            self._dropInFlight(inFlight)
+
+    async def _connect(self):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"Could not connect to Engine at {self.host}:{self.port}: {e}")
+            with self.lock:
+                self.errorCount += 1
+            if self.rateControl:
+                self.rateControl.recordFailure()
+            if self.telemetry:
+                self.telemetry.recordError(f"Could not connect to Engine: {e}")
+            return None, None
+        with self.lock:
+            self.connectionCount += 1
+        return reader, writer
+
+    async def _readReplies(self, reader, inFlight):
+        # Matches each reply to the oldest request in flight. On a timeout or a dropped connection
+        # the requests still waiting are given up on; the next frame opens a new connection.
+        try:
+            while True:
+                status, keepAlive = await self._awaitReply(reader, inFlight)
+                with self.lock:
+                    sentAt = inFlight.popleft()
+                    latency = time.perf_counter() - sentAt
+                    self.completedCount += 1
+                    self.latencyTotal += latency
+                    if status != 200:
+                        self.errorCount += 1
+                self.window.release()
+                if self.rateControl:
+                    self.rateControl.recordRoundTrip(latency, status == 200)
+                if self.telemetry:
+                    self.telemetry.recordReply(latency)
+                    if status != 200:
+                        self.telemetry.recordError(f"Engine replied {status}")
+                if not keepAlive:
+                    break
+        except (OSError, EOFError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            if inFlight:
+                print(f"Lost Engine replies: {e!r}")
+                with self.lock:
+                    self.errorCount += 1
+                if self.rateControl:
+                    self.rateControl.recordFailure()
+                if self.telemetry:
+                    self.telemetry.recordError(f"Lost Engine replies: {e!r}")
+        finally:
+            self._dropInFlight(inFlight)
+
+    async def _awaitReply(self, reader, inFlight):
+        # Reads the next reply, timing out once the oldest request in flight has waited timeout for it.
+        # An idle connection has nothing to time out, so a GIF frame held for longer than timeout keeps
+        # its keep-alive connection instead of being cut off and reconnected on the next frame.
+        reply = self.loop.create_task(readReply(reader))
+        try:
+            while True:
+                with self.lock:
+                    sentAt = inFlight[0] if inFlight else None
+                if sentAt is None:
+                    # Checked again after timeout, for a request sent in the meantime
+                    remaining = self.timeout
+                else:
+                    remaining = sentAt + self.timeout - time.perf_counter()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait({reply}, timeout=remaining)
+                if done:
+                    return reply.result()
+        finally:
+            reply.cancel()
+
+    def _dropInFlight(self, inFlight):
+        # Frees the window slots of requests that will never get a reply
+        with self.lock:
+            count = len(inFlight)
+            inFlight.clear()
+            self.droppedCount += count
+        for _ in range(count):
+            self.window.release()
+
+    #########################################################################
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sent": self.sentCount,
+                "completed": self.completedCount,
+                "dropped": self.droppedCount,
+                "errors": self.errorCount,
+                "connections": self.connectionCount,
+                "peak_in_flight": self.peakInFlight,
+                "mean_latency_ms": self.latencyTotal / self.completedCount * 1000 if self.completedCount else 0
+            }
+
+
+#############################################################################
+
+async def readReply(reader):
+    # Reads one HTTP/1.1 response and returns (status code, whether the connection stays open)
+    statusLine = await reader.readline()
+    if not statusLine:
+        raise EOFError("connection closed by Engine")
+    parts = statusLine.split(None, 2)
+    if len(parts) < 2:
+        raise ValueError(f"bad status line {statusLine!r}")
+    status = int(parts[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+
+    return status, headers.get("connection") != "close"
@@ -0,0 +1,521 @@
+# Headless playback: runs only the player, controlled over a local socket instead of the Tk window.
+#
+#   OLED_GIF.py --daemon                       (or "USB Version/OLED_GIF_USB.py" --daemon)
+#   python -m oledcore.daemon status|play [path]|stop|invert [on|off]|cycle|message text|quit
+#   python -m oledcore.daemon set lazy_cycle true [--save]
+#
+# The daemon picks up preferences.json like the GUI does: the saved GIF (or the cycle folder) starts
+# playing and the saved invert setting is applied, along with the playback tuning in
+# PLAYBACK_PREFERENCES, which only preferences.json and the set command change. It listens on 127.0.0.1 only and writes its port
+# and a random token to control.json in the app folder; every command has to carry that token.
+# Commands and replies are one JSON object per line, e.g. {"command": "play", "path": "...", "token": "..."}.
+# While a daemon is running the GUI connects to it as a thin client instead of starting its own player.
+
+import os
+import sys
+import json
+import time
+import socket
+import secrets
+import argparse
+import socketserver
+from threading import Thread, Lock
+
+from oledcore.telemetry import MetricsWriter
+from oledcore.playback import PlaybackController
+
+CONTROL_FILE = "control.json"
+PREFERENCES_FILE = "preferences.json"
+CYCLE_FOLDER = "Cycle GIFs"
+CLIENT_TIMEOUT_SECONDS = 5.0
+STATUS_POLL_SECONDS = 1.0
+# How often a GUI attached to the daemon fetches its status for the tray tooltip
+
+PLAYBACK_PREFERENCES = ("lazy_cycle", "cycle_memory_mb", "cycle_seconds", "gif_cycle_seconds", "max_in_flight")
+# Playback tuning kept in preferences.json, applied by the players' applyPreferences().
+# lazy_cycle: prepare cycle GIFs one at a time instead of the whole folder, within cycle_memory_mb
+# cycle_seconds: how long each cycle GIF plays, gif_cycle_seconds: {file name: seconds} overrides
+# max_in_flight: GameSense frame posts sent without waiting for the reply, 0 = wait for each
+
+
+def appFolder():
+    # Same folder the GUI keeps its preferences, cache and cycle GIFs in
+    return os.path.join(os.path.expanduser("~"), "Documents", "GameDAC GIF Display")
+
+def loadPreferences(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def savePreference(path, key, value):
+    # Updates one key and keeps the rest of what the GUI saved
+    data = loadPreferences(path)
+    data[key] = value
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=4)
+
+def checkPreference(key, value):
+    # The value of a PLAYBACK_PREFERENCES key, raises ValueError if it isn't one
+    if key == "lazy_cycle":
+        if not isinstance(value, bool):
+            raise ValueError("expected true or false")
+        return value
+    if key == "gif_cycle_seconds":
+        if not isinstance(value, dict):
+            raise ValueError("expected {file name: seconds}")
+        return {str(name): checkPreference("cycle_seconds", seconds) for name, seconds in value.items()}
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("expected a number")
+    if key == "max_in_flight":
+        if value < 0 or value != int(value):
+            raise ValueError("expected a whole number, 0 or more")
+        return int(value)
+    if value <= 0:
+        raise ValueError("expected a number over 0")
+    return value
+
+def playbackPreferences(data):
+    # The PLAYBACK_PREFERENCES in data, invalid ones left out
+    preferences = {}
+    for key in PLAYBACK_PREFERENCES:
+        if data.get(key) is None:
+            continue
+        try:
+            preferences[key] = checkPreference(key, data[key])
+        except ValueError as e:
+            print(f"Ignoring {key} in preferences: {e}")
+    return preferences
+
+def cycleGIFPaths(folder):
+    cycleFolder = os.path.join(folder, CYCLE_FOLDER)
+    os.makedirs(cycleFolder, exist_ok=True)
+    return [os.path.join(cycleFolder, file) for file in sorted(os.listdir(cycleFolder)) if file.lower().endswith(".gif")]
+
+
+#############################################################################
+#####                          PLAYBACK DAEMON                          #####
+#############################################################################
+
+class PlaybackDaemon:
+    # Owns the player and its PlaybackController. Every command is handled under one lock,
+    # so two clients can't interleave a check of what is playing with starting something else.
+
+    def __init__(self, player, folder=None):
+        self.player = player
+        self.folder = folder or appFolder()
+        self.preferencesPath = os.path.join(self.folder, PREFERENCES_FILE)
+        self.lock = Lock()
+        self.playback = PlaybackController(player)
+        self.mode = None
+        # "gif" or "cycle" while playing
+        self.gifPath = None
+        self.stopped = False
+        # Set by quit, for whoever is serving the daemon
+
+    #########################################################################
+
+    def resume(self):
+        # Starts whatever the GUI would start on launch
+        preferences = loadPreferences(self.preferencesPath)
+        self.player.invert = int(bool(preferences.get("inverted")))
+        if hasattr(self.player, "applyPreferences"):
+            self.player.applyPreferences(playbackPreferences(preferences))
+        self.gifPath = preferences.get("saved_gif")
+        if preferences.get("cycle"):
+            return self.cycle()
+        if self.gifPath:
+            return self.play(self.gifPath)
+        return self.status()
+
+    def play(self, path=None, save=False):
+        with self.lock:
+            path = path or self.gifPath
+            if not path:
+                return error("No GIF selected")
+            if not os.path.exists(path):
+                return error(f"GIF not found: {path}")
+            if save:
+                savePreference(self.preferencesPath, "saved_gif", path)
+                savePreference(self.preferencesPath, "cycle", False)
+            if self.mode == "gif" and self.gifPath == path and self._playing():
+                return self._status()
+            self._stopPlayback()
+            self.gifPath = path
+            self._startPlayback("gif", self.player.playGIF, path)
+            return self._status()
+
+    def cycle(self, save=False):
+        with self.lock:
+            paths = cycleGIFPaths(self.folder)
+            if not paths:
+                return error(f"No GIFs in {os.path.join(self.folder, CYCLE_FOLDER)}")
+            if save:
+                savePreference(self.preferencesPath, "cycle", True)
+            if self.mode == "cycle" and self._playing():
+                return self._status()
+            self._stopPlayback()
+            self._startPlayback("cycle", self.player.playGIFCycle, paths)
+            return self._status()
+
+    def stop(self):
+        with self.lock:
+            self._stopPlayback()
+            return self._status()
+
+    def invert(self, value=None):
+        # Toggles without a value. Frames carry both polarities, so playback picks it up on the next frame.
+        with self.lock:
+            self.player.invert = int(not self.player.invert if value is None else bool(value))
+            savePreference(self.preferencesPath, "inverted", self.player.invert)
+            return self._status()
+
+    def set(self, key, value, save=False):
+        # Changes one of the PLAYBACK_PREFERENCES. lazy_cycle and max_in_flight take effect from the
+        # next play or cycle, the cycle times from the next GIF.
+        if key not in PLAYBACK_PREFERENCES:
+            return error(f"Unknown setting: {key}, expected one of {', '.join(PLAYBACK_PREFERENCES)}")
+        if not hasattr(self.player, "applyPreferences"):
+            return error("This player has no playback settings")
+        try:
+            value = checkPreference(key, value)
+        except ValueError as e:
+            return error(f"Bad value for {key}: {e}")
+        with self.lock:
+            self.player.applyPreferences({key: value})
+            if save:
+                savePreference(self.preferencesPath, key, value)
+            return self._status()
+
+    def message(self, text, timer=2):
+        if not hasattr(self.player, "display_error_message"):
+            return error("This player can't show messages")
+        self.player.display_error_message(text, timer)
+        return self.status()
+
+    def quit(self):
+        self.stop()
+        self.stopped = True
+        return {"ok": True}
+
+    def status(self):
+        with self.lock:
+            return self._status()
+
+    #########################################################################
+
+    def _playing(self):
+        return self.playback.playing()
+
+    def _startPlayback(self, mode, target, argument):
+        # Caller holds the lock. The controller stops anything still playing first.
+        if hasattr(self.player, "cancel_pending_message"):
+            self.player.cancel_pending_message()
+        self.mode = mode
+        self.playback.start(target, argument)
+
+    def _stopPlayback(self):
+        # Caller holds the lock. Replies without waiting for the playback thread, so the Stop button
+        # of a GUI attached to the daemon doesn't wait on it either.
+        self.playback.stop(wait=False)
+        self.mode = None
+
+    def _status(self):
+        # Caller holds the lock
+        playing = self._playing()
+        return {
+            "ok": True,
+            "playing": playing,
+            "mode": self.mode if playing else None,
+            "gif": self.gifPath,
+            "invert": bool(self.player.invert),
+            "summary": self.player.telemetry.summary(),
+            "telemetry": self.player.telemetry.snapshot()
+        }
+
+    #########################################################################
+
+    def handle(self, request):
+        # Runs one command from a client and returns the reply
+        command = request.get("command")
+        if command == "status":
+            return self.status()
+        if command == "play":
+            return self.play(request.get("path"), bool(request.get("save")))
+        if command == "cycle":
+            return self.cycle(bool(request.get("save")))
+        if command == "stop":
+            return self.stop()
+        if command == "invert":
+            return self.invert(request.get("value"))
+        if command == "set":
+            return self.set(str(request.get("key")), request.get("value"), bool(request.get("save")))
+        if command == "message":
+            return self.message(str(request.get("text", "")), request.get("timer", 2))
+        if command == "quit":
+            return self.quit()
+        return error(f"Unknown command: {command}")
+
+
+def error(message):
+    return {"ok": False, "error": message}
+
+
+#############################################################################
+#####                           CONTROL SOCKET                          #####
+#############################################################################
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    # Serves a PlaybackDaemon on 127.0.0.1 and advertises itself in control.json
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, daemon, port=0):
+        super().__init__(("127.0.0.1", port), ControlHandler)
+        self.playbackDaemon = daemon
+        self.token = secrets.token_hex(16)
+        self.controlPath = os.path.join(daemon.folder, CONTROL_FILE)
+
+    @property
+    def address(self):
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def writeControlFile(self):
+        os.makedirs(os.path.dirname(self.controlPath), exist_ok=True)
+        with open(self.controlPath, "w") as file:
+            json.dump({"address": self.address, "token": self.token, "pid": os.getpid()}, file)
+
+    def removeControlFile(self):
+        # Leaves the file alone if another daemon has taken it over since
+        try:
+            with open(self.controlPath) as file:
+                if json.load(file).get("token") != self.token:
+                    return
+            os.remove(self.controlPath)
+        except (OSError, ValueError):
+            pass
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    timeout = 30
+
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.reply(error("Requests are one JSON object per line"))
+                return
+            if not isinstance(request, dict) or request.get("token") != server.token:
+                self.reply(error("Bad token"))
+                return
+
+            reply = server.playbackDaemon.handle(request)
+            self.reply(reply)
+            if server.playbackDaemon.stopped:
+                # shutdown() waits for serve_forever, which runs on another thread
+                Thread(target=server.shutdown, daemon=True).start()
+                return
+
+    def reply(self, data):
+        try:
+            self.wfile.write(json.dumps(data).encode() + b"\n")
+        except ConnectionError:
+            pass
+
+
+def runDaemon(player, folder=None, port=0):
+    # Serves the player until a quit command or Ctrl+C
+    daemon = PlaybackDaemon(player, folder)
+    server = ControlServer(daemon, port)
+    metricsWriter = MetricsWriter(player.telemetry, os.path.join(daemon.folder, "metrics.json")).start()
+    server.writeControlFile()
+    print(f"OLED GIF daemon listening on {server.address}")
+    sys.stdout.flush()
+    try:
+        reply = daemon.resume()
+        if not reply["ok"]:
+            print(f"Nothing to resume: {reply['error']}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        metricsWriter.stop()
+        server.removeControlFile()
+        server.server_close()
+
+
+#############################################################################
+#####                               CLIENT                              #####
+#############################################################################
+
+class ControlClient:
+    # Talks to the daemon advertised in control.json, one connection per command
+
+    def __init__(self, folder=None, timeout=CLIENT_TIMEOUT_SECONDS):
+        self.controlPath = os.path.join(folder or appFolder(), CONTROL_FILE)
+        self.timeout = timeout
+
+    def send(self, command, **arguments):
+        # Returns the daemon's reply, or None if no daemon is running
+        try:
+            with open(self.controlPath) as file:
+                control = json.load(file)
+            host, port = control["address"].rsplit(":", 1)
+            with socket.create_connection((host, int(port)), self.timeout) as connection:
+                request = dict(arguments, command=command, token=control["token"])
+                connection.sendall(json.dumps(request).encode() + b"\n")
+                with connection.makefile("rb") as reader:
+                    line = reader.readline()
+            return json.loads(line) if line else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class RemoteTelemetry:
+    # The part of PlaybackTelemetry the GUI reads, fetched from the daemon.
+    # summary() runs on the Tk thread every second, so it never waits on the daemon: a poller thread,
+    # started with the first call, fetches the status and summary() returns the latest one.
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = Lock()
+        self.status = None
+        # Last status reply, {} if the daemon didn't answer
+        self.poller = None
+
+    def snapshot(self):
+        reply = self.client.send("status")
+        return reply["telemetry"] if reply and reply.get("ok") else {}
+
+    def summary(self):
+        with self.lock:
+            if self.poller is None:
+                self.poller = Thread(target=self._poll, daemon=True, name="daemon-status")
+                self.poller.start()
+            status = self.status
+        if status is None:
+            return "Connecting to daemon"
+        return status["summary"] if status.get("ok") else "Daemon not running"
+
+    def _poll(self):
+        while True:
+            reply = self.client.send("status")
+            with self.lock:
+                self.status = reply or {}
+            time.sleep(STATUS_POLL_SECONDS)
+
+
+class RemotePlayer:
+    # Stands in for a player in the GUI while a daemon plays: the same calls, sent as commands.
+    # The GUI starts playGIF/playGIFCycle on a thread as usual; here they return once the daemon replies.
+
+    def __init__(self, client, status):
+        self.client = client
+        self.telemetry = RemoteTelemetry(client)
+        self.running = status.get("playing", False)
+        self._invert = int(status.get("invert", False))
+        self.frameCache = None
+        self.frame_cache = None
+        # The daemon keeps its own cache
+
+    @classmethod
+    def connect(cls, folder=None):
+        # A RemotePlayer if a daemon answers, else None
+        client = ControlClient(folder, timeout=1.0)
+        status = client.send("status")
+        if not status or not status.get("ok"):
+            return None
+        client.timeout = CLIENT_TIMEOUT_SECONDS
+        return cls(client, status)
+
+    @property
+    def invert(self):
+        return self._invert
+
+    @invert.setter
+    def invert(self, value):
+        self._invert = int(bool(value))
+        self.send("invert", value=self._invert)
+
+    def playGIF(self, gif_path):
+        self.send("play", path=gif_path)
+
+    def playGIFCycle(self, gif_paths):
+        # The daemon cycles the same folder the GUI read gif_paths from
+        self.send("cycle")
+
+    def stopGIF(self):
+        self.running = False
+        self.send("stop")
+
+    def display_error_message(self, message_text, timer):
+        self.send("message", text=message_text, timer=timer)
+
+    def cancel_pending_message(self):
+        # The daemon cancels it itself when it starts playback
+        pass
+
+    def applyPreferences(self, preferences):
+        # The daemon applies its own from preferences.json
+        pass
+
+    def quit_connection(self):
+        # The daemon keeps the device
+        pass
+
+    def send(self, command, **arguments):
+        reply = self.client.send(command, **arguments)
+        if reply is None:
+            print(f"Daemon did not answer {command}")
+        elif not reply.get("ok"):
+            print(f"Daemon could not {command}: {reply.get('error')}")
+        return reply
+
+
+#############################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running OLED GIF daemon")
+    parser.add_argument("command", choices=["status", "play", "stop", "invert", "cycle", "set", "message", "quit"])
+    parser.add_argument("argument", nargs="?", help="play: GIF path, invert: on/off, set: setting, message: text")
+    parser.add_argument("value", nargs="?", help="set: the value as JSON, e.g. true, 5 or '{\"cat.gif\": 10}'")
+    parser.add_argument("--save", action="store_true", help="play/cycle/set: also save it to start next time")
+    parser.add_argument("--folder", help="app folder with control.json, defaults to Documents/GameDAC GIF Display")
+    args = parser.parse_args()
+
+    arguments = {}
+    if args.command == "play" and args.argument:
+        arguments["path"] = os.path.abspath(args.argument)
+    elif args.command == "invert" and args.argument:
+        arguments["value"] = args.argument.lower() in ("on", "1", "true", "yes")
+    elif args.command == "set":
+        if not args.argument or args.value is None:
+            parser.error(f"set needs a setting and a value, settings: {', '.join(PLAYBACK_PREFERENCES)}")
+        arguments["key"] = args.argument
+        try:
+            arguments["value"] = json.loads(args.value)
+        except ValueError:
+            parser.error(f"set: {args.value} is not JSON")
+    elif args.command == "message":
+        arguments["text"] = args.argument or ""
+    if args.save:
+        arguments["save"] = True
+
+    reply = ControlClient(args.folder).send(args.command, **arguments)
+    if reply is None:
+        print("No OLED GIF daemon is running")
+        sys.exit(1)
+    # The full snapshot is in metrics.json
+    reply.pop("telemetry", None)
+    print(json.dumps(reply, indent=4))
+    sys.exit(0 if reply.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    main()
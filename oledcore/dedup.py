@@ -0,0 +1,67 @@
+import os
+from threading import Lock
+
+
+#############################################################################
+#####                          FRAME DEDUPLICATION                      #####
+#############################################################################
+
+class FrameStore:
+    # Interns frames by content, so identical frames across all loaded GIFs share one copy.
+    # Frames must be hashable: encoded bytes, or tuples of report bytes.
+
+    def __init__(self):
+        self.frames = {}
+        self.lookups = 0
+        self.shared = 0
+        self.lock = Lock()
+        # GIFs of a cycle are prepared on several threads at once
+
+    def intern(self, frame):
+        with self.lock:
+            self.lookups += 1
+            stored = self.frames.setdefault(frame, frame)
+            if stored is not frame:
+                self.shared += 1
+            return stored
+
+    def internAll(self, frames):
+        # Returns the interned frames and how many of them were already stored
+        sharedBefore = self.shared
+        frames = [self.intern(frame) for frame in frames]
+        return frames, self.shared - sharedBefore
+
+
+#############################################################################
+
+def mergeHolds(frames, durations, key=None):
+    # Collapses each run of identical consecutive frames into one frame held for the whole run
+    merged = list(iterMergeHolds(zip(frames, durations), key))
+    return [frame for frame, _ in merged], [duration for _, duration in merged]
+
+def iterMergeHolds(frames, key=None):
+    # Streaming mergeHolds over (frame, duration) pairs; each frame is yielded once the next differs
+    pending = None
+    pendingKey = None
+    for frame, duration in frames:
+        frameKey = key(frame) if key else frame
+        if pending is not None and frameKey == pendingKey:
+            pending[1] += duration
+            continue
+        if pending is not None:
+            yield tuple(pending)
+        pending = [frame, duration]
+        pendingKey = frameKey
+    if pending is not None:
+        yield tuple(pending)
+
+def dedupStats(gif_path, decodedCount, mergedCount, sharedCount):
+    stats = {
+        "frames": decodedCount,
+        "merged_frames": mergedCount,
+        "shared_frames": sharedCount,
+        "dedup_ratio": decodedCount / mergedCount if mergedCount else 1.0
+    }
+    print(f"Dedup for {os.path.basename(gif_path)}: {decodedCount} -> {mergedCount} frames "
+          f"({stats['dedup_ratio']:.2f}x), {sharedCount} shared with frames already loaded")
+    return stats
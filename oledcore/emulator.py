@@ -0,0 +1,266 @@
+# Local stand-in for the SteelSeries GameSense Engine, for testing the GameSense path
+# without SteelSeries GG. It serves the endpoints the apps use, writes a coreProps.json
+# pointing at itself, and records when every frame arrives.
+#
+#   python -m oledcore.emulator --core-props emulator/coreProps.json [--latency-ms 5]
+#                               [--jitter-ms 2] [--service-ms 0] [--error-rate 0.01] [--duration 30]
+#                               [--report report.json]
+#
+# Then start OLED_GIF.py with OLED_GIF_CORE_PROPS set to the same coreProps.json.
+# The report (achieved fps, inter-frame jitter, payload sizes) is printed on exit.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from threading import Thread, Lock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from oledcore.gamesense import CORE_PROPS_ENV
+
+ENDPOINTS = ("game_metadata", "bind_game_event", "game_event", "remove_game")
+
+
+#############################################################################
+#####                          ENGINE EMULATOR                          #####
+#############################################################################
+
+class EngineEmulator:
+    # Runs the stand-in Engine on a background thread.
+    # latency (+ up to jitter more) is added before every reply, and errorRate of the
+    # game_events are answered with a 500 instead of being handled. Registration is never
+    # failed on purpose, so a run always gets as far as sending frames.
+    # serviceTime is spent on each request one at a time, like the Engine drawing frames in turn;
+    # requests arriving faster than that queue up and their round trips grow.
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, errorRate=0.0, seed=None, serviceTime=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.serviceTime = serviceTime
+        self.random = random.Random(seed)
+
+        self.lock = Lock()
+        self.serviceLock = Lock()
+        self.games = {}
+        # game -> set of bound events
+        self.frameTimes = []
+        self.frameSizes = []
+        self.requestCounts = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.injectedErrors = 0
+        self.rejected = 0
+
+        self.server = ThreadingHTTPServer((host, port), EmulatorHandler)
+        self.server.daemon_threads = True
+        self.server.emulator = self
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    #########################################################################
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever, daemon=True, name="engine-emulator")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def writeCoreProps(self, path):
+        # Same fields GG writes, so readEngineAddress finds the emulator
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"address": self.address, "encrypted_address": self.address}, file)
+        return path
+
+    #########################################################################
+
+    def handle(self, endpoint, data):
+        # Returns (status, reply) for a request the way the Engine would
+        with self.lock:
+            self.requestCounts[endpoint] += 1
+            if endpoint == "game_event" and self.errorRate and self.random.random() < self.errorRate:
+                self.injectedErrors += 1
+                return 500, {"error": "injected error"}
+
+            game = data.get("game") if isinstance(data, dict) else None
+            if not game:
+                self.rejected += 1
+                return 400, {"error": "game is required"}
+
+            if endpoint == "game_metadata":
+                self.games.setdefault(game, set())
+            elif endpoint == "bind_game_event":
+                if not data.get("event") or not data.get("handlers"):
+                    self.rejected += 1
+                    return 400, {"error": "event and handlers are required"}
+                self.games.setdefault(game, set()).add(data["event"])
+            elif endpoint == "remove_game":
+                self.games.pop(game, None)
+            elif endpoint == "game_event":
+                if data.get("event") not in self.games.get(game, ()):
+                    self.rejected += 1
+                    return 400, {"error": f"event {data.get('event')} is not bound for {game}"}
+        return 200, {}
+
+    def recordFrame(self, arrivedAt, size):
+        with self.lock:
+            self.frameTimes.append(arrivedAt)
+            self.frameSizes.append(size)
+
+    def delay(self):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+        if self.serviceTime:
+            with self.serviceLock:
+                time.sleep(self.serviceTime)
+
+    #########################################################################
+
+    def report(self):
+        # Achieved frame rate, spacing between frames and payload sizes of the game_events received
+        with self.lock:
+            times = list(self.frameTimes)
+            sizes = list(self.frameSizes)
+            report = {
+                "requests": dict(self.requestCounts),
+                "injected_errors": self.injectedErrors,
+                "rejected": self.rejected,
+                "frames": len(times)
+            }
+
+        intervals = [later - earlier for earlier, later in zip(times, times[1:])]
+        if intervals:
+            milliseconds = sorted(interval * 1000 for interval in intervals)
+            report.update({
+                "seconds": times[-1] - times[0],
+                "fps": len(intervals) / (times[-1] - times[0]) if times[-1] > times[0] else 0,
+                "interval_ms": {
+                    "mean": statistics.fmean(milliseconds),
+                    "p50": percentile(milliseconds, 50),
+                    "p95": percentile(milliseconds, 95),
+                    "p99": percentile(milliseconds, 99),
+                    "max": milliseconds[-1]
+                },
+                "jitter_ms": statistics.pstdev(milliseconds)
+                # Standard deviation of the time between frames
+            })
+        if sizes:
+            report["payload_bytes"] = {
+                "mean": statistics.fmean(sizes),
+                "min": min(sizes),
+                "max": max(sizes),
+                "total": sum(sizes)
+            }
+        return report
+
+    def reset(self):
+        # Clears recorded frames and counters, keeping registered games
+        with self.lock:
+            self.frameTimes.clear()
+            self.frameSizes.clear()
+            self.requestCounts = {endpoint: 0 for endpoint in ENDPOINTS}
+            self.injectedErrors = 0
+            self.rejected = 0
+
+
+#############################################################################
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        arrivedAt = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        emulator = self.server.emulator
+        endpoint = self.path.strip("/")
+
+        if endpoint not in ENDPOINTS:
+            self.reply(404, {"error": f"unknown endpoint {endpoint}"})
+            return
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+
+        emulator.delay()
+        status, reply = emulator.handle(endpoint, data)
+        if status == 200 and endpoint == "game_event":
+            emulator.recordFrame(arrivedAt, len(body))
+        self.reply(status, reply)
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            # The app hung up without waiting for the reply, e.g. when playback stops
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(ordered, percent):
+    index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+#############################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GameSense Engine")
+    parser.add_argument("--core-props", default=os.path.join("emulator", "coreProps.json"),
+                        help=f"where to write coreProps.json, point {CORE_PROPS_ENV} at it")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra latency, up to this much")
+    parser.add_argument("--service-ms", type=float, default=0, help="time each request takes, one request at a time")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of game_events answered with a 500")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds instead of on Ctrl+C")
+    parser.add_argument("--report", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    emulator = EngineEmulator(port=args.port, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                              errorRate=args.error_rate, seed=args.seed, serviceTime=args.service_ms / 1000).start()
+    emulator.writeCoreProps(args.core_props)
+    print(f"GameSense emulator listening on {emulator.address}")
+    print(f"Wrote {args.core_props}; start the app with {CORE_PROPS_ENV}={os.path.abspath(args.core_props)}")
+    sys.stdout.flush()
+
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+    report = emulator.report()
+    print(json.dumps(report, indent=4))
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import time
+from threading import Thread, Condition
+
+
+#############################################################################
+#####                            FRAME BUFFER                           #####
+#############################################################################
+
+class FrameBuffer:
+    # Collects (frame, duration) pairs from a preprocessing generator on a background thread,
+    # so playback can start on the first frame while the rest of the GIF is still decoding.
+    # If the generator returns a list of frames, it replaces what was collected once decoding
+    # finishes; this lets a pipeline fix up early frames that depended on later ones.
+    # Cancelling the playback run's token closes the generator at the frame it is on, so a GIF
+    # nobody plays anymore isn't decoded to the end, and its stats and frame cache entry are skipped.
+
+    def __init__(self, frames, token=None):
+        self.frames = []
+        self.frameDurations = []
+        self.done = False
+        self.condition = Condition()
+        self.startTime = time.perf_counter()
+        self.firstFrameSeconds = None
+        self.decodeSeconds = None
+        self.cancelled = False
+
+        if token is not None:
+            token.onCancel(self.cancel)
+        self.thread = Thread(target=self._fill, args=(frames,), daemon=True, name="frame-decode")
+        self.thread.start()
+
+    def cancel(self):
+        # Stops decoding after the frame in progress, the frames decoded so far stay readable
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    #########################################################################
+
+    def _fill(self, frames):
+        try:
+            while True:
+                if self.cancelled:
+                    # Only this thread runs the generator, so only it can close it
+                    frames.close()
+                    break
+                try:
+                    frame, duration = next(frames)
+                except StopIteration as finished:
+                    if finished.value is not None:
+                        with self.condition:
+                            self.frames[:] = [frame for frame, _ in finished.value]
+                            self.frameDurations[:] = [duration for _, duration in finished.value]
+                    break
+
+                with self.condition:
+                    if self.firstFrameSeconds is None:
+                        self.firstFrameSeconds = time.perf_counter() - self.startTime
+                    self.frames.append(frame)
+                    self.frameDurations.append(duration)
+                    self.condition.notify_all()
+        except Exception as e:
+            print(f"Error while preprocessing frames: {e}")
+        finally:
+            with self.condition:
+                self.done = True
+                self.decodeSeconds = time.perf_counter() - self.startTime
+                self.condition.notify_all()
+
+    #########################################################################
+
+    def durations(self, onWait=None, stopped=None):
+        # Yields each frame's duration as soon as the frame is ready; frame i is then self.frames[i].
+        # onWait is called after having to wait on the decoder, stopped ends the wait early.
+        index = 0
+        while True:
+            waited = False
+            with self.condition:
+                while index >= len(self.frames) and not self.done:
+                    if stopped and stopped():
+                        return
+                    self.condition.wait(0.1)
+                    waited = True
+                if index >= len(self.frames):
+                    return
+                duration = self.frameDurations[index]
+
+            if waited and onWait:
+                onWait()
+            yield duration
+            index += 1
+
+
+#############################################################################
+
+def collectFrames(frames, token=None):
+    # Runs a preprocessing generator to the end without a background thread.
+    # Once token is cancelled the generator is closed and nothing is returned.
+    collected = []
+    while True:
+        if token is not None and token.cancelled:
+            frames.close()
+            return []
+        try:
+            collected.append(next(frames))
+        except StopIteration as finished:
+            return finished.value if finished.value is not None else collected
@@ -0,0 +1,157 @@
+import os
+import json
+import struct
+import hashlib
+
+CACHE_VERSION = 1
+# Bump whenever the file layout below changes
+CACHE_MAGIC = b"OGFC"
+CACHE_EXTENSION = ".frames"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# File layout, all little-endian:
+#   header:  magic (4s), version (H), frame count (I)
+#   frame:   duration in seconds (d), group count (H)
+#   group:   blob count (H), then per blob its length (I) and bytes
+HEADER = struct.Struct("<4sHI")
+FRAME = struct.Struct("<dH")
+COUNT = struct.Struct("<H")
+LENGTH = struct.Struct("<I")
+
+
+#############################################################################
+#####                            FRAME CACHE                            #####
+#############################################################################
+
+class FrameCache:
+    # On-disk cache of fully processed GIFs, so a known GIF never has to be decoded again.
+    # Entries are keyed by the GIF's content plus everything that affects the encoded output.
+    # A frame is (groups, duration), where groups is a list of lists of bytes.
+
+    def __init__(self, folder, maxBytes=DEFAULT_MAX_BYTES):
+        self.folder = folder
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+    #########################################################################
+
+    def key(self, gif_path, params):
+        # params holds the pipeline settings and encoder version of the caller
+        digest = hashlib.blake2b(digest_size=20)
+        with open(gif_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(struct.pack("<H", CACHE_VERSION))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder, key + CACHE_EXTENSION)
+
+    #########################################################################
+
+    def load(self, key):
+        # Returns the cached frames, or None on a miss or an unreadable entry
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            frames = decodeFrames(data)
+            os.utime(path)
+            # The modification time doubles as the last-used time for LRU eviction
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"Discarding unreadable frame cache entry {path}: {e}")
+            self.misses += 1
+            self.remove(path)
+            return None
+
+        self.hits += 1
+        return frames
+
+    def save(self, key, frames):
+        path = self.path(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(encodeFrames(frames))
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Could not write frame cache entry {path}: {e}")
+            return
+        self.evict()
+
+    #########################################################################
+
+    def evict(self):
+        # Removes the least recently used entries until the cache fits in maxBytes
+        entries = []
+        try:
+            with os.scandir(self.folder) as scan:
+                for entry in scan:
+                    if entry.name.endswith(CACHE_EXTENSION):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+#############################################################################
+
+def encodeFrames(frames):
+    parts = [HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(frames))]
+    for groups, duration in frames:
+        parts.append(FRAME.pack(duration, len(groups)))
+        for blobs in groups:
+            parts.append(COUNT.pack(len(blobs)))
+            for blob in blobs:
+                parts.append(LENGTH.pack(len(blob)))
+                parts.append(blob)
+    return b"".join(parts)
+
+def decodeFrames(data):
+    magic, version, frameCount = HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError("unknown cache format")
+
+    offset = HEADER.size
+    frames = []
+    for _ in range(frameCount):
+        duration, groupCount = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+        groups = []
+        for _ in range(groupCount):
+            (blobCount,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            blobs = []
+            for _ in range(blobCount):
+                (length,) = LENGTH.unpack_from(data, offset)
+                offset += LENGTH.size
+                blobs.append(data[offset:offset + length])
+                offset += length
+            groups.append(blobs)
+        frames.append((groups, duration))
+
+    if offset != len(data):
+        raise ValueError("trailing data in cache entry")
+    return frames
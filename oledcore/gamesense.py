@@ -0,0 +1,107 @@
+import os
+import json
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+DEFAULT_CORE_PROPS_PATH = r"C:\ProgramData\SteelSeries\GG\coreProps.json"
+CORE_PROPS_ENV = "OLED_GIF_CORE_PROPS"
+# Points the apps at another coreProps.json, e.g. one written by oledcore.emulator
+
+
+#############################################################################
+#####                          ENGINE TRANSPORT                         #####
+#############################################################################
+
+class EngineTransport:
+    # Keep-alive connection pool that every call to the GameSense Engine goes through.
+    # A bare requests.post opens a new TCP connection per frame; a Session reuses one.
+
+    def __init__(self, sseAddress, connectTimeout=1.0, readTimeout=2.0, poolSize=2):
+        self.sseAddress = sseAddress
+        self.timeout = (connectTimeout, readTimeout)
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize, max_retries=0)
+        self.session.mount('http://', self.adapter)
+
+        self.lock = Lock()
+        self.requestCount = 0
+        self.errorCount = 0
+
+    #########################################################################
+
+    def post(self, endpoint, json=None):
+        # Returns the Engine's response, or None if it could not be reached
+        return self._send(endpoint, json=json)
+
+    def postBody(self, endpoint, body):
+        # Posts an already JSON-encoded request body as-is
+        return self._send(endpoint, data=body, headers=JSON_HEADERS)
+
+    def _send(self, endpoint, **kwargs):
+        with self.lock:
+            self.requestCount += 1
+        try:
+            response = self.session.post(f'{self.sseAddress}/{endpoint}', timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            with self.lock:
+                self.errorCount += 1
+            print(f"Error posting to Engine /{endpoint}: {e}")
+            return None
+
+        if response.status_code != 200:
+            with self.lock:
+                self.errorCount += 1
+        return response
+
+    #########################################################################
+
+    def stats(self):
+        # urllib3 counts every request and every new connection per pool;
+        # any request that did not need a new connection reused one
+        connections = 0
+        pooledRequests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooledRequests += pool.num_requests
+
+        with self.lock:
+            return {
+                "requests": self.requestCount,
+                "connections": connections,
+                "reused": max(pooledRequests - connections, 0),
+                "errors": self.errorCount
+            }
+
+    def close(self):
+        self.session.close()
+
+
+#############################################################################
+
+def encodeGameEvent(game, event, frame):
+    # Serializes a game_event body once so replays only have to write bytes
+    data = {
+        "game": game,
+        "event": event,
+        "data": {
+            "frame": frame
+        }
+    }
+    return json.dumps(data, separators=(',', ':')).encode()
+
+
+def corePropsPath(path=None):
+    # An explicit path wins, then the OLED_GIF_CORE_PROPS environment variable, then GG's default
+    return path or os.environ.get(CORE_PROPS_ENV) or DEFAULT_CORE_PROPS_PATH
+
+def readEngineAddress(path=None):
+    # The Engine writes the address it is listening on into coreProps.json when it starts
+    with open(corePropsPath(path)) as file:
+        return f'http://{json.load(file)["address"]}'
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+
+
+#############################################################################
+#####                          LAZY CYCLE CACHE                         #####
+#############################################################################
+
+class LazyPreparer:
+    # Prepares cycle GIFs on demand instead of all up front, so memory does not grow with the folder.
+    # The playing GIF and the one after it stay resident; the next one is prefetched in the
+    # background as soon as the current one starts. Anything else is kept only while it fits
+    # in memoryBudget, and evicted least recently used first.
+    # Same interface as ParallelPreparer, so the cycle loops work with either.
+
+    def __init__(self, prepare, gif_paths, memoryBudget=DEFAULT_MEMORY_BUDGET, sizeOf=len):
+        self.prepare = prepare
+        self.gif_paths = list(gif_paths)
+        self.memoryBudget = memoryBudget
+        self.sizeOf = sizeOf
+
+        self.lock = Lock()
+        self.resident = OrderedDict()
+        # index -> (result, size in bytes), least recently used first
+        self.pending = {}
+        self.invalid = set()
+        self.pinned = set()
+        self.closed = False
+        # Set by shutdown, after which nothing new is prepared
+
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+        self.evictions = 0
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gif-prefetch")
+
+    #########################################################################
+
+    def get(self, index):
+        return self._load(index, False)
+
+    def _load(self, index, countStats=True):
+        # Returns the prepared GIF, preparing it now if it is neither resident nor prefetched.
+        # Hits and misses are only counted at GIF switches, when it matters if the GIF was ready.
+        with self.lock:
+            if self.closed:
+                return None
+            if index in self.resident:
+                self.hits += countStats
+                self.resident.move_to_end(index)
+                result = self.resident[index][0]
+                future = None
+            else:
+                # Pinned before it lands, so the _evict in _prepare can't drop it before _pin takes over
+                self.pinned.add(index)
+                future = self.pending.get(index)
+                if future is None:
+                    self.misses += countStats
+                    future = self._submit(index)
+                else:
+                    self.hits += countStats
+
+        if future is not None:
+            try:
+                result = future.result()
+            except CancelledError:
+                # Dropped by shutdown, the run is over
+                return None
+
+        if result:
+            self._pin(index)
+        return result
+
+    def prefetch(self, index):
+        with self.lock:
+            if self.closed or index in self.resident or index in self.pending or index in self.invalid:
+                return
+            self.prefetches += 1
+            self._submit(index)
+
+    def _submit(self, index):
+        future = self.executor.submit(self._prepare, index)
+        self.pending[index] = future
+        return future
+
+    def _prepare(self, index):
+        try:
+            result = self.prepare(self.gif_paths[index])
+        except Exception as e:
+            print(f"Error preparing {self.gif_paths[index]}: {e}")
+            result = None
+
+        with self.lock:
+            self.pending.pop(index, None)
+            if result:
+                self.resident[index] = (result, self.sizeOf(result))
+                self._evict()
+            else:
+                self.invalid.add(index)
+        return result
+
+    #########################################################################
+
+    def _pin(self, index):
+        # Keeps the playing GIF and the next one resident, and starts preparing the next one
+        following = self._following(index)
+        with self.lock:
+            self.pinned = {index, following}
+            self._evict()
+        self.prefetch(following)
+
+    def _following(self, index):
+        count = len(self.gif_paths)
+        for offset in range(1, count + 1):
+            candidate = (index + offset) % count
+            if candidate not in self.invalid:
+                return candidate
+        return index
+
+    def _evict(self):
+        # Caller holds the lock
+        residentBytes = sum(size for _, size in self.resident.values())
+        for index in list(self.resident):
+            if residentBytes <= self.memoryBudget:
+                break
+            if index in self.pinned:
+                continue
+            residentBytes -= self.resident.pop(index)[1]
+            self.evictions += 1
+
+    #########################################################################
+
+    def waitForFirst(self, stopped=None):
+        for index in range(len(self.gif_paths)):
+            if stopped and stopped():
+                return None
+            if self._load(index):
+                return index
+        return None
+
+    def nextReady(self, index):
+        count = len(self.gif_paths)
+        for offset in range(1, count + 1):
+            candidate = (index + offset) % count
+            if candidate not in self.invalid and self._load(candidate):
+                stats = self.stats()
+                print(f"Cycle cache: {stats['resident_gifs']} GIFs / {stats['resident_bytes'] / 1024:.0f}KB resident, "
+                      f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+                return candidate
+        return index
+
+    def stats(self):
+        with self.lock:
+            return {
+                "resident_gifs": len(self.resident),
+                "resident_bytes": sum(size for _, size in self.resident.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "prefetches": self.prefetches,
+                "evictions": self.evictions
+            }
+
+    def shutdown(self):
+        # Drops any GIFs not started yet, e.g. when playback stops mid-preparation
+        with self.lock:
+            self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
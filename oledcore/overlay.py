@@ -0,0 +1,163 @@
+import time
+from collections import OrderedDict
+from threading import Thread, Lock, Condition
+
+STATUS_CACHE_SIZE = 32
+# Encoded status messages kept, the app only ever shows a handful of different ones
+
+
+#############################################################################
+#####                           STATUS CACHE                            #####
+#############################################################################
+
+class StatusCache:
+    # Status messages ("GIF Stopped!", "Add GIFs!", the blank clear screen...) fully encoded into the
+    # reports that draw them, keyed by text, layout and invert state, least recently used evicted first.
+    # render(text, layout, invert) builds the reports of a message the first time it is shown.
+
+    def __init__(self, render, size=STATUS_CACHE_SIZE):
+        self.render = render
+        self.size = size
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        # (text, layout, invert) -> tuple of reports, least recently used first
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, layout, invert):
+        key = (text, layout, bool(invert))
+        with self.lock:
+            reports = self.entries.get(key)
+            if reports is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return reports
+            self.misses += 1
+
+        reports = tuple(self.render(text, layout, bool(invert)))
+        with self.lock:
+            self.entries[key] = reports
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return reports
+
+
+#############################################################################
+#####                          STATUS OVERLAY                           #####
+#############################################################################
+
+class StatusOverlay:
+    # Shows status messages from one long-lived thread, started with the first message, instead of a
+    # thread per message. A message with a timer is cleared to a blank screen after timer seconds. A
+    # newer message replaces one still waiting to be sent and cancels the pending clear, so an old
+    # message's clear never blanks a newer one. Playback drawing over the screen calls cancelPending()
+    # for the same reason.
+    # send(reports) puts a message's reports on the screen.
+
+    def __init__(self, cache, send, layout):
+        self.cache = cache
+        self.send = send
+        self.layout = layout
+        self.condition = Condition()
+        self.pending = None
+        # (text, timer, invert) of the newest message not sent yet
+        self.clearAt = None
+        # perf_counter() time to clear the last message at, None if it stays up
+        self.sending = False
+        self.stopped = False
+        self.thread = None
+
+        self.shown = 0
+        self.replaced = 0
+        # Messages dropped because a newer one came in before they were sent
+        self.clears = 0
+        self.cancelled = 0
+        # Messages and clears dropped by cancelPending()
+
+    def show(self, text, timer, invert):
+        with self.condition:
+            if self.stopped:
+                return
+            if self.thread is None:
+                self.thread = Thread(target=self._run, daemon=True, name="status-overlay")
+                self.thread.start()
+            if self.pending is not None:
+                self.replaced += 1
+            self.pending = (text, timer, invert)
+            self.condition.notify_all()
+
+    def cancelPending(self):
+        # Drops a message not sent yet and the clear of the last one. A message already being sent
+        # still goes out, but is no longer cleared.
+        with self.condition:
+            if self.pending is not None or self.clearAt is not None:
+                self.cancelled += 1
+            self.pending = None
+            self.clearAt = None
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        # Waits until the newest message has been sent, False if that took longer than timeout
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and not self.sending, timeout)
+
+    def stop(self, timeout=1.0):
+        # Ends the thread for good, messages shown after this are ignored
+        with self.condition:
+            self.stopped = True
+            self.pending = None
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+
+    #########################################################################
+
+    def _next(self):
+        # Waits for the next message, or None once it is time to clear the screen.
+        # Returns False once stopped.
+        with self.condition:
+            while self.pending is None and not self.stopped:
+                if self.clearAt is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.clearAt - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            if self.stopped:
+                return False
+            message, self.pending = self.pending, None
+            if message is None:
+                self.clearAt = None
+            else:
+                # Set here, under the lock, so a cancelPending() while the message is sent still holds
+                timer = message[1]
+                self.clearAt = time.perf_counter() + timer if timer else None
+            self.sending = True
+            return message
+
+    def _run(self):
+        while True:
+            message = self._next()
+            if message is False:
+                return
+            if message is None:
+                # Always black, whatever the invert state
+                reports = self.cache.get("", self.layout, False)
+            else:
+                text, timer, invert = message
+                reports = self.cache.get(text, self.layout, invert)
+
+            try:
+                self.send(reports)
+            except Exception as e:
+                print(f"Error showing status message: {e}")
+            with self.condition:
+                self.sending = False
+                if message is None:
+                    self.clears += 1
+                else:
+                    self.shown += 1
+                self.condition.notify_all()
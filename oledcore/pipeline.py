@@ -0,0 +1,130 @@
+import numpy as np
+from PIL import Image, ImageSequence
+
+from oledcore.scheduler import frameDuration
+from oledcore.usbdevice import DRAW_REPORT_ID, DRAW_COMMAND, REPORT_HEADER_SIZE
+
+# Every GIF goes through the same stages on its way to a screen:
+#   decode -> composite onto a background -> grayscale and scale -> binarize -> encode
+# Everything up to the binarized pixels is shared. An encoder turns (height, width) bool pixels
+# into what its screen takes, and says what size, background and binarization it wants them in.
+
+ENCODERS = {}
+
+
+#############################################################################
+#####                              ENCODERS                             #####
+#############################################################################
+
+class GameSenseBitmapEncoder:
+    # image-data-128x52 bitmaps for a GameSense screen event: 832 bytes,
+    # row-major, 8 pixels per byte, leftmost pixel in the most significant bit
+    width = 128
+    height = 52
+    background = (255, 255, 255)
+    # Transparent pixels show white, as they always have through cv2
+    dither = False
+    threshold = 128
+    # Cubic resize, then pixels brighter than threshold are lit
+
+    def encode(self, pixels):
+        return self.encodeStack(pixels[np.newaxis])[0]
+
+    def encodeStack(self, frames):
+        # Packs a (frames, height, width) stack in one go
+        packed = np.packbits(frames, axis=2)
+        return packed.reshape(len(frames), -1).tolist()
+
+
+class UsbReportEncoder:
+    # 0x93 draw reports for the USB screen, one per splitWidth wide column of the screen.
+    # Column-major pixels, least significant bit first, padded to reportSize.
+    width = 128
+    height = 64
+    background = (0, 0, 0)
+    dither = True
+    # Lanczos resize, then Floyd-Steinberg dithering
+
+    def __init__(self, reportSize=1024, splitWidth=64):
+        self.reportSize = reportSize
+        self.splitWidth = splitWidth
+
+    def encode(self, pixels):
+        return tuple(self.packDrawReport(pixels[:, x:x + self.splitWidth], x, 0)
+                     for x in range(0, pixels.shape[1], self.splitWidth))
+
+    def packDrawReport(self, pixels, x, y):
+        # Draws a (height, width) bool array with its top left corner at x, y
+        height, width = pixels.shape
+
+        report = bytearray(self.reportSize)
+        report[0] = DRAW_REPORT_ID
+        report[1] = DRAW_COMMAND
+        report[2] = int(x) & 0xFF
+        report[3] = int(y) & 0xFF
+        report[4] = width & 0xFF
+        report[5] = height & 0xFF
+
+        # Pixel (x, y) is bit x * height + y
+        data = np.packbits(pixels.T.ravel(), bitorder='little')
+        report[REPORT_HEADER_SIZE:REPORT_HEADER_SIZE + data.size] = data.tobytes()
+        return bytes(report)
+
+
+def registerEncoder(name, encoder):
+    ENCODERS[name] = encoder
+    return encoder
+
+def getEncoder(encoder):
+    # Takes a registered name or an encoder
+    return ENCODERS[encoder] if isinstance(encoder, str) else encoder
+
+registerEncoder("gamesense", GameSenseBitmapEncoder())
+registerEncoder("usb", UsbReportEncoder())
+
+
+#############################################################################
+#####                               STAGES                              #####
+#############################################################################
+
+def iterDecodedFrames(gif_path, background=(0, 0, 0)):
+    # Yields (RGB frame, duration) for each frame, reading pixels and durations in one pass.
+    # Transparent pixels are filled with background; frames without transparency skip that step.
+    try:
+        with Image.open(gif_path) as img:
+            for frame in ImageSequence.Iterator(img):
+                duration = frameDuration(frame.info)
+                if frame.mode == "RGB" or (frame.mode in ("P", "L") and "transparency" not in frame.info):
+                    yield frame.convert("RGB"), duration
+                    continue
+                rgba = frame.convert("RGBA")
+                composited = Image.new("RGBA", rgba.size, background + (255,))
+                composited.paste(rgba, (0, 0), rgba)
+                yield composited.convert("RGB"), duration
+    except FileNotFoundError:
+        print(f"Error: GIF file not found at {gif_path}")
+    except Exception as e:
+        print(f"Error decoding GIF {gif_path}: {e}")
+
+def scaleFrame(frame, encoder):
+    # Grayscale, scale and binarize a decoded frame into the encoder's (height, width) bool pixels
+    if encoder.dither:
+        scaled = frame.resize((encoder.width, encoder.height), Image.Resampling.LANCZOS)
+        return np.asarray(scaled.convert('1', dither=Image.Dither.FLOYDSTEINBERG)) > 0
+
+    import cv2 # Only the thresholded screens need it, so the USB build can leave it out
+    gray = cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2GRAY)
+    gray = cv2.resize(gray, (encoder.width, encoder.height), interpolation=cv2.INTER_CUBIC)
+    return gray > encoder.threshold
+
+def iterFramePixels(gif_path, encoder):
+    # Yields (pixels, duration) for each frame as soon as it is decoded
+    encoder = getEncoder(encoder)
+    for frame, duration in iterDecodedFrames(gif_path, encoder.background):
+        yield scaleFrame(frame, encoder), duration
+
+def iterEncodedFrames(gif_path, encoder, invert=False):
+    # Yields (encoded frame, duration) for each frame as soon as it is decoded
+    encoder = getEncoder(encoder)
+    for pixels, duration in iterFramePixels(gif_path, encoder):
+        yield encoder.encode(~pixels if invert else pixels), duration
@@ -0,0 +1,126 @@
+from threading import Thread, Lock, current_thread
+
+STOP_TIMEOUT_SECONDS = 3.0
+# How long stopping waits for the playback thread. A stop cuts the wait for the next frame short, so this
+# only comes into play for a thread stuck in a send, e.g. an Engine request that runs into its own
+# timeout (1s connect + 2s read, see EngineTransport).
+
+
+#############################################################################
+#####                            CANCEL TOKEN                           #####
+#############################################################################
+
+class CancelToken:
+    # Cancels one playback run. The player takes the token as its run starts and checks it between
+    # frames, instead of a running flag that the next run would set back to True while the old loop
+    # is still going. Whatever the run waits on (its TimerQueue, the pipelined sender) registers
+    # with onCancel, so cancelling wakes it instead of leaving it to notice on its own.
+
+    def __init__(self):
+        self.lock = Lock()
+        self.cancelled = False
+        self.callbacks = []
+
+    def cancel(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def onCancel(self, callback):
+        # Runs callback when the token is cancelled, straight away if it already is
+        with self.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+
+#############################################################################
+#####                        PLAYBACK CONTROLLER                        #####
+#############################################################################
+
+class PlaybackController:
+    # Owns the one thread that plays on a player. Every start cancels the run before it, and the new
+    # run's thread waits for the old one to end before it plays, so two loops never send frames at once.
+    # Neither start nor stop waits on a playback thread for the caller (the GUIs call them on the Tk
+    # thread); stop can wait when asked. If the old thread is still stuck in a send after stopTimeout it
+    # is left to finish that send on its own: its token is cancelled, so it exits right after without
+    # sending another frame.
+
+    def __init__(self, player, stopTimeout=STOP_TIMEOUT_SECONDS):
+        self.player = player
+        self.stopTimeout = stopTimeout
+        self.lock = Lock()
+        self.thread = None
+        # The last playback thread started, kept after a stop so the next start waits for it
+        self.current = None
+        # The thread allowed to play, None once stopped
+        self.waiting = False
+        # The current thread is still waiting for the run before it
+        self.slowStops = 0
+        # Stops that gave up waiting for the thread
+
+    def play(self, gif_path):
+        self.start(self.player.playGIF, gif_path)
+
+    def cycle(self, gif_paths):
+        self.start(self.player.playGIFCycle, gif_paths)
+
+    def start(self, target, *args):
+        # Runs target(*args) as the player's only playback thread
+        with self.lock:
+            previous = self.thread
+            if previous is not None and previous.is_alive():
+                # Only a run still going here needs stopping. A RemotePlayer's thread ends as soon as the
+                # daemon replies, and the daemon replaces or keeps what it plays on its own; a stop sent
+                # first would restart a GIF it is already playing.
+                self.player.stopGIF()
+            else:
+                previous = None
+            self.waiting = True
+            self.thread = self.current = Thread(target=self._run, args=(previous, target, args), name="playback")
+            self.thread.start()
+
+    def stop(self, wait=True):
+        # With wait, True once the playback thread has ended and False if it is still finishing a send.
+        # Without, cancels the run and returns straight away.
+        with self.lock:
+            thread = self.thread
+            self.current = None
+            self.player.stopGIF()
+        if not wait or thread is None or thread is current_thread():
+            # Nothing to wait for, or a run stopping itself
+            return True
+        return self._join(thread)
+
+    def playing(self):
+        with self.lock:
+            return self.current is not None and self.current.is_alive() and (self.waiting or self.player.running)
+
+    #########################################################################
+
+    def _run(self, previous, target, args):
+        if previous is not None:
+            self._join(previous)
+        with self.lock:
+            if self.current is not current_thread():
+                # Stopped or replaced while waiting
+                return
+            self.waiting = False
+            self.player.running = True
+            # A fresh CancelToken, which target takes as it starts. A stop or start from here on
+            # cancels it, so target then ends before its first frame.
+        target(*args)
+
+    def _join(self, thread):
+        thread.join(self.stopTimeout)
+        if thread.is_alive():
+            with self.lock:
+                self.slowStops += 1
+            print(f"Playback thread did not stop within {self.stopTimeout:g}s, it ends after its current send")
+            return False
+        return True
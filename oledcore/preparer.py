@@ -0,0 +1,82 @@
+import os
+import time
+from threading import Condition
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 1
+# More workers have yet to show a speed-up in bench_suite's cycle.prepare_all.workers_* metrics, and on a
+# single core they are slower; raise this once they scale on multi-core machines
+
+
+#############################################################################
+#####                        PARALLEL PREPARATION                       #####
+#############################################################################
+
+class ParallelPreparer:
+    # Prepares every GIF of a cycle folder on a pool of worker threads, in the background of playback.
+    # Results are kept in folder order; playback can start as soon as any one is ready.
+
+    def __init__(self, prepare, gif_paths, workers=None):
+        self.prepare = prepare
+        self.gif_paths = list(gif_paths)
+        self.results = [None] * len(self.gif_paths)
+        self.timings = {}
+        self.pending = len(self.gif_paths)
+        self.condition = Condition()
+
+        self.executor = ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS,
+                                           thread_name_prefix="gif-prepare")
+        for index, path in enumerate(self.gif_paths):
+            self.executor.submit(self._prepare, index, path)
+
+    #########################################################################
+
+    def _prepare(self, index, path):
+        start = time.perf_counter()
+        try:
+            result = self.prepare(path)
+        except Exception as e:
+            print(f"Error preparing {path}: {e}")
+            result = None
+        seconds = time.perf_counter() - start
+        print(f"Prepared {os.path.basename(path)} in {seconds * 1000:.0f}ms")
+
+        with self.condition:
+            self.timings[path] = seconds
+            if result:
+                self.results[index] = result
+            # Empty results (unreadable GIFs) are skipped in the cycle
+            self.pending -= 1
+            self.condition.notify_all()
+
+    #########################################################################
+
+    def waitForFirst(self, stopped=None):
+        # Blocks until any GIF is ready and returns its index, or None if none of them can be played
+        with self.condition:
+            while True:
+                ready = self.readyIndexes()
+                if ready:
+                    return ready[0]
+                if self.pending == 0 or (stopped and stopped()):
+                    return None
+                self.condition.wait(0.1)
+
+    def get(self, index):
+        return self.results[index]
+
+    def readyIndexes(self):
+        return [index for index, result in enumerate(self.results) if result is not None]
+
+    def nextReady(self, index):
+        # The next ready GIF after index in folder order, wrapping around
+        count = len(self.results)
+        for offset in range(1, count + 1):
+            candidate = (index + offset) % count
+            if self.results[candidate] is not None:
+                return candidate
+        return index
+
+    def shutdown(self):
+        # Drops any GIFs not started yet, e.g. when playback stops mid-preparation
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,174 @@
+import time
+from collections import deque
+from threading import Lock
+
+ADJUST_SECONDS = 0.5
+# How often the send interval is reconsidered
+TARGET_QUEUE_SECONDS = 0.02
+# Round trip time above the Engine's baseline that counts as frames queueing up in it
+BASELINE_SAMPLES = 100
+# The fastest of this many recent round trips is the baseline
+SMOOTHING = 0.2
+MAX_INTERVAL_SECONDS = 0.5
+BACKOFF_FACTOR = 1.25
+SPEEDUP_FACTOR = 0.85
+LENGTH_MARGIN_MILLIS = 50
+REBIND_SECONDS = 1.0
+# length-millis is bound again at most this often
+
+
+#############################################################################
+#####                            RATE CONTROL                           #####
+#############################################################################
+
+class RateController:
+    # Closed loop control of how often frames are sent to the Engine, driven by game_event round trips.
+    # The fastest recent round trip is the Engine's baseline. When the smoothed round trip climbs more
+    # than targetQueueSeconds above it (or requests fail), frames are waiting in the Engine, so the
+    # interval between sends backs off to slower than the rate actually achieved. Once the backlog has
+    # drained the interval shrinks again, step by step, down to minInterval.
+    # FrameScheduler skips frames that would be over before the next send is allowed, so the GIF keeps
+    # its timing instead of queueing behind a slow Engine. length-millis follows the longest wait
+    # between sends, so the screen holds each frame until the next one arrives.
+
+    def __init__(self, minInterval=0.001, maxInterval=MAX_INTERVAL_SECONDS, targetQueueSeconds=TARGET_QUEUE_SECONDS,
+                 boundLengthMillis=None, clock=time.monotonic):
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.targetQueueSeconds = targetQueueSeconds
+        self.clock = clock
+        self.lock = Lock()
+
+        self.interval = minInterval
+        self.lastSendAt = None
+        self.roundTrips = deque(maxlen=BASELINE_SAMPLES)
+        self.smoothedRoundTrip = None
+        self.recentHolds = deque(maxlen=20)
+        # Time each recent frame was meant to stay on screen
+
+        self.boundLengthMillis = boundLengthMillis
+        self.lastBindAt = clock()
+
+        self.windowStart = clock()
+        self.windowSends = 0
+        self.windowErrors = 0
+        # Since the interval was last reconsidered
+
+        self.backoffs = 0
+        self.speedups = 0
+        self.skippedFrames = 0
+        self.rebinds = 0
+
+    #########################################################################
+
+    def nextSendTime(self):
+        # Earliest time the next frame may go out
+        with self.lock:
+            if self.lastSendAt is None:
+                return float("-inf")
+            return self.lastSendAt + self.interval
+
+    def sent(self, now, hold):
+        # Called by FrameScheduler as it releases a frame meant to be shown for hold seconds
+        with self.lock:
+            self.lastSendAt = now
+            self.windowSends += 1
+            self.recentHolds.append(hold)
+
+    def skipped(self):
+        with self.lock:
+            self.skippedFrames += 1
+
+    def recordRoundTrip(self, seconds, ok=True):
+        with self.lock:
+            self.roundTrips.append(seconds)
+            if self.smoothedRoundTrip is None:
+                self.smoothedRoundTrip = seconds
+            else:
+                self.smoothedRoundTrip += SMOOTHING * (seconds - self.smoothedRoundTrip)
+            if not ok:
+                self.windowErrors += 1
+            self._adjust()
+
+    def recordFailure(self):
+        # A request that never got a reply
+        with self.lock:
+            self.windowErrors += 1
+            self._adjust()
+
+    #########################################################################
+
+    def _adjust(self):
+        # Caller holds the lock
+        now = self.clock()
+        elapsed = now - self.windowStart
+        if elapsed < ADJUST_SECONDS:
+            return
+
+        baseline = min(self.roundTrips) if self.roundTrips else 0.0
+        roundTrip = self.smoothedRoundTrip or 0.0
+        queued = roundTrip - baseline
+        achieved = elapsed / self.windowSends if self.windowSends else self.interval
+        # Average time between the frames actually sent, which a backed up Engine has been setting
+
+        old = self.interval
+        if self.windowErrors or queued > self.targetQueueSeconds:
+            self.interval = min(max(self.interval, achieved) * BACKOFF_FACTOR, self.maxInterval)
+            reason = f"{self.windowErrors} failed sends" if self.windowErrors else "Engine is queueing frames"
+            if self.interval != old:
+                self.backoffs += 1
+        elif queued < self.targetQueueSeconds / 2 and self.interval > self.minInterval:
+            self.interval = max(self.interval * SPEEDUP_FACTOR, self.minInterval)
+            reason = "Engine caught up"
+            self.speedups += 1
+
+        if self.interval != old:
+            print(f"Rate control: {reason}, round trip {roundTrip * 1000:.1f}ms "
+                  f"(baseline {baseline * 1000:.1f}ms), frame interval {old * 1000:.1f}ms -> {self.interval * 1000:.1f}ms")
+
+        self.windowStart = now
+        self.windowSends = 0
+        self.windowErrors = 0
+
+    #########################################################################
+
+    def lengthMillis(self):
+        with self.lock:
+            return self._lengthMillis()
+
+    def _lengthMillis(self):
+        # How long the Engine should hold a frame: at worst the next frame waits out the send
+        # interval and then the rest of a frame's hold before it is due. Caller holds the lock.
+        gap = max(self.recentHolds, default=0) + self.interval
+        return int(round(gap * 1000)) + LENGTH_MARGIN_MILLIS
+
+    def rebindLength(self):
+        # Returns a new length-millis when the bound one no longer fits, else None.
+        # Too short a length blanks the screen between frames, so it is raised straight away with some
+        # headroom; a length more than twice what is needed is lowered after REBIND_SECONDS.
+        # Called after every send, so it takes the lock once.
+        with self.lock:
+            required = self._lengthMillis()
+            now = self.clock()
+            bound = self.boundLengthMillis
+            if bound is not None and required <= bound and (required * 2 >= bound or now - self.lastBindAt < REBIND_SECONDS):
+                return None
+            length = int(required * 1.25) if bound is None or required > bound else required
+            print(f"Rate control: length-millis {bound} -> {length}")
+            self.boundLengthMillis = length
+            self.lastBindAt = now
+            self.rebinds += 1
+            return length
+
+    def stats(self):
+        with self.lock:
+            return {
+                "interval_ms": self.interval * 1000,
+                "round_trip_ms": (self.smoothedRoundTrip or 0) * 1000,
+                "baseline_ms": min(self.roundTrips) * 1000 if self.roundTrips else 0,
+                "backoffs": self.backoffs,
+                "speedups": self.speedups,
+                "skipped": self.skippedFrames,
+                "rebinds": self.rebinds,
+                "length_millis": self.boundLengthMillis
+            }
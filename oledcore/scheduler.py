@@ -0,0 +1,198 @@
+import time
+import heapq
+from threading import Condition
+
+DEFAULT_FRAME_SECONDS = 0.1
+# Browsers play GIF frames with no delay (or <= 10ms) at 100ms, so we do the same
+MIN_GIF_DELAY_MS = 10
+MAX_LAG_SECONDS = 1.0
+# Falling further behind than this (device reconnect, Engine hiccup) restarts the timeline
+CYCLE_SECONDS = 20.0
+# How long each GIF plays in cycle mode before the next one takes over
+ROTATE_TIMER = "rotate"
+
+
+#############################################################################
+#####                          FRAME SCHEDULER                          #####
+#############################################################################
+
+class FrameScheduler:
+    # Paces frames against absolute deadlines on a monotonic clock.
+    # Each deadline is the previous one plus the frame's hold time, so the time
+    # spent sending a frame is absorbed instead of added on top of its delay.
+
+    def __init__(self, speed=1.0, minFrameSeconds=0, clock=time.monotonic, sleep=time.sleep, telemetry=None,
+                 rateControl=None, timers=None):
+        self.speed = speed
+        self.minFrameSeconds = minFrameSeconds
+        self.clock = clock
+        self.sleep = sleep
+        self.telemetry = telemetry
+        # Optional PlaybackTelemetry that gets every drop, resync and how late each frame went out
+        self.rateControl = rateControl
+        # Optional RateController that can hold frames back for a slow receiver
+        self.timers = timers
+        # Optional TimerQueue to wait on instead of sleeping, so a stop or a GIF switch cuts the wait short
+
+        self.deadline = None
+        self.sentFrames = 0
+        self.droppedFrames = 0
+        self.skippedFrames = 0
+        self.resyncs = 0
+
+    #########################################################################
+
+    def holdSeconds(self, duration):
+        return max(duration / self.speed, self.minFrameSeconds)
+
+    def frames(self, durations):
+        # Yields the index of each frame that is due, sleeping until its deadline.
+        # Frames whose whole display window has already passed are dropped, and so are frames
+        # that would be over before the rate controller lets the next one out.
+        # With a TimerQueue, the frames end before the next one when it is stopped or one of its timers fires.
+        if self.deadline is None:
+            self.deadline = self.clock()
+
+        for index, duration in enumerate(durations):
+            hold = self.holdSeconds(duration)
+            now = self.clock()
+
+            if now - self.deadline > MAX_LAG_SECONDS:
+                self.deadline = now
+                self.resyncs += 1
+                if self.telemetry:
+                    self.telemetry.recordResync()
+            elif now >= self.deadline + hold:
+                self.deadline += hold
+                self.droppedFrames += 1
+                if self.telemetry:
+                    self.telemetry.recordDrop()
+                continue
+
+            sendAt = self.deadline
+            if self.rateControl:
+                sendAt = max(sendAt, self.rateControl.nextSendTime())
+                if sendAt >= self.deadline + hold:
+                    self.deadline += hold
+                    self.skippedFrames += 1
+                    self.rateControl.skipped()
+                    if self.telemetry:
+                        self.telemetry.recordSkip()
+                    continue
+
+            if self.timers:
+                # Checked even when the frame is already due, so a timer that fires while sends run
+                # longer than the frames' holds still ends the frames on the next one
+                if not self.timers.waitUntil(sendAt):
+                    return
+            elif now < sendAt:
+                self.sleep(sendAt - now)
+            if self.telemetry:
+                # After a sleep this is the sleep's overshoot
+                self.telemetry.recordLag(self.clock() - sendAt)
+            if self.rateControl:
+                self.rateControl.sent(self.clock(), hold)
+
+            yield index
+            self.sentFrames += 1
+            self.deadline += hold
+
+    def resync(self):
+        # Moves a missed deadline up to now, for when frames arrive late through no fault of the sender
+        now = self.clock()
+        if self.deadline is None or self.deadline < now:
+            self.deadline = now
+
+    def restart(self):
+        # Starts the timeline over at the next frame, for when a different GIF takes over
+        self.deadline = None
+
+    def stats(self):
+        return {
+            "sent": self.sentFrames,
+            "dropped": self.droppedFrames,
+            "skipped": self.skippedFrames,
+            "resyncs": self.resyncs
+        }
+
+
+#############################################################################
+#####                            TIMER QUEUE                            #####
+#############################################################################
+
+class TimerQueue:
+    # Everything a playback thread waits for, in one heap behind one condition: the next frame's
+    # deadline, named timers such as GIF rotation, and stop requests. The thread sleeps until the
+    # earliest of them is due and is woken straight away by stop(), so it never wakes up to poll.
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.condition = Condition()
+        self.timers = []
+        # Heap of (due time, sequence, name); entries replaced or cancelled since are skipped
+        self.armed = {}
+        # name -> sequence of its live heap entry
+        self.sequence = 0
+        self.fired = set()
+        self.stopped = False
+        self.wakeups = 0
+
+    def schedule(self, name, seconds):
+        # Arms the timer name to fire seconds from now, replacing it if already armed
+        with self.condition:
+            self.sequence += 1
+            self.armed[name] = self.sequence
+            self.fired.discard(name)
+            heapq.heappush(self.timers, (self.clock() + seconds, self.sequence, name))
+            self.condition.notify_all()
+
+    def cancel(self, name):
+        with self.condition:
+            self.armed.pop(name, None)
+            self.fired.discard(name)
+
+    def consume(self, name):
+        # True, once, if the timer name has fired
+        with self.condition:
+            self._expire(self.clock())
+            if name in self.fired:
+                self.fired.remove(name)
+                return True
+            return False
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def waitUntil(self, deadline):
+        # Sleeps until deadline on the queue's clock. Returns False as soon as the queue is stopped
+        # or a timer fires before then; the timer stays fired until it is consumed.
+        with self.condition:
+            while True:
+                now = self.clock()
+                self._expire(now)
+                if self.stopped or self.fired:
+                    return False
+                if now >= deadline:
+                    return True
+                wakeAt = min(deadline, self.timers[0][0]) if self.timers else deadline
+                self.condition.wait(wakeAt - now)
+                self.wakeups += 1
+
+    def _expire(self, now):
+        # Caller holds the condition
+        while self.timers and self.timers[0][0] <= now:
+            _, sequence, name = heapq.heappop(self.timers)
+            if self.armed.get(name) == sequence:
+                del self.armed[name]
+                self.fired.add(name)
+
+
+#############################################################################
+
+def frameDuration(info):
+    delay = info.get("duration")
+    if not delay or delay <= MIN_GIF_DELAY_MS:
+        return DEFAULT_FRAME_SECONDS
+    return delay / 1000
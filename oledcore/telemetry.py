@@ -0,0 +1,236 @@
+import os
+import json
+import time
+from bisect import bisect_left
+from collections import deque
+from threading import Thread, Lock, Event
+
+HISTOGRAM_BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Upper edge of each bucket in milliseconds; anything slower goes in one last bucket
+RECENT_FRAMES = 120
+# Frames the live frame rate is measured over
+BEHIND_WINDOW_SECONDS = 5.0
+# The display counts as falling behind while frames were dropped or late within this window
+LATE_FRAME_SECONDS = 0.05
+METRICS_INTERVAL_SECONDS = 2.0
+
+
+#############################################################################
+#####                             HISTOGRAM                             #####
+#############################################################################
+
+class LatencyHistogram:
+    # Fixed buckets, so recording a sample is a bisect and two additions
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        milliseconds = seconds * 1000
+        self.counts[bisect_left(self.bounds, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        if milliseconds > self.max:
+            self.max = milliseconds
+
+    def percentile(self, percent):
+        # Upper edge of the bucket holding the percentile, the max for the last bucket
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+            "buckets_ms": dict(zip([str(bound) for bound in self.bounds] + ["inf"], self.counts))
+        }
+
+
+#############################################################################
+#####                         PLAYBACK TELEMETRY                        #####
+#############################################################################
+
+class PlaybackTelemetry:
+    # Counters and latency histograms for the send path, shared by the player and its scheduler.
+    # Everything is recorded under one lock, so the GUI and metrics file can read it while playing.
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.framesSent = 0
+            self.framesDropped = 0
+            self.framesSkipped = 0
+            # Held back on purpose by rate control, which isn't counted as falling behind
+            self.resyncs = 0
+            self.errors = 0
+            self.units = 0
+            self.bytes = 0
+            # Engine requests or HID reports, and their size
+            self.sendLatency = LatencyHistogram()
+            self.replyLatency = LatencyHistogram()
+            # Time until the Engine answered, for pipelined sends that don't wait for it
+            self.lag = LatencyHistogram()
+            # How long after its deadline each frame went out, sleep overshoot included
+            self.recentSends = deque(maxlen=RECENT_FRAMES)
+            self.recentTrouble = deque()
+            # Times of drops, resyncs, errors and late frames, for falling behind
+            self.lastError = None
+            self.playing = False
+            self.startedAt = None
+
+    #########################################################################
+
+    def start(self):
+        with self.lock:
+            self.playing = True
+            self.startedAt = self.clock()
+            self.recentSends.clear()
+
+    def stop(self):
+        with self.lock:
+            self.playing = False
+
+    def recordLag(self, seconds):
+        # Called by FrameScheduler as each frame is released
+        with self.lock:
+            self.lag.record(max(seconds, 0))
+            if seconds > LATE_FRAME_SECONDS:
+                self.recentTrouble.append(self.clock())
+
+    def recordDrop(self):
+        with self.lock:
+            self.framesDropped += 1
+            self.recentTrouble.append(self.clock())
+
+    def recordSkip(self):
+        with self.lock:
+            self.framesSkipped += 1
+
+    def recordResync(self):
+        with self.lock:
+            self.resyncs += 1
+            self.recentTrouble.append(self.clock())
+
+    def recordSend(self, seconds, units=1, size=0):
+        with self.lock:
+            self.framesSent += 1
+            self.units += units
+            self.bytes += size
+            self.sendLatency.record(seconds)
+            self.recentSends.append(self.clock())
+
+    def recordReply(self, seconds):
+        with self.lock:
+            self.replyLatency.record(seconds)
+
+    def recordError(self, error=None):
+        with self.lock:
+            self.errors += 1
+            self.lastError = str(error) if error is not None else "error"
+            self.recentTrouble.append(self.clock())
+
+    #########################################################################
+
+    def _recentFps(self, now):
+        # Caller holds the lock
+        if len(self.recentSends) < 2 or now - self.recentSends[-1] > 1.0:
+            return 0.0
+        return (len(self.recentSends) - 1) / (self.recentSends[-1] - self.recentSends[0])
+
+    def _fallingBehind(self, now):
+        # Caller holds the lock
+        while self.recentTrouble and now - self.recentTrouble[0] > BEHIND_WINDOW_SECONDS:
+            self.recentTrouble.popleft()
+        return self.playing and bool(self.recentTrouble)
+
+    def snapshot(self):
+        with self.lock:
+            now = self.clock()
+            return {
+                "playing": self.playing,
+                "seconds_playing": now - self.startedAt if self.playing and self.startedAt else 0.0,
+                "fps": self._recentFps(now),
+                "falling_behind": self._fallingBehind(now),
+                "frames_sent": self.framesSent,
+                "frames_dropped": self.framesDropped,
+                "frames_skipped": self.framesSkipped,
+                "resyncs": self.resyncs,
+                "errors": self.errors,
+                "last_error": self.lastError,
+                "sent_units": self.units,
+                "sent_bytes": self.bytes,
+                "send_latency": self.sendLatency.snapshot(),
+                "reply_latency": self.replyLatency.snapshot(),
+                "frame_lag": self.lag.snapshot()
+            }
+
+    def summary(self):
+        # One line for the tray icon tooltip
+        snapshot = self.snapshot()
+        if not snapshot["playing"]:
+            return "Stopped"
+        text = f"{snapshot['fps']:.1f} fps, send p95 {snapshot['send_latency']['p95_ms']:g}ms"
+        if snapshot["falling_behind"]:
+            text += f" - FALLING BEHIND ({snapshot['frames_dropped']} dropped, {snapshot['errors']} errors)"
+        return text
+
+
+#############################################################################
+#####                            METRICS FILE                           #####
+#############################################################################
+
+class MetricsWriter:
+    # Rewrites a JSON file with the telemetry snapshot every interval seconds, for anything
+    # that wants to watch playback from outside the app. The file is replaced in one step.
+
+    def __init__(self, telemetry, path, interval=METRICS_INTERVAL_SECONDS):
+        self.telemetry = telemetry
+        self.path = path
+        self.interval = interval
+        self.stopped = Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self._run, daemon=True, name="metrics-writer")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(self.interval)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def write(self):
+        snapshot = self.telemetry.snapshot()
+        snapshot["written_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        temp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(temp_path, "w") as file:
+                json.dump(snapshot, file, indent=4)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not write metrics to {self.path}: {e}")
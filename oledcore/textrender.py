@@ -0,0 +1,224 @@
+from threading import Thread, Condition
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from oledcore.pipeline import getEncoder
+from oledcore.scheduler import FrameScheduler, TimerQueue
+
+DEFAULT_FONT_SIZE = 16
+MARQUEE_FPS = 30
+# Frames per second while a long message scrolls, one pixel per frame
+MARQUEE_GAP = 32
+# Blank pixels between the end of a scrolling message and its next pass
+GLYPH_CHARACTERS = "".join(chr(code) for code in range(32, 127))
+# Rasterised up front; anything else is added to the cache the first time it is used
+NEW_MESSAGE_TIMER = "message"
+
+
+#############################################################################
+#####                            GLYPH CACHE                            #####
+#############################################################################
+
+class GlyphCache:
+    # Every character is rasterised once, into a (line height, advance) bool array that messages are
+    # pasted together from. All glyphs share the line box of the printable ASCII set, so they keep
+    # their baseline when placed side by side.
+
+    def __init__(self, font):
+        self.font = font
+        _, self.top, _, bottom = font.getbbox(GLYPH_CHARACTERS)
+        self.height = bottom - self.top
+        self.glyphs = {}
+        self.misses = 0
+        for character in GLYPH_CHARACTERS:
+            self.glyph(character)
+        self.misses = 0
+        # Characters rasterised after the printable ASCII set
+
+    def glyph(self, character):
+        glyph = self.glyphs.get(character)
+        if glyph is None:
+            self.misses += 1
+            advance = max(int(round(self.font.getlength(character))), 1)
+            image = Image.new("1", (advance, self.height), 0)
+            ImageDraw.Draw(image).text((0, -self.top), character, font=self.font, fill=1)
+            glyph = self.glyphs[character] = np.asarray(image, dtype=bool)
+        return glyph
+
+    def pixels(self, text):
+        # (line height, width) lit pixels of a line of text
+        if not text:
+            return np.zeros((self.height, 0), dtype=bool)
+        return np.concatenate([self.glyph(character) for character in text], axis=1)
+
+
+#############################################################################
+#####                           TEXT RENDERER                           #####
+#############################################################################
+
+class TextRenderer:
+    # Rasterises messages into image-data-128x52 bitmaps, the same 832 byte frames OLED_GIF sends.
+    # A message that fits is centred. A longer one becomes a marquee strip: the message and a gap,
+    # with the start of the message repeated after it, so every scroll position is one screen wide
+    # window of the strip.
+
+    def __init__(self, fontPath=None, fontSize=DEFAULT_FONT_SIZE):
+        encoder = getEncoder("gamesense")
+        self.width = encoder.width
+        self.height = encoder.height
+        self.glyphs = GlyphCache(loadFont(fontPath, fontSize))
+
+    def render(self, text):
+        # Line breaks and runs of spaces become single spaces, the screen shows one line
+        pixels = self.glyphs.pixels(" ".join(text.split()))[:self.height]
+        rows, width = pixels.shape
+        if width <= self.width:
+            strip = np.zeros((rows, self.width), dtype=bool)
+            left = (self.width - width) // 2
+            strip[:, left:left + width] = pixels
+            positions = 1
+        else:
+            loop = np.concatenate([pixels, np.zeros((rows, MARQUEE_GAP), dtype=bool)], axis=1)
+            strip = np.concatenate([loop, loop[:, :self.width]], axis=1)
+            positions = loop.shape[1]
+        return TextFrames(strip, (self.height - rows) // 2, positions, self.width, self.height)
+
+
+class TextFrames:
+    # The frames of one message, cut from its strip as they are sent. The strip is packed once for each
+    # of the 8 pixel offsets within a byte that a window can start at, so a frame at any scroll position
+    # is a byte-aligned slice of one of them instead of repacking 128x52 pixels.
+
+    def __init__(self, strip, top, positions, width, height):
+        self.top = top
+        self.rows = strip.shape[0]
+        self.positions = positions
+        self.rowBytes = width // 8
+        self.height = height
+
+        padded = np.concatenate([strip, np.zeros((self.rows, 8), dtype=bool)], axis=1)
+        self.packed = [np.packbits(padded[:, shift:shift + strip.shape[1]], axis=1) for shift in range(8)]
+
+    def __len__(self):
+        return self.positions
+
+    def frame(self, position):
+        # Bitmap of the message scrolled left by position pixels
+        packed = self.packed[position % 8]
+        start = position // 8
+        frame = np.zeros((self.height, self.rowBytes), dtype=np.uint8)
+        frame[self.top:self.top + self.rows] = packed[:, start:start + self.rowBytes]
+        return frame.ravel().tolist()
+
+
+def loadFont(fontPath=None, fontSize=DEFAULT_FONT_SIZE):
+    if fontPath:
+        try:
+            return ImageFont.truetype(fontPath, fontSize)
+        except OSError as e:
+            print(f"Could not load font {fontPath}: {e}. Using the default font.")
+    try:
+        return ImageFont.load_default(fontSize)
+    except TypeError:
+        # Pillow before 10.1 only has the fixed size bitmap font
+        return ImageFont.load_default()
+
+
+#############################################################################
+#####                            TEXT DISPLAY                           #####
+#############################################################################
+
+class TextDisplay:
+    # Puts the newest message on the screen from one thread. Messages that arrive while a frame is
+    # being sent replace each other, so only the newest is rendered and sent. A scrolling message
+    # keeps going at fps until the next one arrives, which takes over at the next frame.
+
+    def __init__(self, send, renderer, fps=MARQUEE_FPS):
+        self.send = send
+        self.renderer = renderer
+        self.frameSeconds = 1 / fps
+        self.condition = Condition()
+        self.timers = TimerQueue()
+        self.pending = None
+        self.stopped = False
+        self.thread = None
+
+        self.received = 0
+        self.replaced = 0
+        # Messages dropped because a newer one came in before they were shown
+        self.framesSent = 0
+
+    def start(self):
+        self.thread = Thread(target=self._run, daemon=True, name="text-display")
+        self.thread.start()
+        return self
+
+    def show(self, text):
+        with self.condition:
+            if self.pending is not None:
+                self.replaced += 1
+            self.pending = text
+            self.received += 1
+            # Cuts a scrolling message's wait for its next frame short
+            self.timers.schedule(NEW_MESSAGE_TIMER, 0)
+            self.condition.notify()
+
+    def stop(self, timeout=1.0):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.timers.stop()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "received": self.received,
+                "replaced": self.replaced,
+                "frames_sent": self.framesSent,
+                "glyph_misses": self.renderer.glyphs.misses
+            }
+
+    #########################################################################
+
+    def _next(self):
+        # Waits for a message and takes it, None once stopped
+        with self.condition:
+            while self.pending is None and not self.stopped:
+                self.condition.wait()
+            if self.stopped:
+                return None
+            text, self.pending = self.pending, None
+            # Taken under the same lock show() arms the timer with, so it only ever interrupts a newer message
+            self.timers.consume(NEW_MESSAGE_TIMER)
+            return text
+
+    def _run(self):
+        while True:
+            text = self._next()
+            if text is None:
+                return
+            frames = self.renderer.render(text)
+            if len(frames) == 1:
+                self._send(frames.frame(0))
+                continue
+            scheduler = FrameScheduler(timers=self.timers)
+            for index in scheduler.frames(self._marqueeFrames()):
+                self._send(frames.frame(index % len(frames)))
+
+    def _marqueeFrames(self):
+        # Frame times of a scrolling message until a newer one comes in or the display stops.
+        # Checked before every frame, dropped ones too: with sends slower than a frame the scheduler
+        # never waits on the timers, so the NEW_MESSAGE_TIMER alone wouldn't end the marquee.
+        while True:
+            with self.condition:
+                if self.pending is not None or self.stopped:
+                    return
+            yield self.frameSeconds
+
+    def _send(self, bitmap):
+        self.send(bitmap)
+        with self.condition:
+            self.framesSent += 1
@@ -0,0 +1,189 @@
+import time
+import random
+from threading import Lock
+
+import numpy as np
+
+DRAW_REPORT_ID = 0x06
+DRAW_COMMAND = 0x93
+REPORT_HEADER_SIZE = 6
+# report id, command, x, y, width, height; then the pixels column by column, least significant bit first
+
+
+#############################################################################
+#####                           HID TRANSPORTS                          #####
+#############################################################################
+
+# A transport finds and opens the screen. open() returns a device with
+# send_feature_report(report) and close(), or None if there is no screen to open.
+# Sending raises once the device is gone; the player then opens it again.
+
+class HidTransport:
+    # The real screen, through hidapi
+
+    def __init__(self, vendorId, productIds, interfaces=(4, -1)):
+        self.vendorId = vendorId
+        self.productIds = productIds
+        self.interfaces = interfaces
+        # -1 is reported by platforms that don't number interfaces
+
+    def open(self):
+        import hid # Only needed once talking to a device, the report pipeline works without it
+        for device_dict in hid.enumerate(self.vendorId):
+            if device_dict['product_id'] in self.productIds:
+                print(f"Found potential device: VID={hex(device_dict['vendor_id'])}, "
+                      f"PID={hex(device_dict['product_id'])}, "
+                      f"Path={device_dict['path'].decode()}, "
+                      f"Interface={device_dict['interface_number']}")
+                if device_dict['interface_number'] in self.interfaces:
+                    h = None
+                    try:
+                        h = hid.device()
+                        h.open_path(device_dict['path'])
+                        prod_string = h.get_product_string()
+                        mfg_string = h.get_manufacturer_string()
+                        print(f"Successfully opened: {prod_string} / {mfg_string}")
+                        return h
+                    except Exception as e:
+                        print(f"Could not open device {device_dict['path'].decode()}: {e}")
+                        if h:
+                            h.close()
+        print("Compatible USB device not found.")
+        return None
+
+
+class FakeHidTransport:
+    # An in-process screen for testing and benchmarks, see FakeOledDevice
+
+    def __init__(self, device=None):
+        self.device = device or FakeOledDevice()
+
+    def open(self):
+        return self.device.connect()
+
+
+#############################################################################
+#####                          FAKE OLED DEVICE                         #####
+#############################################################################
+
+class FakeOledDevice:
+    # Decodes draw reports into a framebuffer the way the screen would, and counts what it gets.
+    # latency is slept on every report, like the USB round trip of a feature report.
+    # disconnectRate is the chance that a report unplugs the device (seeded by seed); unplug()
+    # and plug() do the same on demand. While unplugged sends fail and the transport can't open it.
+
+    def __init__(self, width=128, height=64, reportSize=1024, latency=0.0, disconnectRate=0.0, seed=None):
+        self.width = width
+        self.height = height
+        self.reportSize = reportSize
+        self.latency = latency
+        self.disconnectRate = disconnectRate
+        self.random = random.Random(seed)
+
+        self.lock = Lock()
+        self.framebuffer = np.zeros((height, width), dtype=bool)
+        self.available = True
+        self.connected = False
+
+        self.reports = 0
+        self.bytes = 0
+        self.invalidReports = 0
+        self.connections = 0
+        self.disconnects = 0
+        self.firstReportTime = None
+        self.lastReportTime = None
+
+    #########################################################################
+
+    def connect(self):
+        with self.lock:
+            if not self.available:
+                return None
+            self.connected = True
+            self.connections += 1
+        return self
+
+    def unplug(self):
+        with self.lock:
+            self.available = False
+            if self.connected:
+                self.connected = False
+                self.disconnects += 1
+
+    def plug(self):
+        with self.lock:
+            self.available = True
+
+    #########################################################################
+
+    def send_feature_report(self, report):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            if not self.connected:
+                raise OSError("device disconnected")
+            if self.disconnectRate and self.random.random() < self.disconnectRate:
+                self.connected = False
+                self.disconnects += 1
+                raise OSError("device disconnected")
+
+            now = time.perf_counter()
+            if self.firstReportTime is None:
+                self.firstReportTime = now
+            self.lastReportTime = now
+            self.reports += 1
+            self.bytes += len(report)
+
+            if not self._draw(report):
+                self.invalidReports += 1
+        return len(report)
+
+    def _draw(self, report):
+        # Caller holds the lock
+        if len(report) != self.reportSize or report[0] != DRAW_REPORT_ID or report[1] != DRAW_COMMAND:
+            return False
+
+        x, y, width, height = report[2], report[3], report[4], report[5]
+        pixelCount = width * height
+        dataEnd = REPORT_HEADER_SIZE + (pixelCount + 7) // 8
+        if dataEnd > len(report):
+            return False
+
+        data = np.frombuffer(report, dtype=np.uint8, count=dataEnd - REPORT_HEADER_SIZE, offset=REPORT_HEADER_SIZE)
+        pixels = np.unpackbits(data, bitorder='little')[:pixelCount].reshape(width, height).T
+        # Anything drawn past the edge of the screen is cut off
+        visible = pixels[:max(self.height - y, 0), :max(self.width - x, 0)]
+        self.framebuffer[y:y + visible.shape[0], x:x + visible.shape[1]] = visible
+        return True
+
+    #########################################################################
+
+    def screen(self):
+        # A copy of what the screen shows right now
+        with self.lock:
+            return self.framebuffer.copy()
+
+    def stats(self):
+        with self.lock:
+            seconds = (self.lastReportTime - self.firstReportTime) if self.reports > 1 else 0
+            return {
+                "reports": self.reports,
+                "bytes": self.bytes,
+                "invalid_reports": self.invalidReports,
+                "connections": self.connections,
+                "disconnects": self.disconnects,
+                "seconds": seconds,
+                "reports_per_second": self.reports / seconds if seconds else 0,
+                "bytes_per_second": self.bytes / seconds if seconds else 0
+            }
+
+    def get_product_string(self):
+        return "Fake OLED"
+
+    def get_manufacturer_string(self):
+        return "GameDAC-GIF-Display"
+
+    def close(self):
+        with self.lock:
+            self.connected = False
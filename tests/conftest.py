@@ -0,0 +1,15 @@
+import sys
+
+import pytest
+
+from corpus import ROOT, loadScript
+
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def players():
+    return {
+        "gamesense": loadScript("test_gamesense_player", "OLED_GIF.py"),
+        "usb": loadScript("test_usb_player", "USB Version/OLED_GIF_USB.py")
+    }
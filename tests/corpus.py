@@ -0,0 +1,35 @@
+# The GIF corpus under tests/data and the golden outputs the baseline code produced from it,
+# written by make_golden.py into tests/golden/<player>/<case>.npz.
+
+import os
+import importlib.util
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "tests", "data")
+GOLDEN = os.path.join(ROOT, "tests", "golden")
+BASELINE_COMMIT = "cfc6957"
+# Commit the golden outputs were generated from, before any of the encoders were rewritten
+
+CASES = sorted(name[:-4] for name in os.listdir(DATA) if name.endswith(".gif"))
+# sprite/ticker/noise are opaque; transparent_keep and transparent_restore draw over a transparent
+# background with disposal 1 (keep the frame) and 2 (restore to background)
+
+
+STATUS_MESSAGES = ["GIF Stopped!", "Add GIFs!", "New GIF Selected!", "No GIFs!", "GIF Error!", "Spin Dial To Reset ->"]
+# What the USB player shows with display_error_message
+
+
+def gifPath(case):
+    return os.path.join(DATA, case + ".gif")
+
+def loadGolden(player, case):
+    return np.load(os.path.join(GOLDEN, player, case + ".npz"))
+
+def loadScript(name, path):
+    # Imports a player script by path; the GUI and Windows modules are only imported under __main__ there
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
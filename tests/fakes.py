@@ -0,0 +1,35 @@
+# Stand-ins for the Engine and the USB device that keep what they are given
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+
+class FakeTransport:
+    # Stands in for EngineTransport, accepts every post instantly
+
+    sseAddress = "http://127.0.0.1:0"
+
+    def __init__(self):
+        self.bodies = []
+
+    def post(self, endpoint, json=None):
+        return FakeResponse
+
+    def postBody(self, endpoint, body):
+        self.bodies.append(body)
+        return FakeResponse
+
+
+class RecordingDevice:
+    # Stands in for an open hid.device, keeps every report it is sent
+
+    def __init__(self):
+        self.reports = []
+
+    def send_feature_report(self, report):
+        self.reports.append(bytes(report))
+
+    def close(self):
+        pass
@@ -0,0 +1,103 @@
+# Regenerates the golden outputs in tests/golden from the baseline code, which is read out of git
+# and run on its own, so the tests compare today's encoders against what the app always sent.
+#
+#   python tests/make_golden.py
+#
+# Only needed when the corpus in tests/data changes. Needs cv2 and git.
+
+import os
+import ast
+import subprocess
+from types import SimpleNamespace
+
+import cv2
+import PIL
+import numpy as np
+from PIL import Image, ImageSequence, ImageDraw, ImageFont
+
+from corpus import ROOT, GOLDEN, BASELINE_COMMIT, CASES, STATUS_MESSAGES, gifPath
+
+
+def baselineSource(path):
+    return subprocess.run(["git", "show", f"{BASELINE_COMMIT}:{path}"], cwd=ROOT, capture_output=True, text=True,
+                          check=True).stdout
+
+def baselineFunctions(source, names, className=None):
+    # Source of the named functions, or methods of className, without running the rest of the script
+    nodes = ast.parse(source).body
+    if className:
+        nodes = next(node for node in nodes if isinstance(node, ast.ClassDef) and node.name == className).body
+    return [ast.get_source_segment(source, node) for node in nodes
+            if isinstance(node, ast.FunctionDef) and node.name in names]
+
+
+def makeGameSense():
+    namespace = {"cv2": cv2}
+    for function in baselineFunctions(baselineSource("OLED_GIF.py"), ["processGIF"]):
+        exec(function, namespace)
+
+    os.makedirs(os.path.join(GOLDEN, "gamesense"), exist_ok=True)
+    for case in CASES:
+        bitmaps = {f"invert{invert}": np.array(namespace["processGIF"](gifPath(case), invert), dtype=np.uint8)
+                   for invert in (0, 1)}
+        np.savez_compressed(os.path.join(GOLDEN, "gamesense", case + ".npz"), **bitmaps)
+
+
+class RecordingDevice:
+    def __init__(self):
+        self.reports = []
+
+    def send_feature_report(self, report):
+        self.reports.append(bytes(report))
+
+
+def baselineUSB():
+    # The baseline USB player's drawing methods in a class of their own, without hid or the GUI
+    methods = baselineFunctions(baselineSource("USB Version/OLED_GIF_USB.py"),
+                                ["_create_draw_report", "_pil_frame_to_reports", "preprocess_gif_reports",
+                                 "send_image_to_display", "display_error_helper"], "OLED_GIF")
+    namespace = {"Image": Image, "ImageSequence": ImageSequence, "ImageDraw": ImageDraw, "ImageFont": ImageFont,
+                 "time": SimpleNamespace(sleep=lambda seconds: None),
+                 "SCREEN_WIDTH": 128, "SCREEN_HEIGHT": 64, "SCREEN_REPORT_SPLIT_SZ": 64, "REPORT_SIZE": 1024}
+    body = "\n".join("    " + line for method in methods for line in method.splitlines())
+    exec(f"class BaselineUSB:\n    invert = 0\n{body}", namespace)
+    return namespace["BaselineUSB"]
+
+def reportArray(reports):
+    return np.frombuffer(b"".join(reports), dtype=np.uint8).reshape(len(reports), -1)
+
+def makeUSB():
+    BaselineUSB = baselineUSB()
+
+    os.makedirs(os.path.join(GOLDEN, "usb"), exist_ok=True)
+    for case in CASES:
+        reports = {}
+        for invert in (0, 1):
+            player = BaselineUSB()
+            player.invert = invert
+            frames = player.preprocess_gif_reports(gifPath(case))
+            reports[f"invert{invert}"] = np.stack([reportArray(pair) for pair in frames])
+        np.savez_compressed(os.path.join(GOLDEN, "usb", case + ".npz"), **reports)
+
+    # Every report display_error_message sends for a message with a timer: the message, then the clear
+    messages = {"messages": np.array(STATUS_MESSAGES), "pillow": np.array(PIL.__version__)}
+    for invert in (0, 1):
+        sent = []
+        for message in STATUS_MESSAGES:
+            player = BaselineUSB()
+            player.invert = invert
+            player.device = RecordingDevice()
+            player.display_error_helper(message, 1)
+            sent.append(reportArray(player.device.reports))
+        messages[f"invert{invert}"] = np.stack(sent)
+    np.savez_compressed(os.path.join(GOLDEN, "usb", "status_messages.npz"), **messages)
+
+
+def main():
+    makeGameSense()
+    makeUSB()
+    print(f"Golden outputs written to {GOLDEN}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import time
+
+from oledcore.emulator import EngineEmulator
+from oledcore.asyncsender import PipelinedSender
+
+BODY = b'{"game":"OLED_GIF","event":"DISPLAY_GIF","data":{"frame":{"image-data-128x52":[0]}}}'
+
+
+def test_idle_connection_outlives_timeout():
+    # A frame held for longer than the timeout must not cost the connection
+    emulator = EngineEmulator().start()
+    sender = PipelinedSender(f"http://{emulator.address}", timeout=0.2)
+    try:
+        for _ in range(3):
+            assert sender.submit(BODY)
+            assert sender.flush(2)
+            time.sleep(0.5)
+        stats = sender.stats()
+    finally:
+        sender.close()
+        emulator.stop()
+    assert stats["completed"] == 3
+    assert stats["connections"] == 1
+
+
+def test_reply_slower_than_timeout_is_given_up_on():
+    emulator = EngineEmulator(latency=1.0).start()
+    sender = PipelinedSender(f"http://{emulator.address}", timeout=0.2)
+    try:
+        assert sender.submit(BODY)
+        start = time.perf_counter()
+        assert sender.flush(2)
+        waited = time.perf_counter() - start
+        stats = sender.stats()
+    finally:
+        sender.close()
+        emulator.stop()
+    assert waited < 0.9
+    assert stats["completed"] == 0
+    assert stats["dropped"] == 1
@@ -0,0 +1,99 @@
+from threading import Thread, Barrier
+
+import pytest
+
+from oledcore.dedup import FrameStore, mergeHolds, iterMergeHolds
+
+
+def copyOf(frame):
+    # Equal bytes in a new object, the way every decode produces them
+    return bytes(bytearray(frame))
+
+
+def test_identical_frames_intern_to_one_object():
+    store = FrameStore()
+    first = store.intern(copyOf(b"frame"))
+    second = copyOf(b"frame")
+    assert second is not first
+    assert store.intern(second) is first
+    assert store.intern(copyOf(b"other")) is not first
+    assert (store.lookups, store.shared) == (3, 1)
+
+
+def test_intern_all_counts_frames_already_stored():
+    store = FrameStore()
+    store.internAll([copyOf(b"a"), copyOf(b"b")])
+    frames, shared = store.internAll([copyOf(b"b"), copyOf(b"c"), copyOf(b"b")])
+    assert frames == [b"b", b"c", b"b"]
+    assert frames[0] is frames[2]
+    assert shared == 2
+
+
+def test_report_tuples_are_interned_whole():
+    store = FrameStore()
+    first = store.intern((copyOf(b"left"), copyOf(b"right")))
+    assert store.intern((copyOf(b"left"), copyOf(b"right"))) is first
+
+
+def test_concurrent_interning_shares_one_copy_per_frame():
+    store = FrameStore()
+    threads = 8
+    start = Barrier(threads)
+    results = [None] * threads
+
+    def intern(slot):
+        frames = [copyOf(b"frame %d" % index) for index in range(200)]
+        start.wait()
+        results[slot] = [store.intern(frame) for frame in frames]
+
+    workers = [Thread(target=intern, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    for index in range(200):
+        assert len({id(result[index]) for result in results}) == 1
+    assert len(store.frames) == 200
+    assert (store.lookups, store.shared) == (threads * 200, (threads - 1) * 200)
+
+
+#############################################################################
+
+def test_runs_of_identical_frames_merge_into_one_hold():
+    frames, durations = mergeHolds([b"a", b"a", b"b", b"b", b"b", b"c"], [0.1, 0.2, 0.05, 0.05, 0.1, 0.3])
+    assert frames == [b"a", b"b", b"c"]
+    assert durations == [pytest.approx(0.3), pytest.approx(0.2), pytest.approx(0.3)]
+
+
+def test_a_loop_wrap_keeps_the_first_and_last_frames_apart():
+    # The last frame leads back into the first one, but they are not a run within the loop
+    frames, durations = mergeHolds([b"a", b"a", b"b", b"a"], [0.1, 0.1, 0.1, 0.1])
+    assert frames == [b"a", b"b", b"a"]
+    assert durations == [pytest.approx(0.2), pytest.approx(0.1), pytest.approx(0.1)]
+
+
+def test_merging_compares_by_key():
+    # The USB player merges (pixels, reports) pairs by their reports
+    pairs = [(("pixels 0", b"r"), 0.1), (("pixels 1", b"r"), 0.1), (("pixels 2", b"s"), 0.1)]
+    merged = list(iterMergeHolds(pairs, key=lambda frame: frame[1]))
+    assert merged == [(("pixels 0", b"r"), pytest.approx(0.2)), (("pixels 2", b"s"), 0.1)]
+
+
+def test_merging_streams_each_frame_once_the_next_differs():
+    seen = []
+    def frames():
+        for frame in [b"a", b"a", b"b"]:
+            seen.append(frame)
+            yield frame, 0.1
+
+    merged = iterMergeHolds(frames())
+    assert next(merged)[0] == b"a"
+    # a was only known to be over once b came in
+    assert seen == [b"a", b"a", b"b"]
+    assert next(merged)[0] == b"b"
+    assert list(merged) == []
+
+
+def test_nothing_to_merge():
+    assert mergeHolds([], []) == ([], [])
@@ -0,0 +1,125 @@
+import os
+import time
+from threading import Event
+
+from corpus import gifPath
+from fakes import FakeTransport
+from oledcore.dedup import FrameStore
+from oledcore.framebuffer import FrameBuffer, collectFrames
+from oledcore.framecache import FrameCache
+from oledcore.playback import CancelToken
+
+
+def endless(closed, seconds=0.001):
+    # Decodes forever unless it is closed
+    try:
+        index = 0
+        while True:
+            time.sleep(seconds)
+            yield index, 0.1
+            index += 1
+    finally:
+        closed.set()
+
+
+def test_frames_are_readable_as_they_are_decoded():
+    def frames():
+        yield "a", 0.1
+        yield "b", 0.2
+
+    buffer = FrameBuffer(frames())
+    assert list(buffer.durations()) == [0.1, 0.2]
+    assert buffer.frames == ["a", "b"]
+    assert buffer.done
+
+
+def test_a_returned_list_replaces_the_collected_frames():
+    def frames():
+        yield "a", 0.1
+        yield "b", 0.2
+        return [("fixed a", 0.1), ("b", 0.2)]
+
+    buffer = FrameBuffer(frames())
+    buffer.thread.join(5)
+    assert buffer.frames == ["fixed a", "b"]
+
+
+def test_cancelling_the_run_closes_the_generator():
+    token = CancelToken()
+    closed = Event()
+    buffer = FrameBuffer(endless(closed), token)
+    durations = buffer.durations()
+    next(durations)
+
+    token.cancel()
+    buffer.thread.join(1)
+    assert not buffer.thread.is_alive()
+    assert closed.is_set()
+    assert buffer.done
+    # What was decoded before the cancel stays readable
+    assert buffer.frames and len(buffer.frames) == len(buffer.frameDurations)
+
+
+def test_an_already_cancelled_run_decodes_nothing():
+    token = CancelToken()
+    token.cancel()
+    closed = Event()
+    buffer = FrameBuffer(endless(closed), token)
+    buffer.thread.join(1)
+    assert buffer.frames == []
+    assert buffer.done
+
+
+def test_collect_frames_stops_on_a_cancelled_token():
+    token = CancelToken()
+    closed = Event()
+    def frames():
+        for index, frame in enumerate(endless(closed)):
+            if index == 3:
+                token.cancel()
+            yield frame
+
+    assert collectFrames(frames(), token) == []
+    assert collectFrames(iter([("a", 0.1)])) == [("a", 0.1)]
+
+
+#############################################################################
+
+class CancellingStore(FrameStore):
+    # Cancels token as the first frame is interned, i.e. while the GIF is still decoding
+
+    def __init__(self, token):
+        super().__init__()
+        self.token = token
+
+    def intern(self, frame):
+        self.token.cancel()
+        return super().intern(frame)
+
+
+def test_gamesense_partial_decode_is_not_cached(players, tmp_path):
+    player = players["gamesense"].OLED_GIF(transport=FakeTransport())
+    player.frameCache = FrameCache(str(tmp_path))
+    token = CancelToken()
+    path = gifPath("sprite_128x64")
+
+    buffer = FrameBuffer(player.iterPreparedGIF(path, CancellingStore(token)), token)
+    buffer.thread.join(5)
+    assert len(buffer.frames) == 1
+    assert path not in player.dedupStats
+    assert os.listdir(tmp_path) == []
+
+    # A later full decode is cached as usual
+    player.prepareGIF(path)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_usb_partial_decode_is_not_cached(players, tmp_path):
+    player = players["usb"].OLED_GIF(connect=False)
+    player.frame_cache = FrameCache(str(tmp_path))
+    token = CancelToken()
+    path = gifPath("sprite_128x64")
+
+    assert player.preprocess_gif_reports(path, CancellingStore(token), token) == []
+    assert path not in player.dedup_stats
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from corpus import gifPath
+from fakes import FakeTransport
+from oledcore.framecache import FrameCache, HEADER, CACHE_MAGIC, CACHE_VERSION, CACHE_EXTENSION, encodeFrames
+
+FRAMES = [
+    ([[b"normal-0", b"inverted-0"]], 0.1),
+    ([[b"full-1a", b"full-1b"], [b"delta-1"]], 0.25),
+    ([[b""], []], 0.04)
+]
+# (groups, duration) per frame, with an empty blob and an empty group
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FrameCache(str(tmp_path / "cache"))
+
+
+def saved(cache, key, frames=FRAMES):
+    cache.save(key, frames)
+    return cache.path(key)
+
+
+def test_saved_frames_load_back_unchanged(cache):
+    saved(cache, "a")
+    assert cache.load("a") == FRAMES
+    assert cache.stats() == {"hits": 1, "misses": 0}
+
+
+def test_missing_entry_is_a_miss(cache):
+    assert cache.load("a") is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
+
+
+def test_key_follows_gif_content_and_params(cache, tmp_path):
+    first = tmp_path / "first.gif"
+    second = tmp_path / "second.gif"
+    first.write_bytes(b"GIF89a one")
+    second.write_bytes(b"GIF89a two")
+    params = {"pipeline": "usb", "encoder": 2}
+
+    assert cache.key(str(first), params) == cache.key(str(first), dict(params))
+    assert cache.key(str(first), params) != cache.key(str(second), params)
+    assert cache.key(str(first), params) != cache.key(str(first), dict(params, encoder=3))
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-3],
+    lambda data: data[:HEADER.size + 2],
+    lambda data: data + b"extra",
+    lambda data: b"XXXX" + data[4:],
+    lambda data: HEADER.pack(CACHE_MAGIC, CACHE_VERSION + 1, len(FRAMES)) + data[HEADER.size:]
+], ids=["truncated", "header_only", "trailing_data", "bad_magic", "newer_version"])
+def test_damaged_entries_are_misses_and_removed(cache, damage):
+    path = saved(cache, "a")
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(damage(data))
+
+    assert cache.load("a") is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(cache):
+    entrySize = len(encodeFrames(FRAMES))
+    cache.maxBytes = entrySize * 3
+    for age, key in enumerate(["a", "b", "c"]):
+        path = saved(cache, key)
+        # Oldest first, whatever the file system's timestamp resolution
+        os.utime(path, (1000 + age, 1000 + age))
+
+    # Loading a marks it used, so b is now the least recently used
+    assert cache.load("a") == FRAMES
+    saved(cache, "d")
+
+    names = sorted(name for name in os.listdir(cache.folder) if name.endswith(CACHE_EXTENSION))
+    assert names == ["a" + CACHE_EXTENSION, "c" + CACHE_EXTENSION, "d" + CACHE_EXTENSION]
+    assert cache.load("b") is None
+
+
+def test_an_entry_bigger_than_the_cap_is_not_kept(cache):
+    cache.maxBytes = 10
+    path = saved(cache, "a")
+    assert not os.path.exists(path)
+
+
+#############################################################################
+
+def test_gamesense_frames_from_the_cache_match_a_decode(players, tmp_path):
+    player = players["gamesense"].OLED_GIF(transport=FakeTransport())
+    player.frameCache = FrameCache(str(tmp_path))
+    decoded = player.prepareGIF(gifPath("transparent_keep"))
+    cached = player.prepareGIF(gifPath("transparent_keep"))
+    assert player.frameCache.stats() == {"hits": 1, "misses": 1}
+    assert cached == decoded
+
+
+def test_gamesense_encoder_version_change_misses_the_cache(players, tmp_path, monkeypatch):
+    module = players["gamesense"]
+    player = module.OLED_GIF(transport=FakeTransport())
+    player.frameCache = FrameCache(str(tmp_path))
+    player.prepareGIF(gifPath("sprite_128x64"))
+
+    monkeypatch.setattr(module, "ENCODER_VERSION", module.ENCODER_VERSION + 1)
+    player.prepareGIF(gifPath("sprite_128x64"))
+    assert player.frameCache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_usb_frames_from_the_cache_match_a_decode(players, tmp_path):
+    player = players["usb"].OLED_GIF(connect=False)
+    player.frame_cache = FrameCache(str(tmp_path))
+    decoded = player.preprocess_gif_reports(gifPath("transparent_restore"))
+    cached = player.preprocess_gif_reports(gifPath("transparent_restore"))
+    assert player.frame_cache.stats() == {"hits": 1, "misses": 1}
+    # Full and delta reports alike, so a cached GIF redraws the same screen
+    assert cached == decoded
+
+
+def test_usb_encoder_version_change_misses_the_cache(players, tmp_path, monkeypatch):
+    module = players["usb"]
+    player = module.OLED_GIF(connect=False)
+    player.frame_cache = FrameCache(str(tmp_path))
+    player.preprocess_gif_reports(gifPath("sprite_128x64"))
+
+    monkeypatch.setattr(module, "ENCODER_VERSION", module.ENCODER_VERSION + 1)
+    player.preprocess_gif_reports(gifPath("sprite_128x64"))
+    assert player.frame_cache.stats() == {"hits": 0, "misses": 2}
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+import pytest
+
+from corpus import CASES, gifPath, loadGolden
+from fakes import FakeTransport
+
+
+def asArray(bitmaps):
+    return np.array(bitmaps, dtype=np.uint8).reshape(-1, 832)
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("case", CASES)
+def test_process_gif_matches_golden(players, case, invert):
+    bitmaps = players["gamesense"].processGIF(gifPath(case), invert)
+    assert np.array_equal(asArray(bitmaps), loadGolden("gamesense", case)[f"invert{invert}"])
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("case", CASES)
+def test_pack_frames_matches_golden(players, case, invert):
+    module = players["gamesense"]
+    frames = np.stack(list(module.thresholdGIF(gifPath(case), invert)))
+    assert np.array_equal(asArray(module.packFrames(frames)), loadGolden("gamesense", case)[f"invert{invert}"])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_inverted_bitmaps_match_golden(players, case):
+    # Frames are decoded once in normal polarity and flipped for invert
+    module = players["gamesense"]
+    inverted = [module.invertBitmap(bitmap) for bitmap in module.processGIF(gifPath(case), 0)]
+    assert np.array_equal(asArray(inverted), loadGolden("gamesense", case)["invert1"])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_encoded_frames_carry_golden_bitmaps(players, case):
+    # The (normal, inverted) bodies a prepared GIF is sent as
+    module = players["gamesense"]
+    player = module.OLED_GIF(transport=FakeTransport())
+    golden = loadGolden("gamesense", case)
+
+    pairs = player.encodeFrames(module.processGIF(gifPath(case), 0))
+    for invert in (0, 1):
+        bitmaps = [json.loads(pair[invert])["data"]["frame"]["image-data-128x52"] for pair in pairs]
+        assert np.array_equal(asArray(bitmaps), golden[f"invert{invert}"])
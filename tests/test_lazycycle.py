@@ -0,0 +1,24 @@
+from oledcore.lazycycle import LazyPreparer
+
+
+def test_gif_over_budget_is_not_prepared_twice():
+    prepared = []
+    def prepare(path):
+        prepared.append(path)
+        return path * 100
+
+    preparer = LazyPreparer(prepare, ["a", "b"], memoryBudget=50)
+    first = preparer.waitForFirst()
+    assert preparer.get(first) == "a" * 100
+    preparer.executor.shutdown(wait=True)
+    assert prepared == ["a", "b"]
+
+
+def test_only_playing_and_next_gif_stay_over_budget():
+    preparer = LazyPreparer(lambda path: path * 100, ["a", "b", "c", "d"], memoryBudget=250)
+    for index in (0, 1, 2):
+        assert preparer.get(index) == "abcd"[index] * 100
+    preparer.executor.shutdown(wait=True)
+    # 2 is playing and 3 was prefetched after it
+    assert list(preparer.resident) == [2, 3]
+    assert preparer.stats()["resident_bytes"] <= 250
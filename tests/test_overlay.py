@@ -0,0 +1,100 @@
+import time
+from threading import Event, Lock
+
+from oledcore.overlay import StatusCache, StatusOverlay
+
+LAYOUT = (128, 40)
+
+
+class Screen:
+    # send() for a StatusOverlay: records what each send drew, "" being the clear screen
+
+    def __init__(self):
+        self.lock = Lock()
+        self.shown = []
+        self.gate = None
+        # Set to an Event to hold every send until it is set
+
+    def __call__(self, reports):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self.lock:
+            self.shown.append(reports[0])
+
+
+def newOverlay():
+    screen = Screen()
+    cache = StatusCache(lambda text, layout, invert: [text])
+    return StatusOverlay(cache, screen, LAYOUT), screen
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline
+        time.sleep(0.005)
+
+
+def test_a_message_is_cleared_after_its_timer():
+    overlay, screen = newOverlay()
+    try:
+        overlay.show("GIF Stopped!", 0.05, False)
+        waitFor(lambda: screen.shown == ["GIF Stopped!", ""])
+        assert (overlay.shown, overlay.clears) == (1, 1)
+    finally:
+        overlay.stop()
+
+
+def test_a_newer_message_cancels_the_older_clear():
+    overlay, screen = newOverlay()
+    try:
+        overlay.show("GIF Stopped!", 0.05, False)
+        overlay.flush(5)
+        overlay.show("Spin Dial To Reset ->", 0, False)
+        time.sleep(0.15)
+        assert screen.shown == ["GIF Stopped!", "Spin Dial To Reset ->"]
+    finally:
+        overlay.stop()
+
+
+def test_cancel_pending_drops_the_clear():
+    overlay, screen = newOverlay()
+    try:
+        overlay.show("GIF Stopped!", 0.05, False)
+        overlay.flush(5)
+        overlay.cancelPending()
+        time.sleep(0.15)
+        # Playback started drawing after the message, so nothing may blank it
+        assert screen.shown == ["GIF Stopped!"]
+        assert (overlay.clears, overlay.cancelled) == (0, 1)
+    finally:
+        overlay.stop()
+
+
+def test_cancel_pending_drops_a_message_not_sent_yet():
+    overlay, screen = newOverlay()
+    screen.gate = Event()
+    try:
+        overlay.show("first", 0.05, False)
+        waitFor(lambda: overlay.sending)
+        overlay.show("second", 0.05, False)
+        overlay.cancelPending()
+        screen.gate.set()
+        overlay.flush(5)
+        time.sleep(0.15)
+        # first was already going out, but neither its clear nor second follow it
+        assert screen.shown == ["first"]
+    finally:
+        overlay.stop()
+
+
+def test_messages_after_a_cancel_are_cleared_as_usual():
+    overlay, screen = newOverlay()
+    try:
+        overlay.show("GIF Stopped!", 5, False)
+        overlay.flush(5)
+        overlay.cancelPending()
+        overlay.show("New GIF Selected!", 0.05, False)
+        waitFor(lambda: screen.shown == ["GIF Stopped!", "New GIF Selected!", ""])
+    finally:
+        overlay.stop()
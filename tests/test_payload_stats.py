@@ -0,0 +1,19 @@
+import numpy as np
+
+from corpus import gifPath
+from fakes import FakeTransport
+
+
+def test_payload_stats_count_one_body_per_frame(players):
+    # Frames are encoded as (normal, inverted) pairs, but a send only writes one of them
+    module = players["gamesense"]
+    player = module.OLED_GIF(transport=FakeTransport())
+    pairs = player.encodeFrames(module.processGIF(gifPath("sprite_128x64"), 0))
+    for pair in pairs:
+        player.sendFrame(pair)
+
+    stats = player.payloadStats()
+    assert stats["frames"] == len(pairs)
+    assert stats["bytes"] == sum(len(normal) for normal, _ in pairs)
+    assert stats["bytes_per_frame"] == np.mean([len(body) for body in player.transport.bodies])
+    assert stats["sends"] == len(pairs)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from corpus import CASES, gifPath, loadGolden
+from oledcore.pipeline import iterEncodedFrames, iterFramePixels, getEncoder
+
+
+def encodedArray(encoder, frames):
+    if encoder == "usb":
+        # A tuple of draw reports per frame
+        return np.stack([np.frombuffer(b"".join(reports), dtype=np.uint8).reshape(len(reports), -1)
+                         for reports in frames])
+    return np.array(frames, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("case", ["transparent_keep", "transparent_restore"])
+def test_corpus_covers_transparency_and_both_disposal_modes(case):
+    disposal = {"transparent_keep": 1, "transparent_restore": 2}[case]
+    with Image.open(gifPath(case)) as img:
+        assert "transparency" in img.info
+        for index in range(1, img.n_frames):
+            img.seek(index)
+            assert img.disposal_method == disposal
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("encoder", ["gamesense", "usb"])
+@pytest.mark.parametrize("case", CASES)
+def test_encoded_frames_match_golden(case, encoder, invert):
+    # gamesense goldens come from the baseline cv2.VideoCapture decoder, usb ones from the baseline PIL one
+    frames = [frame for frame, _ in iterEncodedFrames(gifPath(case), encoder, invert)]
+    assert np.array_equal(encodedArray(encoder, frames), loadGolden(encoder, case)[f"invert{invert}"])
+
+
+@pytest.mark.parametrize("encoder", ["gamesense", "usb"])
+@pytest.mark.parametrize("case", CASES)
+def test_frame_pixels_match_golden(case, encoder):
+    # The shared stages up to the binarized pixels, encoded straight from the pixels
+    encoderObject = getEncoder(encoder)
+    frames = [encoderObject.encode(pixels) for pixels, _ in iterFramePixels(gifPath(case), encoder)]
+    assert np.array_equal(encodedArray(encoder, frames), loadGolden(encoder, case)["invert0"])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_frame_durations_come_with_frames(case):
+    with Image.open(gifPath(case)) as img:
+        expected = img.n_frames
+    for encoder in ("gamesense", "usb"):
+        durations = [duration for _, duration in iterEncodedFrames(gifPath(case), encoder)]
+        assert len(durations) == expected
+        assert all(duration > 0 for duration in durations)
@@ -0,0 +1,278 @@
+import json
+import time
+import threading
+from threading import Thread, Event
+
+import pytest
+
+from fakes import FakeTransport
+from oledcore.playback import CancelToken, PlaybackController
+from oledcore.daemon import (PlaybackDaemon, ControlServer, RemotePlayer, RemoteTelemetry, PREFERENCES_FILE,
+                             loadPreferences, playbackPreferences)
+
+
+class FakeTelemetry:
+    def summary(self):
+        return "60 fps"
+
+    def snapshot(self):
+        return {}
+
+
+class FakePlayer:
+    # Plays until its run is cancelled, and logs when runs start and end
+
+    def __init__(self):
+        self.events = []
+        self.cancelToken = CancelToken()
+        self.invert = 0
+        self.telemetry = FakeTelemetry()
+
+    @property
+    def running(self):
+        return not self.cancelToken.cancelled
+
+    @running.setter
+    def running(self, value):
+        if value:
+            self.cancelToken = CancelToken()
+        else:
+            self.cancelToken.cancel()
+
+    def stopGIF(self):
+        self.cancelToken.cancel()
+
+    def playGIF(self, gif_path):
+        token = self.cancelToken
+        cancelled = Event()
+        token.onCancel(cancelled.set)
+        self.events.append(("start", gif_path))
+        cancelled.wait()
+        self.events.append(("end", gif_path))
+
+
+class StuckPlayer(FakePlayer):
+    # Takes sendSeconds to notice a cancel, like a run stuck in a slow send
+
+    def __init__(self, sendSeconds):
+        super().__init__()
+        self.sendSeconds = sendSeconds
+
+    def playGIF(self, gif_path):
+        token = self.cancelToken
+        cancelled = Event()
+        token.onCancel(cancelled.set)
+        self.events.append(("start", gif_path))
+        cancelled.wait()
+        time.sleep(self.sendSeconds)
+        self.events.append(("end", gif_path))
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline
+        time.sleep(0.005)
+
+
+def test_start_stops_the_run_before_it():
+    player = FakePlayer()
+    controller = PlaybackController(player)
+    controller.play("a.gif")
+    waitFor(lambda: player.events)
+    controller.play("b.gif")
+    waitFor(lambda: len(player.events) == 3)
+    assert player.events == [("start", "a.gif"), ("end", "a.gif"), ("start", "b.gif")]
+    assert controller.stop()
+    assert player.events[-1] == ("end", "b.gif")
+
+
+def test_start_and_stop_do_not_wait_for_a_stuck_run():
+    player = StuckPlayer(0.3)
+    controller = PlaybackController(player)
+    controller.play("a.gif")
+    waitFor(lambda: player.events)
+
+    start = time.perf_counter()
+    controller.play("b.gif")
+    assert controller.playing()
+    assert time.perf_counter() - start < 0.1
+    # b only starts once a has ended
+    waitFor(lambda: len(player.events) == 3)
+    assert player.events == [("start", "a.gif"), ("end", "a.gif"), ("start", "b.gif")]
+
+    start = time.perf_counter()
+    assert controller.stop(wait=False)
+    assert time.perf_counter() - start < 0.1
+    assert not controller.playing()
+    waitFor(lambda: len(player.events) == 4)
+
+
+def test_a_stop_before_the_next_run_begins_cancels_it():
+    player = StuckPlayer(0.2)
+    controller = PlaybackController(player)
+    controller.play("a.gif")
+    waitFor(lambda: player.events)
+    controller.play("b.gif")
+    controller.play("c.gif")
+    controller.stop(wait=False)
+
+    for thread in threading.enumerate():
+        if thread.name == "playback":
+            thread.join(5)
+    # b and c were replaced or stopped while waiting for a to end, so neither ever played
+    assert player.events == [("start", "a.gif"), ("end", "a.gif")]
+
+
+def test_a_start_right_after_a_stop_waits_for_the_stopped_run():
+    player = StuckPlayer(0.2)
+    controller = PlaybackController(player)
+    controller.play("a.gif")
+    waitFor(lambda: player.events)
+    controller.stop(wait=False)
+    controller.play("b.gif")
+    waitFor(lambda: len(player.events) == 3)
+    assert player.events == [("start", "a.gif"), ("end", "a.gif"), ("start", "b.gif")]
+    controller.stop()
+
+
+def test_a_waiting_stop_reports_a_run_that_outlives_the_timeout():
+    player = StuckPlayer(0.3)
+    controller = PlaybackController(player, stopTimeout=0.05)
+    controller.play("a.gif")
+    waitFor(lambda: player.events)
+    assert not controller.stop()
+    assert controller.slowStops == 1
+    waitFor(lambda: len(player.events) == 2)
+
+
+def test_remote_play_of_the_playing_gif_keeps_it_playing(tmp_path):
+    gifPaths = []
+    for name in ("a.gif", "b.gif"):
+        (tmp_path / name).write_bytes(b"GIF89a")
+        gifPaths.append(str(tmp_path / name))
+
+    player = FakePlayer()
+    daemon = PlaybackDaemon(player, str(tmp_path))
+    server = ControlServer(daemon)
+    server.writeControlFile()
+    Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        daemon.play(gifPaths[0])
+        waitFor(lambda: player.events)
+
+        # The GUI attaching to the daemon and starting the saved GIF, as on launch
+        remote = RemotePlayer.connect(str(tmp_path))
+        controller = PlaybackController(remote)
+        controller.play(gifPaths[0])
+        waitFor(lambda: not controller.thread.is_alive())
+        assert player.events == [("start", gifPaths[0])]
+
+        controller.play(gifPaths[1])
+        waitFor(lambda: len(player.events) == 3)
+        assert player.events == [("start", gifPaths[0]), ("end", gifPaths[0]), ("start", gifPaths[1])]
+
+        controller.stop()
+        waitFor(lambda: len(player.events) == 4)
+        assert player.events[-1] == ("end", gifPaths[1])
+    finally:
+        daemon.stop()
+        server.shutdown()
+        server.server_close()
+
+
+class SlowClient:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def send(self, command, **arguments):
+        time.sleep(self.seconds)
+        return {"ok": True, "summary": "60 fps"}
+
+
+def test_remote_summary_never_waits_on_the_daemon():
+    telemetry = RemoteTelemetry(SlowClient(0.3))
+    start = time.perf_counter()
+    assert telemetry.summary() == "Connecting to daemon"
+    assert time.perf_counter() - start < 0.1
+    waitFor(lambda: telemetry.summary() == "60 fps")
+
+
+#############################################################################
+
+def test_playback_preferences_are_checked():
+    preferences = playbackPreferences({
+        "lazy_cycle": True,
+        "cycle_memory_mb": 8,
+        "cycle_seconds": "ten",
+        "gif_cycle_seconds": {"cat.gif": 10, "dog.gif": 2.5},
+        "max_in_flight": 1.5,
+        "inverted": 1
+    })
+    # A bad value is left out, whatever else the GUI saved is not playback tuning
+    assert preferences == {"lazy_cycle": True, "cycle_memory_mb": 8, "gif_cycle_seconds": {"cat.gif": 10, "dog.gif": 2.5}}
+    assert playbackPreferences({"gif_cycle_seconds": {"cat.gif": 0}, "lazy_cycle": "yes", "max_in_flight": 2}) == {
+        "max_in_flight": 2}
+
+
+@pytest.mark.parametrize("name", ["gamesense", "usb"])
+def test_players_apply_playback_preferences(players, name):
+    if name == "gamesense":
+        player = players[name].OLED_GIF(transport=FakeTransport())
+    else:
+        player = players[name].OLED_GIF(connect=False)
+    cycleSeconds = player.cycleSecondsFor if name == "gamesense" else player.cycle_seconds_for
+
+    player.applyPreferences({"lazy_cycle": True, "cycle_memory_mb": 2, "cycle_seconds": 7,
+                             "gif_cycle_seconds": {"cat.gif": 10}, "max_in_flight": 3})
+    if name == "gamesense":
+        assert (player.lazyCycle, player.cycleMemoryBudget, player.maxInFlight) == (True, 2 * 1024 * 1024, 3)
+    else:
+        assert (player.lazy_cycle, player.cycle_memory_budget) == (True, 2 * 1024 * 1024)
+    # Saved by file name, the cycle looks GIFs up by path
+    assert cycleSeconds("/gifs/Cycle GIFs/cat.gif") == 10
+    assert cycleSeconds("/gifs/Cycle GIFs/dog.gif") == 7
+
+    # Settings left out stay as they are
+    player.applyPreferences({"cycle_seconds": 4})
+    assert cycleSeconds("/gifs/Cycle GIFs/cat.gif") == 10
+    assert cycleSeconds("/gifs/Cycle GIFs/dog.gif") == 4
+
+
+class TunablePlayer(FakePlayer):
+    def __init__(self):
+        super().__init__()
+        self.preferences = {}
+
+    def applyPreferences(self, preferences):
+        self.preferences.update(preferences)
+
+
+def test_daemon_resume_applies_saved_tuning(tmp_path):
+    (tmp_path / PREFERENCES_FILE).write_text(json.dumps({"inverted": 1, "lazy_cycle": True, "cycle_seconds": -1}))
+    player = TunablePlayer()
+    daemon = PlaybackDaemon(player, str(tmp_path))
+    # Nothing saved to play, so it only picks up the settings
+    assert not daemon.resume()["playing"]
+    assert player.invert == 1
+    assert player.preferences == {"lazy_cycle": True}
+
+
+def test_daemon_set_changes_and_saves_a_setting(tmp_path):
+    player = TunablePlayer()
+    daemon = PlaybackDaemon(player, str(tmp_path))
+    preferencesPath = str(tmp_path / PREFERENCES_FILE)
+
+    assert daemon.handle({"command": "set", "key": "cycle_seconds", "value": 5})["ok"]
+    assert player.preferences == {"cycle_seconds": 5}
+    assert loadPreferences(preferencesPath) == {}
+
+    assert daemon.handle({"command": "set", "key": "lazy_cycle", "value": True, "save": True})["ok"]
+    assert loadPreferences(preferencesPath) == {"lazy_cycle": True}
+
+    reply = daemon.handle({"command": "set", "key": "max_in_flight", "value": -1})
+    assert not reply["ok"] and "max_in_flight" in reply["error"]
+    assert not daemon.handle({"command": "set", "key": "speed", "value": 2})["ok"]
+    assert "max_in_flight" not in player.preferences
+    # A player without playback settings says so
+    assert not PlaybackDaemon(FakePlayer(), str(tmp_path)).set("lazy_cycle", True)["ok"]
@@ -0,0 +1,109 @@
+import time
+from threading import Event
+
+from oledcore.preparer import ParallelPreparer, DEFAULT_WORKERS
+
+
+class GatedPrepare:
+    # prepare() for a ParallelPreparer that holds each GIF until the test releases it
+
+    def __init__(self, paths, results=None):
+        self.gates = {path: Event() for path in paths}
+        self.results = results or {}
+        self.started = []
+
+    def __call__(self, path):
+        self.started.append(path)
+        self.gates[path].wait(5)
+        return self.results.get(path, path.upper())
+
+    def release(self, path):
+        self.gates[path].set()
+
+
+def finish(preparer):
+    preparer.executor.shutdown(wait=True)
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline
+        time.sleep(0.005)
+
+
+def test_default_is_one_worker():
+    assert DEFAULT_WORKERS == 1
+
+
+def test_results_stay_in_folder_order_whatever_finishes_first():
+    paths = ["a", "b", "c"]
+    prepare = GatedPrepare(paths)
+    preparer = ParallelPreparer(prepare, paths, workers=3)
+    for path in reversed(paths):
+        prepare.release(path)
+    finish(preparer)
+
+    assert [preparer.get(index) for index in range(3)] == ["A", "B", "C"]
+    assert preparer.readyIndexes() == [0, 1, 2]
+
+
+def test_playback_starts_on_whichever_gif_is_ready_first():
+    paths = ["a", "b", "c"]
+    prepare = GatedPrepare(paths)
+    preparer = ParallelPreparer(prepare, paths, workers=3)
+    prepare.release("c")
+    assert preparer.waitForFirst() == 2
+    assert preparer.get(0) is None
+
+    prepare.release("a")
+    prepare.release("b")
+    finish(preparer)
+
+
+def test_rotation_skips_gifs_that_are_not_ready_or_failed():
+    paths = ["a", "b", "c", "d"]
+    prepare = GatedPrepare(paths, {"b": None})
+    preparer = ParallelPreparer(prepare, paths, workers=4)
+    for path in ("a", "b", "c"):
+        prepare.release(path)
+    waitFor(lambda: preparer.pending == 1)
+
+    # b failed and d is still preparing
+    assert preparer.nextReady(0) == 2
+    assert preparer.nextReady(2) == 0
+    prepare.release("d")
+    finish(preparer)
+    assert preparer.nextReady(2) == 3
+    assert preparer.nextReady(3) == 0
+
+
+def test_wait_for_first_gives_up_when_nothing_can_play():
+    paths = ["a", "b"]
+    prepare = GatedPrepare(paths, {"a": None, "b": None})
+    preparer = ParallelPreparer(prepare, paths, workers=2)
+    prepare.release("a")
+    prepare.release("b")
+    assert preparer.waitForFirst() is None
+
+
+def test_wait_for_first_ends_when_stopped():
+    paths = ["a"]
+    prepare = GatedPrepare(paths)
+    preparer = ParallelPreparer(prepare, paths, workers=1)
+    assert preparer.waitForFirst(lambda: True) is None
+    prepare.release("a")
+    finish(preparer)
+
+
+def test_shutdown_drops_gifs_not_started_yet():
+    paths = ["a", "b", "c"]
+    prepare = GatedPrepare(paths)
+    preparer = ParallelPreparer(prepare, paths, workers=1)
+    waitFor(lambda: prepare.started)
+
+    preparer.shutdown()
+    prepare.release("a")
+    finish(preparer)
+    assert prepare.started == ["a"]
+    assert preparer.readyIndexes() == [0]
@@ -0,0 +1,190 @@
+import time
+from threading import Thread
+
+import pytest
+
+from oledcore.scheduler import FrameScheduler, TimerQueue, MAX_LAG_SECONDS, ROTATE_TIMER
+
+
+class FakeClock:
+    # A monotonic clock that only moves when the scheduler sleeps or a test advances it
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def play(scheduler, clock, durations, sendSeconds=None):
+    # Runs the scheduler over durations and returns (index, time it went out) per frame.
+    # sendSeconds maps a frame index to how long sending it takes.
+    sent = []
+    for index in scheduler.frames(durations):
+        sent.append((index, clock.now))
+        clock.advance((sendSeconds or {}).get(index, 0))
+    return sent
+
+
+def test_frames_go_out_on_their_deadlines():
+    clock = FakeClock()
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep)
+    sent = play(scheduler, clock, [0.1, 0.2, 0.05, 0.1])
+    assert [index for index, _ in sent] == [0, 1, 2, 3]
+    assert [at - 100.0 for _, at in sent] == [0, pytest.approx(0.1), pytest.approx(0.3), pytest.approx(0.35)]
+    assert scheduler.stats() == {"sent": 4, "dropped": 0, "skipped": 0, "resyncs": 0}
+
+
+def test_send_time_is_absorbed_into_the_hold():
+    clock = FakeClock()
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep)
+    sent = play(scheduler, clock, [0.1] * 3, {0: 0.03, 1: 0.03})
+    assert [at - 100.0 for _, at in sent] == [0, pytest.approx(0.1), pytest.approx(0.2)]
+    assert clock.slept == [pytest.approx(0.07), pytest.approx(0.07)]
+
+
+def test_frames_whose_window_passed_during_an_overrun_are_dropped():
+    clock = FakeClock()
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep)
+    # Frame 0 takes 250ms to send: frame 1's window (100-200ms) is gone, frame 2's (200-300ms) is not
+    sent = play(scheduler, clock, [0.1] * 4, {0: 0.25})
+    assert [index for index, _ in sent] == [0, 2, 3]
+    assert [at - 100.0 for _, at in sent] == [0, pytest.approx(0.25), pytest.approx(0.3)]
+    assert scheduler.stats() == {"sent": 3, "dropped": 1, "skipped": 0, "resyncs": 0}
+
+
+def test_a_long_stall_restarts_the_timeline_instead_of_dropping():
+    clock = FakeClock()
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep)
+    stall = MAX_LAG_SECONDS + 1
+    sent = play(scheduler, clock, [0.1] * 4, {0: stall})
+    # Every frame still plays, spaced normally from the end of the stall
+    assert [index for index, _ in sent] == [0, 1, 2, 3]
+    resumed = 100.0 + stall
+    assert [at - resumed for _, at in sent[1:]] == [0, pytest.approx(0.1), pytest.approx(0.2)]
+    assert scheduler.stats() == {"sent": 4, "dropped": 0, "skipped": 0, "resyncs": 1}
+
+
+@pytest.mark.parametrize("speed, hold", [(2.0, 0.05), (0.5, 0.2)])
+def test_playback_speed_scales_every_hold(speed, hold):
+    clock = FakeClock()
+    scheduler = FrameScheduler(speed=speed, clock=clock, sleep=clock.sleep)
+    sent = play(scheduler, clock, [0.1] * 3)
+    assert [at - 100.0 for _, at in sent] == [0, pytest.approx(hold), pytest.approx(2 * hold)]
+
+
+def test_holds_never_go_below_the_minimum_frame_time():
+    clock = FakeClock()
+    scheduler = FrameScheduler(speed=4.0, minFrameSeconds=0.04, clock=clock, sleep=clock.sleep)
+    sent = play(scheduler, clock, [0.1, 0.1, 0.2])
+    # 100ms / 4 is under the 40ms minimum, 200ms / 4 is not
+    assert [at - 100.0 for _, at in sent] == [0, pytest.approx(0.04), pytest.approx(0.08)]
+    assert scheduler.holdSeconds(0.2) == pytest.approx(0.05)
+
+
+def test_the_timeline_carries_over_between_loops_until_restarted():
+    clock = FakeClock()
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep)
+    first = play(scheduler, clock, [0.1, 0.1])
+    second = play(scheduler, clock, [0.1, 0.1])
+    # The second loop's first frame waits out the last frame of the first loop
+    assert [at - 100.0 for _, at in first + second] == [0, pytest.approx(0.1), pytest.approx(0.2),
+                                                        pytest.approx(0.3)]
+
+    # Without a restart the next frame would wait until 0.4s, a restart sends it straight away
+    scheduler.restart()
+    restarted = play(scheduler, clock, [0.1])
+    assert restarted[0][1] - 100.0 == pytest.approx(0.3)
+
+
+def test_a_timer_ends_the_frames_even_when_no_frame_has_to_wait():
+    clock = FakeClock()
+    timers = TimerQueue(clock=clock)
+    scheduler = FrameScheduler(clock=clock, sleep=clock.sleep, timers=timers)
+    timers.schedule(ROTATE_TIMER, 0.25)
+    # Every send takes longer than a frame's hold, so every frame is already due when it comes up
+    sent = play(scheduler, clock, [0.1] * 20, {index: 0.15 for index in range(20)})
+    assert [index for index, _ in sent] == [0, 1]
+    assert timers.consume(ROTATE_TIMER)
+
+
+#############################################################################
+
+def test_timers_fire_in_due_order():
+    clock = FakeClock()
+    timers = TimerQueue(clock=clock)
+    timers.schedule("late", 0.2)
+    timers.schedule("early", 0.1)
+
+    clock.advance(0.15)
+    assert not timers.consume("late")
+    assert timers.consume("early")
+    clock.advance(0.1)
+    assert timers.consume("late")
+
+
+def test_consume_is_true_once_per_firing():
+    clock = FakeClock()
+    timers = TimerQueue(clock=clock)
+    assert not timers.consume(ROTATE_TIMER)
+    timers.schedule(ROTATE_TIMER, 0.1)
+    assert not timers.consume(ROTATE_TIMER)
+
+    clock.advance(0.1)
+    assert timers.consume(ROTATE_TIMER)
+    assert not timers.consume(ROTATE_TIMER)
+
+
+def test_rescheduling_replaces_and_cancel_disarms():
+    clock = FakeClock()
+    timers = TimerQueue(clock=clock)
+    timers.schedule(ROTATE_TIMER, 0.1)
+    timers.schedule(ROTATE_TIMER, 0.5)
+    clock.advance(0.2)
+    # The first arming was replaced, so nothing fires at 0.1s
+    assert not timers.consume(ROTATE_TIMER)
+
+    timers.cancel(ROTATE_TIMER)
+    clock.advance(1)
+    assert not timers.consume(ROTATE_TIMER)
+
+
+def test_wait_until_ends_at_the_deadline():
+    timers = TimerQueue()
+    start = time.monotonic()
+    assert timers.waitUntil(start + 0.05)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_wait_until_ends_early_when_a_timer_fires():
+    timers = TimerQueue()
+    timers.schedule(ROTATE_TIMER, 0.05)
+    start = time.monotonic()
+    assert not timers.waitUntil(start + 5)
+    assert time.monotonic() - start < 1
+    # The timer stays fired for the loop to consume
+    assert timers.consume(ROTATE_TIMER)
+
+
+def test_stop_wakes_a_waiting_thread():
+    timers = TimerQueue()
+    results = []
+    waiter = Thread(target=lambda: results.append(timers.waitUntil(time.monotonic() + 5)))
+    waiter.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    timers.stop()
+    waiter.join(1)
+    assert not waiter.is_alive()
+    assert results == [False]
+    assert time.monotonic() - start < 0.5
+    # Stopped for good
+    assert not timers.waitUntil(time.monotonic() + 5)
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+
+from oledcore.textrender import TextRenderer, TextDisplay
+
+LONG_MESSAGE = "This message is far too long to fit on the screen at once"
+
+
+class SlowScreen:
+    # Takes longer than a marquee frame (33ms) to send each frame, like a slow Engine round trip
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.frames = []
+
+    def send(self, bitmap):
+        time.sleep(self.seconds)
+        self.frames.append(bitmap)
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline
+        time.sleep(0.005)
+
+
+def test_marquee_frames_scroll_one_pixel():
+    frames = TextRenderer().render(LONG_MESSAGE)
+    assert len(frames) > 1
+    first = np.unpackbits(np.array(frames.frame(0), dtype=np.uint8)).reshape(52, 128)
+    later = np.unpackbits(np.array(frames.frame(5), dtype=np.uint8)).reshape(52, 128)
+    assert first.any()
+    assert np.array_equal(first[:, 5:], later[:, :-5])
+
+
+def test_short_message_is_one_frame():
+    frames = TextRenderer().render("Hello")
+    assert len(frames) == 1
+    assert len(frames.frame(0)) == 832
+
+
+def test_newest_message_replaces_marquee_with_slow_sends():
+    renderer = TextRenderer()
+    screen = SlowScreen(0.045)
+    display = TextDisplay(screen.send, renderer).start()
+    try:
+        display.show(LONG_MESSAGE)
+        waitFor(lambda: len(screen.frames) >= 3)
+        display.show("hi")
+        waitFor(lambda: screen.frames[-1] == renderer.render("hi").frame(0), timeout=1)
+        sent = len(screen.frames)
+        time.sleep(0.2)
+        # The marquee is over, nothing more is sent for a message that fits
+        assert len(screen.frames) == sent
+    finally:
+        start = time.perf_counter()
+        display.stop(1.0)
+    assert not display.thread.is_alive()
+    assert time.perf_counter() - start < 0.5
+
+
+def test_stop_ends_marquee_with_slow_sends():
+    screen = SlowScreen(0.045)
+    display = TextDisplay(screen.send, TextRenderer()).start()
+    display.show(LONG_MESSAGE)
+    waitFor(lambda: len(screen.frames) >= 3)
+    display.stop(1.0)
+    assert not display.thread.is_alive()
@@ -0,0 +1,137 @@
+import time
+from threading import Thread
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from oledcore.usbdevice import FakeHidTransport, FakeOledDevice
+
+
+def makeGIF(path, frames=6):
+    # A static pattern on the left half and a box moving down the right half, so partial updates
+    # leave the left half alone
+    images = []
+    for index in range(frames):
+        image = Image.new("L", (128, 64), 0)
+        draw = ImageDraw.Draw(image)
+        for x in range(0, 64, 8):
+            draw.rectangle((x, 0, x + 3, 63), fill=255)
+        draw.rectangle((80, index * 8, 100, index * 8 + 12), fill=255)
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], duration=20, loop=0)
+    return str(path)
+
+
+def newPlayer(module, invert=0):
+    player = module.OLED_GIF(connect=False)
+    player.device = None
+    player.transport = FakeHidTransport(FakeOledDevice())
+    player.connect_device()
+    player.invert = invert
+    return player
+
+
+def fullFrameScreens(report_frames, invert):
+    # What the screen shows after each frame's full reports
+    screens = []
+    for frame in report_frames:
+        device = FakeOledDevice()
+        device.connect()
+        for report in frame.reports:
+            device.send_feature_report(report)
+        screens.append(~device.screen() if invert else device.screen())
+    return screens
+
+
+@pytest.fixture
+def setup(players, tmp_path):
+    module = players["usb"]
+    player = newPlayer(module)
+    gif_path = makeGIF(tmp_path / "box.gif")
+    report_frames = player.preprocess_gif_reports(gif_path)
+    yield module, player, report_frames, gif_path
+    player.status_overlay.stop()
+
+
+def test_the_gif_uses_partial_updates(setup):
+    _, _, report_frames, _ = setup
+    assert sum(len(frame.delta_reports) for frame in report_frames) < sum(len(frame.reports) for frame in report_frames)
+
+
+@pytest.mark.parametrize("invert", [False, True])
+def test_partial_updates_draw_what_full_frames_do(setup, invert):
+    _, player, report_frames, _ = setup
+    expected = fullFrameScreens(report_frames, invert)
+    last_sent = None
+    for count in range(len(report_frames) * 2):
+        index = count % len(report_frames)
+        last_sent = player._send_frame(report_frames, index, last_sent, invert)
+        assert np.array_equal(player.device.screen(), expected[index]), index
+
+
+def test_an_invert_change_sends_a_full_frame(setup):
+    _, player, report_frames, _ = setup
+    last_sent = player._send_frame(report_frames, 0, None, False)
+    player._send_frame(report_frames, 1, last_sent, True)
+    assert np.array_equal(player.device.screen(), fullFrameScreens(report_frames, True)[1])
+
+
+def test_a_status_message_drawn_between_frames_sends_a_full_frame(setup):
+    module, player, report_frames, _ = setup
+    expected = fullFrameScreens(report_frames, False)
+    clear = player.status_cache.get("", module.STATUS_LAYOUT, False)
+
+    last_sent = player._send_frame(report_frames, 0, None, False)
+    player._send_status_reports(clear)
+    # Frame 1's partial update alone would leave the static background black
+    for report in report_frames[1].delta_reports:
+        player.device.send_feature_report(report)
+    assert not np.array_equal(player.device.screen(), expected[1])
+
+    player._send_status_reports(clear)
+    last_sent = player._send_frame(report_frames, 1, last_sent, False)
+    assert np.array_equal(player.device.screen(), expected[1])
+    # Back to partial updates once a full frame is on screen
+    reports = player.device.stats()["reports"]
+    player._send_frame(report_frames, 2, last_sent, False)
+    assert player.device.stats()["reports"] - reports == len(report_frames[2].delta_reports)
+    assert np.array_equal(player.device.screen(), expected[2])
+
+
+def test_playback_recovers_from_a_status_clear(setup):
+    # The overlay's clear lands while playGIF is sending partial updates
+    _, player, report_frames, gif_path = setup
+    expected = fullFrameScreens(report_frames, False)
+    sent = []
+    send = player._send_frame
+    def sendFrame(*args):
+        last_sent = send(*args)
+        sent.append(last_sent[0])
+        return last_sent
+    player._send_frame = sendFrame
+    player.frameDelaySeconds = 0.01
+
+    player.running = True
+    thread = Thread(target=player.playGIF, args=(gif_path,))
+    thread.start()
+    try:
+        deadline = time.perf_counter() + 5
+        while len(sent) < 3:
+            assert time.perf_counter() < deadline
+            time.sleep(0.005)
+        player.display_error_message("GIF Stopped!", 0.01)
+        while player.status_overlay.clears < 1:
+            assert time.perf_counter() < deadline
+            time.sleep(0.005)
+        # A few frames after the clear, all of them partial updates but the first
+        count = len(sent)
+        while len(sent) < count + 3:
+            assert time.perf_counter() < deadline
+            time.sleep(0.005)
+    finally:
+        player.stopGIF()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert np.array_equal(player.device.screen(), expected[sent[-1]])
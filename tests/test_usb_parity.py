@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+import pytest
+import PIL
+from PIL import Image
+
+from corpus import CASES, STATUS_MESSAGES, gifPath, loadGolden
+from fakes import RecordingDevice
+from oledcore.pipeline import iterDecodedFrames
+
+
+def asArray(reports):
+    return np.frombuffer(b"".join(reports), dtype=np.uint8).reshape(len(reports), -1)
+
+def monochromeFrames(case):
+    # The '1' mode frames the baseline player built its reports from
+    for frame, _ in iterDecodedFrames(gifPath(case), (0, 0, 0)):
+        resized = frame.resize((128, 64), Image.Resampling.LANCZOS)
+        yield resized.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+
+def newPlayer(module, invert=0):
+    player = module.OLED_GIF(connect=False)
+    player.device = RecordingDevice()
+    player.invert = invert
+    return player
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("case", CASES)
+def test_preprocessed_reports_match_golden(players, case, invert):
+    # Reports are kept in normal polarity and flipped with invert_report as they are sent
+    module = players["usb"]
+    golden = loadGolden("usb", case)[f"invert{invert}"]
+    report_frames = newPlayer(module).preprocess_gif_reports(gifPath(case))
+
+    assert len(report_frames) == len(golden)
+    for frame, expected in zip(report_frames, golden):
+        reports = [module.invert_report(report) if invert else report for report in frame.reports]
+        assert np.array_equal(asArray(reports), expected)
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("case", CASES)
+def test_pil_frame_to_reports_matches_golden(players, case, invert):
+    player = newPlayer(players["usb"], invert)
+    golden = loadGolden("usb", case)[f"invert{invert}"]
+    reports = [asArray(player._pil_frame_to_reports(frame)) for frame in monochromeFrames(case)]
+    assert np.array_equal(np.stack(reports), golden)
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+@pytest.mark.parametrize("case", CASES)
+def test_create_draw_report_matches_golden(players, case, invert):
+    player = newPlayer(players["usb"], invert)
+    golden = loadGolden("usb", case)[f"invert{invert}"]
+    for frame, expected in zip(monochromeFrames(case), golden):
+        reports = [player._create_draw_report(frame.crop((x, 0, x + 64, 64)), x, 0) for x in (0, 64)]
+        assert np.array_equal(asArray(reports), expected)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_invert_report_matches_golden(players, case):
+    module = players["usb"]
+    golden = loadGolden("usb", case)
+    for normal, inverted in zip(golden["invert0"], golden["invert1"]):
+        for report, expected in zip(normal, inverted):
+            flipped = module.invert_report(report.tobytes())
+            assert flipped == expected.tobytes()
+            assert module.invert_report(flipped) == report.tobytes()
+
+
+@pytest.mark.parametrize("invert", [0, 1])
+def test_status_messages_match_golden(players, invert):
+    # Each message, then the clear screen once its timer runs out, from the status cache on every later show
+    golden = loadGolden("usb", "status_messages")
+    if str(golden["pillow"]) != PIL.__version__:
+        pytest.skip(f"status messages were drawn with Pillow {golden['pillow']}'s default font")
+    assert list(golden["messages"]) == STATUS_MESSAGES
+
+    player = newPlayer(players["usb"], invert)
+    try:
+        for _ in range(2):
+            for message, expected in zip(STATUS_MESSAGES, golden[f"invert{invert}"]):
+                player.device.reports = []
+                player.display_error_message(message, 0.01)
+                deadline = time.perf_counter() + 5
+                while len(player.device.reports) < len(expected) and time.perf_counter() < deadline:
+                    time.sleep(0.005)
+                player.status_overlay.flush(5)
+                assert np.array_equal(asArray(player.device.reports), expected), message
+    finally:
+        player.status_overlay.stop()
+    assert player.status_cache.hits >= len(STATUS_MESSAGES) * 2